@@ -4,12 +4,33 @@ Utility functions for common tasks.
 This module contains helper functions that can be reused across different tools.
 """
 
+import functools
+import gzip
 import json
+import math
 import os
+import random
+import re
+import threading
+import time
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional
 from datetime import datetime
 
+# Optional fast JSON backend (pip install orjson)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Optional zstd compression (pip install zstandard)
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
 
 def greet(name: str) -> str:
     """
@@ -80,6 +101,290 @@ def write_json(data: Dict[str, Any], file_path: Path | str, indent: int = 2) ->
         json.dump(data, f, indent=indent, ensure_ascii=False)
 
 
+def _json_loads(data: str | bytes) -> Any:
+    """Decode one JSON value, using orjson when it is installed."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps(obj: Any) -> str:
+    """Encode one JSON value on a single line, using orjson when it is installed."""
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(obj).decode("utf-8")
+        except TypeError:
+            # orjson is stricter (e.g. non-str keys) - fall back to the stdlib
+            pass
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def open_text(file_path: Path | str, mode: str = "r") -> IO[str]:
+    """
+    Open a text file, transparently (de)compressing by file extension.
+
+    ``.gz`` files use gzip and ``.zst`` files use zstandard (if installed).
+    Any other extension is opened as plain UTF-8 text.
+
+    Args:
+        file_path: Path to file
+        mode: "r", "w" or "a" (default: "r")
+
+    Returns:
+        Open text file object
+
+    Raises:
+        ImportError: If a .zst file is used without zstandard installed
+    """
+    file_path = Path(file_path)
+    text_mode = mode.replace("t", "") + "t"
+    suffix = file_path.suffix.lower()
+
+    if suffix == ".gz":
+        return gzip.open(file_path, text_mode, encoding="utf-8")
+    if suffix == ".zst":
+        if not ZSTD_AVAILABLE:
+            raise ImportError("zstandard is required for .zst files. Run: pip install zstandard")
+        return zstandard.open(file_path, text_mode, encoding="utf-8")
+    return open(file_path, mode.replace("t", ""), encoding="utf-8")
+
+
+def iter_jsonl(file_path: Path | str) -> Iterator[Any]:
+    """
+    Iterate over records in a JSON Lines file, one line at a time.
+
+    Memory use stays constant no matter how large the file is.
+    Blank lines are skipped. Compressed files (.gz, .zst) are supported.
+
+    Args:
+        file_path: Path to .jsonl file
+
+    Yields:
+        One decoded record per line
+
+    Raises:
+        FileNotFoundError: If file doesn't exist
+        ValueError: If a line contains invalid JSON
+    """
+    with open_text(file_path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield _json_loads(line)
+
+
+# Structural characters outside and inside JSON strings, used to find where a value ends
+_JSON_STRUCTURE = re.compile(r'["\[\]{},\s]')
+_JSON_STRING_STOP = re.compile(r'["\\]')
+
+
+def _find_json_value_end(buffer: str, state: List[Any]) -> Optional[int]:
+    """
+    Find the end of the JSON value that ``state`` is scanning.
+
+    ``state`` is ``[scan position, nesting depth, inside a string]``; it is
+    updated in place when the buffer ends first, so scanning resumes where it
+    stopped once more text has been appended. Returns the index just past the
+    value, or None when more text is needed.
+    """
+    scan, depth, in_string = state
+    while True:
+        if in_string:
+            match = _JSON_STRING_STOP.search(buffer, scan)
+            if match is None:
+                scan = len(buffer)
+                break
+            if match.group() == "\\":
+                if match.end() >= len(buffer):
+                    # The escaped character is not read yet - look again later
+                    scan = match.start()
+                    break
+                scan = match.end() + 1
+                continue
+            in_string = False
+            scan = match.end()
+            if depth == 0:
+                return scan
+            continue
+
+        match = _JSON_STRUCTURE.search(buffer, scan)
+        if match is None:
+            scan = len(buffer)
+            break
+        char = match.group()
+        scan = match.start()
+        if char == '"':
+            in_string = True
+            scan += 1
+        elif char in "[{":
+            depth += 1
+            scan += 1
+        elif depth == 0:
+            # A closing bracket, comma or whitespace right after a number or literal
+            return scan
+        elif char in "]}":
+            depth -= 1
+            scan += 1
+            if depth == 0:
+                return scan
+        else:
+            scan += 1
+
+    state[:] = [scan, depth, in_string]
+    return None
+
+
+def iter_json_array(file_path: Path | str, chunk_size: int = 64 * 1024) -> Iterator[Any]:
+    """
+    Iterate over the items of a top-level JSON array without loading it all.
+
+    The file is read in chunks of ``chunk_size`` characters, so only one
+    item (plus one chunk) is held in memory at a time. Each item is scanned
+    once to find where it ends and then decoded with orjson when installed.
+
+    Args:
+        file_path: Path to JSON file containing an array
+        chunk_size: Characters to read per chunk (default: 64K)
+
+    Yields:
+        Each item of the array
+
+    Raises:
+        FileNotFoundError: If file doesn't exist
+        ValueError: If the file is not a JSON array or is malformed
+            (json.JSONDecodeError for a missing, doubled or trailing comma)
+    """
+    whitespace = " \t\r\n"
+
+    with open_text(file_path, "r") as f:
+        buffer = ""
+        pos = 0
+        eof = False
+        # What comes next: "[", "first" (an item or "]"), "item", or "," (a comma or "]")
+        expect = "["
+        # Scan state of an item that continues past the end of the buffer
+        state = None
+
+        while True:
+            # Skip whitespace between tokens
+            while pos < len(buffer) and buffer[pos] in whitespace:
+                pos += 1
+
+            if pos >= len(buffer):
+                if eof:
+                    raise ValueError("Unexpected end of file: JSON array is not closed")
+                buffer = f.read(chunk_size)
+                pos = 0
+                eof = not buffer
+                continue
+
+            char = buffer[pos]
+            if expect == "[":
+                if char != "[":
+                    raise ValueError("File does not contain a top-level JSON array")
+                expect = "first"
+                pos += 1
+                continue
+
+            if expect == ",":
+                if char == "]":
+                    return
+                if char != ",":
+                    raise json.JSONDecodeError("Expecting ',' delimiter", buffer, pos)
+                expect = "item"
+                pos += 1
+                continue
+
+            if char == "]" and expect == "first":
+                return
+            if char in ",]":
+                raise json.JSONDecodeError("Expecting value", buffer, pos)
+
+            if state is None:
+                state = [pos, 0, False]
+            end = _find_json_value_end(buffer, state)
+
+            if end is None:
+                if eof:
+                    scan, depth, in_string = state
+                    if depth or in_string or scan == pos:
+                        raise ValueError(f"Invalid JSON near character {pos}")
+                    # A number or literal at the very end of the file
+                    end = len(buffer)
+                else:
+                    # Read at least as much as is buffered, so a huge item is
+                    # copied a logarithmic number of times rather than once per chunk
+                    more = f.read(max(chunk_size, len(buffer) - pos))
+                    eof = not more
+                    buffer = buffer[pos:] + more
+                    state[0] -= pos
+                    pos = 0
+                    continue
+
+            yield _json_loads(buffer[pos:end])
+            pos = end
+            state = None
+            expect = ","
+
+            # Drop already-parsed text so the buffer does not keep growing
+            if pos > chunk_size:
+                buffer = buffer[pos:]
+                pos = 0
+
+
+class JsonlWriter:
+    """
+    Buffered, appending writer for JSON Lines files.
+
+    Records are collected in memory and written out in batches, which is
+    much faster than opening the file for every record.
+
+    Usage:
+        with JsonlWriter("data/processed/items.jsonl.gz") as writer:
+            for item in items:
+                writer.write(item)
+    """
+
+    def __init__(self, file_path: Path | str, batch_size: int = 1000, append: bool = True):
+        self.file_path = Path(file_path)
+        self.batch_size = batch_size
+        self.count = 0
+        self._buffer: List[str] = []
+        ensure_directory(self.file_path.parent)
+        self._file = open_text(self.file_path, "a" if append else "w")
+
+    def write(self, record: Any) -> None:
+        """Queue one record, flushing when the batch is full."""
+        self._buffer.append(_json_dumps(record))
+        self.count += 1
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def write_many(self, records: Iterable[Any]) -> None:
+        """Queue many records."""
+        for record in records:
+            self.write(record)
+
+    def flush(self) -> None:
+        """Write all queued records to disk."""
+        if self._buffer:
+            self._file.write("\n".join(self._buffer) + "\n")
+            self._buffer.clear()
+        self._file.flush()
+
+    def close(self) -> None:
+        """Flush remaining records and close the file."""
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
 def read_text(file_path: Path | str) -> str:
     """
     Read text file and return contents.
@@ -202,29 +507,235 @@ def percentage(part: float, total: float, decimals: int = 2) -> str:
     return f"{pct:.{decimals}f}%"
 
 
+class ProfileRegistry:
+    """
+    Process-wide collection of Timer measurements.
+
+    Every finished Timer records its duration here under its label and
+    under its full nesting path (e.g. "load;parse"), so thousands of timed
+    sections can be summarised afterwards.
+
+    Count, total, min and max are exact. Percentiles come from a random
+    sample of at most ``max_samples`` durations per label (reservoir
+    sampling), so memory stays bounded in long-running jobs.
+
+    Usage:
+        print(profiler.report())
+        profiler.to_json("data/processed/profile.json")
+        profiler.to_collapsed("data/processed/profile.folded")
+    """
+
+    def __init__(self, max_samples: int = 10_000):
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._samples: Dict[str, List[int]] = {}
+        # Exact [count, total, min, max] per label
+        self._totals: Dict[str, List[int]] = {}
+        self._self_ns: Dict[str, int] = {}
+        self._random = random.Random(0)
+
+    def record(self, label: str, duration_ns: int, stack: List[str]) -> None:
+        """
+        Store one measurement.
+
+        Args:
+            label: Name of the timed section
+            duration_ns: Duration in nanoseconds
+            stack: Labels of the enclosing sections, outermost first
+        """
+        path = ";".join(stack + [label])
+        with self._lock:
+            totals = self._totals.get(label)
+            if totals is None:
+                self._totals[label] = [1, duration_ns, duration_ns, duration_ns]
+            else:
+                totals[0] += 1
+                totals[1] += duration_ns
+                totals[2] = min(totals[2], duration_ns)
+                totals[3] = max(totals[3], duration_ns)
+
+            # Keep every duration until the sample is full, then replace
+            # entries at random so each duration has the same chance to be in it
+            samples = self._samples.setdefault(label, [])
+            if len(samples) < self.max_samples:
+                samples.append(duration_ns)
+            else:
+                slot = self._random.randrange(self._totals[label][0])
+                if slot < self.max_samples:
+                    samples[slot] = duration_ns
+            # Self time: add to this path, remove from the parent's path
+            self._self_ns[path] = self._self_ns.get(path, 0) + duration_ns
+            if stack:
+                parent = ";".join(stack)
+                self._self_ns[parent] = self._self_ns.get(parent, 0) - duration_ns
+
+    def reset(self) -> None:
+        """Forget all measurements."""
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+            self._self_ns.clear()
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Summarise measurements per label.
+
+        Returns:
+            Dictionary of label -> {count, total, mean, min, max, p50, p95, p99}
+            (times in seconds; percentiles are estimated from the sample)
+        """
+        with self._lock:
+            samples = {label: sorted(values) for label, values in self._samples.items()}
+            totals = {label: list(values) for label, values in self._totals.items()}
+
+        result = {}
+        for label, values in samples.items():
+            count, total, smallest, largest = totals[label]
+            result[label] = {
+                "count": count,
+                "total": total / 1e9,
+                "mean": total / count / 1e9,
+                "min": smallest / 1e9,
+                "max": largest / 1e9,
+                "p50": _percentile(values, 50) / 1e9,
+                "p95": _percentile(values, 95) / 1e9,
+                "p99": _percentile(values, 99) / 1e9,
+            }
+        return result
+
+    def report(self) -> str:
+        """
+        Format stats as a text table, slowest total first.
+
+        Returns:
+            Multi-line report string
+        """
+        stats = self.stats()
+        lines = [f"{'Label':<30} {'Count':>8} {'Total s':>10} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}"]
+        for label, s in sorted(stats.items(), key=lambda item: item[1]["total"], reverse=True):
+            lines.append(
+                f"{truncate_string(label, 30):<30} {s['count']:>8} {s['total']:>10.3f} "
+                f"{s['p50'] * 1000:>10.3f} {s['p95'] * 1000:>10.3f} {s['p99'] * 1000:>10.3f}"
+            )
+        return "\n".join(lines)
+
+    def to_json(self, file_path: Optional[Path | str] = None) -> str:
+        """
+        Export stats as JSON.
+
+        Args:
+            file_path: Optional file to write to
+
+        Returns:
+            JSON string
+        """
+        stats = self.stats()
+        if file_path:
+            write_json(stats, file_path)
+        return json.dumps(stats, indent=2)
+
+    def to_collapsed(self, file_path: Optional[Path | str] = None) -> str:
+        """
+        Export self time per stack in collapsed-stack format.
+
+        Each line is "outer;inner;leaf <microseconds>", which can be fed
+        straight into flamegraph.pl or speedscope.
+
+        Args:
+            file_path: Optional file to write to
+
+        Returns:
+            Collapsed-stack text
+        """
+        with self._lock:
+            items = sorted(self._self_ns.items())
+        text = "".join(f"{path} {max(ns, 0) // 1000}\n" for path, ns in items)
+        if file_path:
+            write_text(text, file_path)
+        return text
+
+
+def _percentile(sorted_values: List[int], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+# Global registry used by every Timer unless told otherwise
+profiler = ProfileRegistry()
+
+# Names of the Timers currently running, per thread (for nesting)
+_timer_stack = threading.local()
+
+
 class Timer:
     """
-    Simple timer context manager for measuring execution time.
+    Timer for measuring execution time, as a context manager or decorator.
+
+    Uses time.perf_counter_ns, so it is cheap enough for hot paths.
+    Timers can be nested, and every measurement is stored in ``profiler``.
 
     Usage:
         with Timer("My operation"):
             # ... code to time ...
+
+        with Timer("Hot loop", silent=True):
+            # ... no printing, only recorded ...
+
+        @Timer("load_data", silent=True)
+        def load_data():
+            ...
     """
 
-    def __init__(self, name: str = "Operation"):
-        self.name = name
-        self.start_time = None
-        self.end_time = None
+    def __init__(self, name: Optional[str] = None, silent: bool = False,
+                 registry: Optional[ProfileRegistry] = None):
+        self.name = name or "Operation"
+        self.silent = silent
+        self.registry = registry or profiler
+        self._explicit_name = name is not None
+        self.start_ns = None
+        self.end_ns = None
+
+    @property
+    def elapsed(self) -> float:
+        """Elapsed time in seconds (so far, if still running)."""
+        if self.start_ns is None:
+            return 0.0
+        end_ns = self.end_ns if self.end_ns is not None else time.perf_counter_ns()
+        return (end_ns - self.start_ns) / 1e9
 
     def __enter__(self):
-        self.start_time = datetime.now()
-        print(f"⏱️  Starting: {self.name}")
+        stack = getattr(_timer_stack, "names", None)
+        if stack is None:
+            stack = _timer_stack.names = []
+        self._parents = list(stack)
+        stack.append(self.name)
+
+        if not self.silent:
+            print(f"⏱️  Starting: {self.name}")
+        self.end_ns = None
+        self.start_ns = time.perf_counter_ns()
         return self
 
     def __exit__(self, *args):
-        self.end_time = datetime.now()
-        duration = (self.end_time - self.start_time).total_seconds()
-        print(f"✅ Completed: {self.name} ({duration:.2f}s)")
+        self.end_ns = time.perf_counter_ns()
+        _timer_stack.names.pop()
+        self.registry.record(self.name, self.end_ns - self.start_ns, self._parents)
+
+        if not self.silent:
+            print(f"✅ Completed: {self.name} ({self.elapsed:.2f}s)")
+
+    def __call__(self, func):
+        name = self.name if self._explicit_name else func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with Timer(name, silent=self.silent, registry=self.registry):
+                return func(*args, **kwargs)
+
+        return wrapper
 
 
 # Example usage
@@ -236,5 +747,7 @@ if __name__ == "__main__":
 
     # Timer example
     with Timer("Example operation"):
-        import time
         time.sleep(1)
+
+    print()
+    print(profiler.report())
@@ -0,0 +1,389 @@
+"""
+Batch Transcriber - Transcribe a whole folder of recordings
+Every recording in data/raw is transcribed, a few at a time.
+
+- The files to do are kept in a job list (a small SQLite file), so the run
+  can be stopped at any time (Ctrl+C) and started again: files already
+  transcribed are skipped, and files that were in progress are done again
+- Files that fail are retried a few times before they are marked as failed
+  (run with --retry-failed to try those again)
+- Transcripts go to one JSONL file (one line per recording, with the timed
+  segments), plus an SRT subtitle file per recording. A recording is marked
+  done in the same step that records the end of the JSONL file, and lines
+  written after that are removed when the run starts again, so every
+  recording is in it exactly once
+- Local Whisper gets several recordings at a time, so their pieces are
+  transcribed together in batches (see local_transcriber.py)
+- Transcripts are cached (transcript_cache.py), so audio transcribed before,
+  here or in simple_transcriber.py, is not sent again
+- At the end, the speed is shown in minutes of audio per minute of waiting
+
+Needs pydub (and ffmpeg for formats other than WAV); the Whisper API needs
+openai and OPENAI_API_KEY in .env, local Whisper needs openai-whisper.
+
+Run with: python templates/audio_templates/batch_transcribe.py
+"""
+
+import argparse
+import io
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.config import settings
+
+from chunked_transcription import load_audio, transcribe_long_audio, transcribe_with_retry
+from local_transcriber import FILES_PER_GROUP, MODEL_SIZE, WHISPER_AVAILABLE, LocalWhisperBackend
+from subtitles import write_subtitles
+from transcript_cache import TranscriptCache, audio_hash
+from transcription_backends import OPENAI_AVAILABLE, PYDUB_AVAILABLE, StandInBackend, WhisperAPIBackend
+
+# ============================================
+# CONFIGURATION - Change these values!
+# ============================================
+
+# Folder with the recordings, and where the transcripts go
+INPUT_FOLDER = settings.RAW_DATA_DIR
+OUTPUT_FOLDER = settings.PROCESSED_DATA_DIR
+AUDIO_EXTENSIONS = ['.mp3', '.wav', '.m4a', '.flac', '.ogg', '.webm', '.mp4']
+
+# One line per recording: {"file", "audio_seconds", "text", "segments", ...}
+RESULTS_FILE = "transcripts.jsonl"
+
+# Service: "api" (OpenAI Whisper API), "local" (local Whisper) or "stand-in" (offline test tones)
+SERVICE = "api"
+
+# Task ("Transcribe" or "Translate to English") and language (None = auto-detect)
+TASK = "Transcribe"
+LANGUAGE = None
+
+# Recordings transcribed at the same time (local Whisper instead takes
+# FILES_PER_GROUP recordings at a time and batches them, see local_transcriber.py)
+CONCURRENCY = 4
+
+# Tries per recording before it is marked as failed
+MAX_ATTEMPTS = 3
+
+# Job list and transcript cache (shared with simple_transcriber.py)
+JOBS_FILE = OUTPUT_FOLDER / "transcription_jobs.sqlite"
+TRANSCRIPT_CACHE_FILE = OUTPUT_FOLDER / "transcript_cache.sqlite"
+TRANSCRIPT_CACHE_MAX_MB = 200
+
+SERVICES = ["api", "local", "stand-in"]
+
+
+# ============================================
+# JOB LIST
+# ============================================
+
+class JobQueue:
+    """
+    The recordings to transcribe and how far each one got, in one SQLite file.
+
+    A job is "pending", "running", "done" or "failed". Jobs still "running"
+    when a run starts were interrupted, and are pending again.
+
+    Usage:
+        jobs = JobQueue("data/processed/transcription_jobs.sqlite")
+        jobs.add(["data/raw/a.mp3", "data/raw/b.mp3"])
+        paths = jobs.claim(2)                          # [] when nothing is left
+        jobs.finish(path, audio_seconds, output_bytes)  # or jobs.fail(path, error)
+    """
+
+    def __init__(self, path, max_attempts=MAX_ATTEMPTS):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                path TEXT PRIMARY KEY,
+                status TEXT,
+                attempts INTEGER,
+                error TEXT,
+                audio_seconds REAL,
+                updated REAL
+            )
+        """)
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+        self._db.execute("UPDATE jobs SET status = 'pending' WHERE status = 'running'")
+        self._db.commit()
+
+    def add(self, paths):
+        """Add recordings not in the list yet (returns how many were new)."""
+        with self._lock:
+            before = self._db.total_changes
+            self._db.executemany(
+                "INSERT OR IGNORE INTO jobs VALUES (?, 'pending', 0, NULL, NULL, ?)",
+                [(str(path), time.time()) for path in paths]
+            )
+            self._db.commit()
+            return self._db.total_changes - before
+
+    def retry_failed(self):
+        with self._lock:
+            self._db.execute("UPDATE jobs SET status = 'pending', attempts = 0 WHERE status = 'failed'")
+            self._db.commit()
+
+    def claim(self, limit=1):
+        """Up to `limit` pending recordings (now "running"). Retries come last."""
+        with self._lock:
+            paths = [row[0] for row in self._db.execute(
+                "SELECT path FROM jobs WHERE status = 'pending' ORDER BY attempts, path LIMIT ?", (limit,)
+            )]
+            self._db.executemany(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, updated = ? WHERE path = ?",
+                [(time.time(), path) for path in paths]
+            )
+            self._db.commit()
+            return paths
+
+    def finish(self, path, audio_seconds, output_bytes):
+        """Mark a recording done, together with the size of the results file that includes it."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = 'done', error = NULL, audio_seconds = ?, updated = ? WHERE path = ?",
+                (audio_seconds, time.time(), path)
+            )
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('output_bytes', ?)", (output_bytes,))
+            self._db.commit()
+
+    def output_bytes(self):
+        """Size of the results file when the last recording was marked done (None if not known yet)."""
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE key = 'output_bytes'").fetchone()
+            return row[0] if row else None
+
+    def set_output_bytes(self, output_bytes):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('output_bytes', ?)", (output_bytes,))
+            self._db.commit()
+
+    def fail(self, path, error):
+        """Pending again if it has tries left, otherwise failed. Returns the new status."""
+        with self._lock:
+            attempts = self._db.execute("SELECT attempts FROM jobs WHERE path = ?", (path,)).fetchone()[0]
+            status = "failed" if attempts >= self.max_attempts else "pending"
+            self._db.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated = ? WHERE path = ?",
+                (status, str(error), time.time(), path)
+            )
+            self._db.commit()
+            return status
+
+    def counts(self):
+        """{status: number of jobs}"""
+        with self._lock:
+            return dict(self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def failed(self):
+        """[(path, error)] of the failed jobs."""
+        with self._lock:
+            return self._db.execute("SELECT path, error FROM jobs WHERE status = 'failed' ORDER BY path").fetchall()
+
+
+# ============================================
+# TRANSCRIBE
+# ============================================
+
+def make_backend(service):
+    if service == "api":
+        return WhisperAPIBackend(settings.OPENAI_API_KEY)
+    if service == "local":
+        return LocalWhisperBackend(MODEL_SIZE)
+    return StandInBackend()
+
+
+def transcribe_group(paths, backend, cache, task=TASK, language=LANGUAGE):
+    """
+    Transcribe recordings, taking the ones transcribed before from the cache.
+
+    The others are given to the backend together, so local Whisper can
+    batch them; files over the service's size limit are split into chunks.
+    Audio is only decoded (to measure its length) when it is not cached.
+
+    Returns:
+        One result per path: {'text', 'segments', 'audio_seconds'}, or the
+        exception that stopped that recording
+    """
+    results = {}
+    todo = []   # (path, audio bytes, cache key, audio seconds)
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            filename = os.path.basename(path)
+            key = (audio_hash(data), backend.name, task, language)
+            result = cache.get(*key)
+            if result is not None and 'audio_seconds' in result:
+                results[path] = result
+                continue
+
+            audio = load_audio(io.BytesIO(data), filename)
+            seconds = len(audio) / 1000
+            if result is not None:
+                # Cached by simple_transcriber.py, which does not save the length
+                result['audio_seconds'] = seconds
+            elif backend.max_bytes and len(data) > backend.max_bytes:
+                # Chunks of the same file are sent one at a time: the files themselves run in parallel
+                result = transcribe_long_audio(audio, backend, task, language, workers=1, cache=cache)
+                result = {'text': result['text'], 'segments': result['segments'], 'audio_seconds': seconds}
+            else:
+                todo.append((path, data, key, seconds))
+                continue
+            cache.put(*key, result)
+            results[path] = result
+        except Exception as e:
+            results[path] = e
+
+    if todo:
+        try:
+            if len(todo) == 1:
+                path, data, _, _ = todo[0]
+                transcribed = [transcribe_with_retry(backend, data, os.path.basename(path), task, language)]
+            else:
+                transcribed = backend.transcribe_many(
+                    [(io.BytesIO(data), os.path.basename(path)) for path, data, _, _ in todo], task, language
+                )
+        except Exception as e:
+            transcribed = [e] * len(todo)
+
+        for (path, _, key, seconds), result in zip(todo, transcribed):
+            if not isinstance(result, Exception):
+                result = {'text': result['text'], 'segments': result['segments'], 'audio_seconds': seconds}
+                cache.put(*key, result)
+            results[path] = result
+
+    return [results[path] for path in paths]
+
+
+def run_worker(jobs, backend, cache, results_path, group_size, write_lock, stop, totals):
+    """Take recordings from the job list until it is empty (or the run is stopped)."""
+    while not stop.is_set():
+        paths = jobs.claim(group_size)
+        if not paths:
+            return
+
+        for path, result in zip(paths, transcribe_group(paths, backend, cache)):
+            name = os.path.basename(path)
+            if isinstance(result, Exception):
+                status = jobs.fail(path, result)
+                print(f"Error: {name}: {result} ({'will retry' if status == 'pending' else 'failed'})")
+                continue
+
+            # "talk.mp3.srt", so talk.mp3 and talk.wav don't share a subtitle file
+            srt_path = os.path.join(OUTPUT_FOLDER, name + ".srt")
+            audio_seconds = result['audio_seconds']
+            line = {'file': name, 'audio_seconds': round(audio_seconds, 3), 'backend': backend.name,
+                    'task': TASK, 'language': LANGUAGE, 'text': result['text'], 'segments': result['segments']}
+            with write_lock:
+                try:
+                    write_subtitles(result['segments'], srt_path)
+                    with open(results_path, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps(line, ensure_ascii=False) + "\n")
+                    jobs.finish(path, audio_seconds, os.path.getsize(results_path))
+                except Exception as e:
+                    # e.g. disk full: drop a half-written line and keep the worker going
+                    saved_size = jobs.output_bytes()
+                    if saved_size is not None and os.path.exists(results_path):
+                        with open(results_path, 'r+b') as f:
+                            f.truncate(saved_size)
+                    status = jobs.fail(path, e)
+                    print(f"Error saving {name}: {e} ({'will retry' if status == 'pending' else 'failed'})")
+                    continue
+                totals['files'] += 1
+                totals['audio_seconds'] += audio_seconds
+            print(f"Transcribed: {name} ({audio_seconds / 60:.1f} min) -> {srt_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcribe every recording in a folder")
+    parser.add_argument("--folder", default=str(INPUT_FOLDER), help="folder with the recordings")
+    parser.add_argument("--service", choices=SERVICES, default=SERVICE, help="transcription service")
+    parser.add_argument("--workers", type=int, default=CONCURRENCY, help="recordings transcribed at the same time")
+    parser.add_argument("--retry-failed", action="store_true", help="try the recordings that failed before again")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Batch Transcriber")
+    print("=" * 60)
+
+    if not PYDUB_AVAILABLE:
+        print("pydub is required. Run: pip install pydub")
+        return
+    if args.service == "api" and not (OPENAI_AVAILABLE and settings.OPENAI_API_KEY):
+        print("The Whisper API needs the openai library (pip install openai) and OPENAI_API_KEY in .env")
+        return
+    if args.service == "local" and not WHISPER_AVAILABLE:
+        print("Local Whisper is not installed. Run: pip install openai-whisper")
+        return
+
+    paths = sorted(os.path.join(args.folder, name) for name in os.listdir(args.folder)
+                   if os.path.splitext(name)[1].lower() in AUDIO_EXTENSIONS)
+    os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+
+    jobs = JobQueue(JOBS_FILE)
+    new = jobs.add(paths)
+    if args.retry_failed:
+        jobs.retry_failed()
+    counts = jobs.counts()
+    print(f"\n{len(paths)} recordings in {args.folder} ({new} new), "
+          f"{counts.get('done', 0)} already done, {counts.get('pending', 0)} to do")
+    if not counts.get('pending'):
+        return
+
+    results_path = os.path.join(OUTPUT_FOLDER, RESULTS_FILE)
+    results_size = os.path.getsize(results_path) if os.path.exists(results_path) else 0
+    saved_size = jobs.output_bytes()
+    if saved_size is None:
+        jobs.set_output_bytes(results_size)
+    elif results_size > saved_size:
+        # Lines written after the last recording marked done belong to recordings that run again
+        with open(results_path, 'r+b') as f:
+            f.truncate(saved_size)
+
+    backend = make_backend(args.service)
+    cache = TranscriptCache(TRANSCRIPT_CACHE_FILE, TRANSCRIPT_CACHE_MAX_MB)
+    # Local Whisper already uses the whole CPU/GPU: one worker, batching several recordings
+    workers = 1 if args.service == "local" else max(1, args.workers)
+    group_size = FILES_PER_GROUP if args.service == "local" else 1
+
+    stop = threading.Event()
+    write_lock = threading.Lock()
+    totals = {'files': 0, 'audio_seconds': 0.0}
+    start = time.perf_counter()
+    print(f"Transcribing with {backend.name}, {workers} at a time (Ctrl+C to stop, run again to resume)\n")
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_worker, jobs, backend, cache, results_path, group_size, write_lock, stop, totals)
+                   for _ in range(workers)]
+        try:
+            for future in futures:
+                future.result()
+        except KeyboardInterrupt:
+            stop.set()
+            print("\nStopping after the recordings in progress... run again to resume.")
+
+    seconds = time.perf_counter() - start
+    audio_minutes = totals['audio_seconds'] / 60
+    print(f"\n{totals['files']} recordings, {audio_minutes:.1f} minutes of audio in {seconds / 60:.1f} minutes "
+          f"({audio_minutes / (seconds / 60):.1f} audio minutes per minute)")
+    print(f"Transcripts: {results_path}")
+
+    failed = jobs.failed()
+    if failed:
+        print(f"\n{len(failed)} recordings failed (run with --retry-failed to try again):")
+        for path, error in failed:
+            print(f"  {os.path.basename(path)}: {error}")
+
+
+if __name__ == "__main__":
+    main()
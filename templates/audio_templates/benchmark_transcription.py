@@ -0,0 +1,134 @@
+"""
+Transcription Benchmark
+Time the transcription pipeline and compare backends.
+
+1. Chunking: a synthetic recording is transcribed in one piece (the
+   reference), then in overlapping chunks with different numbers of
+   workers, using the offline stand-in backend; the stitched text must match
+   the reference word for word
+2. Real-time factor per backend: a queue of recordings is transcribed by
+   each backend (stand-in, local Whisper models with and without batching,
+   and optionally the Whisper API). The real-time factor is processing time
+   divided by audio length: 0.1 means an hour of audio takes 6 minutes
+
+Needs pydub and numpy (no internet, no API key, no ffmpeg); local Whisper
+needs openai-whisper. Synthetic recordings are test tones, not speech, so
+local Whisper's text is meaningless for them - list real recordings in
+QUEUE_AUDIO_FILES for realistic numbers.
+
+Run with: python templates/audio_templates/benchmark_transcription.py
+"""
+
+import io
+import os
+import time
+
+from chunked_transcription import load_audio, plan_chunks, transcribe_long_audio
+from local_transcriber import WHISPER_AVAILABLE, LocalWhisperBackend
+from transcription_backends import StandInBackend, WhisperAPIBackend, make_test_audio, wav_bytes
+
+# ============================================
+# CONFIGURATION - Change these values!
+# ============================================
+
+# Chunking: length of the test recording
+RECORDING_MINUTES = 30
+
+# Numbers of chunks transcribed at the same time
+WORKER_COUNTS = [1, 2, 4, 8]
+
+# How the stand-in service behaves: seconds per request, seconds per audio minute,
+# and the share of requests that time out (and are retried)
+LATENCY = 1.0
+SECONDS_PER_AUDIO_MINUTE = 1.0
+FAILURE_RATE = 0.05
+
+# Real-time factor: a queue of recordings transcribed by each backend.
+# Synthetic recordings are used unless real ones are listed in QUEUE_AUDIO_FILES
+QUEUE_FILES = 4
+QUEUE_FILE_MINUTES = 2
+QUEUE_AUDIO_FILES = []
+
+# Local Whisper models and batch sizes to compare
+LOCAL_MODEL_SIZES = ["tiny", "base"]
+LOCAL_BATCH_SIZES = [1, 8]
+
+# The Whisper API costs money: set to True (with OPENAI_API_KEY in .env) to include it
+INCLUDE_API = False
+
+# ============================================
+# BENCHMARK
+# ============================================
+
+def chunking_benchmark():
+    print("\n--- Chunking (stand-in backend) ---")
+
+    audio = make_test_audio(RECORDING_MINUTES * 60)
+    reference = StandInBackend(latency=0).transcribe(io.BytesIO(wav_bytes(audio)), "recording.wav")['text']
+    backend = StandInBackend(LATENCY, SECONDS_PER_AUDIO_MINUTE, FAILURE_RATE)
+    print(f"\n{RECORDING_MINUTES} minute recording, {len(plan_chunks(audio))} chunks, "
+          f"{len(reference.split()):,} words")
+
+    print(f"\n{'Workers':>8} {'Time':>9} {'Speedup':>9} {'Audio min/min':>14} {'Text matches':>13}")
+    first = None
+    for workers in WORKER_COUNTS:
+        start = time.perf_counter()
+        result = transcribe_long_audio(audio, backend, workers=workers)
+        seconds = time.perf_counter() - start
+        first = first or seconds
+        print(f"{workers:>8} {seconds:>8.1f}s {first / seconds:>8.1f}x "
+              f"{RECORDING_MINUTES / (seconds / 60):>14.0f} {str(result['text'] == reference):>13}")
+
+
+def queue_files():
+    """(WAV bytes, filename) for every recording in the queue."""
+    if QUEUE_AUDIO_FILES:
+        return [(wav_bytes(load_audio(path, path)), os.path.basename(path) + ".wav") for path in QUEUE_AUDIO_FILES]
+    return [(wav_bytes(make_test_audio(QUEUE_FILE_MINUTES * 60, seed=i)), f"recording_{i}.wav")
+            for i in range(QUEUE_FILES)]
+
+
+def backends_to_compare():
+    """(label, batch size or None, function that creates the backend)"""
+    backends = [("stand-in", None, lambda: StandInBackend(LATENCY, SECONDS_PER_AUDIO_MINUTE))]
+    if WHISPER_AVAILABLE:
+        for size in LOCAL_MODEL_SIZES:
+            for batch_size in LOCAL_BATCH_SIZES:
+                backends.append((f"local whisper {size}", batch_size,
+                                 lambda size=size, batch_size=batch_size: LocalWhisperBackend(size, batch_size=batch_size)))
+    else:
+        print("(local Whisper not installed: pip install openai-whisper)")
+    if INCLUDE_API:
+        backends.append(("whisper api", None, lambda: WhisperAPIBackend(os.getenv('OPENAI_API_KEY'))))
+    return backends
+
+
+def real_time_factor_benchmark():
+    files = queue_files()
+    audio_seconds = sum(len(load_audio(io.BytesIO(data), name)) for data, name in files) / 1000
+    print(f"\n--- Real-time factor ({len(files)} recordings, {audio_seconds / 60:.1f} minutes of audio) ---")
+    print(f"\n{'Backend':<22} {'Batch':>6} {'Load':>8} {'Transcribe':>11} {'RTF':>7} {'Audio min/min':>14}")
+
+    for label, batch_size, make_backend in backends_to_compare():
+        start = time.perf_counter()
+        backend = make_backend()
+        load_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        backend.transcribe_many([(io.BytesIO(data), name) for data, name in files])
+        seconds = time.perf_counter() - start
+        print(f"{label:<22} {batch_size or '-':>6} {load_seconds:>7.1f}s {seconds:>10.1f}s "
+              f"{seconds / audio_seconds:>7.3f} {audio_seconds / seconds:>14.1f}")
+
+
+def main():
+    print("=" * 60)
+    print("Transcription Benchmark")
+    print("=" * 60)
+
+    chunking_benchmark()
+    real_time_factor_benchmark()
+
+
+if __name__ == "__main__":
+    main()
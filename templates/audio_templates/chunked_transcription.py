@@ -0,0 +1,304 @@
+"""
+Chunked Transcription for long recordings
+Transcribe recordings of any length, several pieces at a time.
+
+- The recording is cut into chunks of about 5 minutes (well under the
+  Whisper API's 25 MB limit), at a silence close to each cut so words are
+  not split in half
+- Neighbouring chunks overlap by a few seconds; when the pieces are put
+  back together, the words heard twice are removed
+- A few chunks are sent at the same time; chunks that time out are retried
+  with a growing pause
+- Progress (and the text so far) is reported as each chunk finishes
+- With a TranscriptCache, chunks transcribed before are not sent again
+
+Needs pydub (and ffmpeg for formats other than WAV).
+
+Used by simple_transcriber.py.
+"""
+
+import io
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from difflib import SequenceMatcher
+
+from transcript_cache import audio_hash
+from transcription_backends import PYDUB_AVAILABLE, TemporaryTranscriptionError, wav_bytes
+
+if PYDUB_AVAILABLE:
+    from pydub import AudioSegment
+    from pydub.silence import detect_silence
+
+# Target chunk length; 5 minutes of 16 kHz mono WAV is about 10 MB
+CHUNK_SECONDS = 300
+
+# Seconds heard by both neighbouring chunks
+OVERLAP_SECONDS = 4
+
+# Look this far back from each target cut for a silence to cut at
+SILENCE_SEARCH_SECONDS = 30
+
+# Shortest pause that counts as a silence (milliseconds)
+MIN_SILENCE_MS = 300
+
+# Chunks sent at the same time
+MAX_WORKERS = 4
+
+# Tries per chunk when the service times out or is busy
+MAX_RETRIES = 3
+
+# Seconds to wait before the first retry (doubles each time)
+BACKOFF_SECONDS = 2
+
+# Speech models work at 16 kHz mono; converting first keeps memory and uploads small
+SAMPLE_RATE = 16000
+
+# Words compared at each join when removing the overlap
+OVERLAP_WORDS = 40
+
+# Word times are estimates: words this many seconds outside the overlap are compared too
+OVERLAP_SLACK_SECONDS = 2
+
+
+def load_audio(file, filename):
+    """Read an audio file (file object or path) as 16 kHz mono, 16-bit."""
+    audio = AudioSegment.from_file(file, format=filename.rsplit('.', 1)[-1].lower())
+    return audio.set_channels(1).set_frame_rate(SAMPLE_RATE).set_sample_width(2)
+
+
+def plan_chunks(audio, chunk_seconds=CHUNK_SECONDS, overlap_seconds=OVERLAP_SECONDS,
+                search_seconds=SILENCE_SEARCH_SECONDS):
+    """
+    Where to cut the recording.
+
+    Each cut is placed in the middle of the longest silence in the
+    `search_seconds` before the target length (or at the target length if
+    there is no silence), and the chunks on both sides of it reach
+    `overlap_seconds / 2` past it.
+
+    Returns:
+        List of (start ms, end ms)
+    """
+    chunk_ms, half_overlap, search_ms = chunk_seconds * 1000, overlap_seconds * 500, search_seconds * 1000
+    threshold = audio.dBFS - 16 if audio.dBFS > float('-inf') else -50
+    spans = []
+    start = 0
+
+    while len(audio) - start > chunk_ms:
+        target = start + chunk_ms
+        window_start = max(start + half_overlap * 2, target - search_ms)
+        silences = detect_silence(audio[window_start:target], min_silence_len=MIN_SILENCE_MS,
+                                  silence_thresh=threshold)
+        cut = target
+        if silences:
+            silence_start, silence_end = max(silences, key=lambda s: (s[1] - s[0], s[0]))
+            cut = window_start + (silence_start + silence_end) // 2
+
+        spans.append((max(0, start - half_overlap), min(len(audio), cut + half_overlap)))
+        start = cut
+
+    spans.append((max(0, start - half_overlap), len(audio)))
+    return spans
+
+
+def _normalize(word):
+    return re.sub(r'[^\w]', '', word.lower())
+
+
+def _words(segments, chunk):
+    # Split segments into words, spreading each segment's time over its words by length
+    for number, segment in enumerate(segments):
+        words = segment['text'].split()
+        seconds_per_char = (segment['end'] - segment['start']) / max(1, sum(len(w) for w in words))
+        t = segment['start']
+        for word in words:
+            yield {'word': word, 'start': t, 'end': t + len(word) * seconds_per_char, 'segment': (chunk, number)}
+            t += len(word) * seconds_per_char
+
+
+def _middle(word):
+    return (word['start'] + word['end']) / 2
+
+
+def _join(words, new, overlap_start, overlap_end, overlap_words=OVERLAP_WORDS, slack=OVERLAP_SLACK_SECONDS):
+    """
+    Where two overlapping chunks meet.
+
+    Only words heard during the overlap (give or take `slack` seconds) are
+    compared: the longest run of at least 2 words shared by the end of the
+    text so far and the start of the next chunk. Without one, the cut is
+    made in the middle of the overlap.
+
+    Returns:
+        (words to keep of the text so far, first word to keep of the next chunk)
+    """
+    first = len(words)
+    while first > 0 and len(words) - first < overlap_words and _middle(words[first - 1]) >= overlap_start - slack:
+        first -= 1
+    last = 0
+    while last < min(len(new), overlap_words) and _middle(new[last]) <= overlap_end + slack:
+        last += 1
+
+    tail, head = words[first:], new[:last]
+    if tail and head:
+        matcher = SequenceMatcher(None, [_normalize(w['word']) for w in tail],
+                                  [_normalize(w['word']) for w in head], autojunk=False)
+        a, b, size = matcher.find_longest_match(0, len(tail), 0, len(head))
+        if size >= 2:
+            return first + a + size, b + size
+
+    cut = (overlap_start + overlap_end) / 2
+    keep = len(words)
+    while keep > 0 and _middle(words[keep - 1]) >= cut:
+        keep -= 1
+    skip = 0
+    while skip < len(new) and _middle(new[skip]) < cut:
+        skip += 1
+    return keep, skip
+
+
+def stitch(chunks, spans=None, overlap_words=OVERLAP_WORDS):
+    """
+    Join the segments of overlapping chunks, removing the words heard twice.
+
+    At each join, the words heard during the overlap are matched (see
+    _join); the text switches to the next chunk right after the shared
+    words. Words at the very edge of a chunk (often cut in half) are
+    dropped this way too.
+
+    Args:
+        chunks: One list of segments ({'start', 'end', 'text'}, seconds from
+            the start of the recording) per chunk, in order
+        spans: (start ms, end ms) of each chunk, as from plan_chunks. If not
+            given, each chunk is taken to run from its first to its last word
+
+    Returns:
+        List of segments
+    """
+    words = []
+    previous_end = None     # seconds
+    for chunk, segments in enumerate(chunks):
+        new = list(_words(segments, chunk))
+        if spans is not None:
+            start, end = spans[chunk][0] / 1000, spans[chunk][1] / 1000
+        elif new:
+            start, end = new[0]['start'], new[-1]['end']
+        else:
+            continue
+
+        if words and new and previous_end is not None:
+            keep, skip = _join(words, new, start, previous_end, overlap_words)
+            del words[keep:]
+            new = new[skip:]
+        words.extend(new)
+        previous_end = end
+
+    # Words from the same original segment form a segment again
+    stitched = []
+    for word in words:
+        if stitched and stitched[-1]['key'] == word['segment']:
+            stitched[-1]['text'] += " " + word['word']
+            stitched[-1]['end'] = word['end']
+        else:
+            stitched.append({'start': word['start'], 'end': word['end'], 'text': word['word'], 'key': word['segment']})
+    return [{'start': round(seg['start'], 3), 'end': round(seg['end'], 3), 'text': seg['text']} for seg in stitched]
+
+
+def segments_text(segments):
+    """The plain text of a list of segments."""
+    return " ".join(segment['text'] for segment in segments)
+
+
+def transcribe_with_retry(backend, data, filename, task="Transcribe", language=None, progress=None,
+                          retries=MAX_RETRIES, backoff=BACKOFF_SECONDS):
+    """
+    Transcribe audio bytes, retrying temporary errors (timeouts, rate
+    limits, server errors) with a growing pause.
+    """
+    for attempt in range(retries):
+        try:
+            return backend.transcribe_many([(io.BytesIO(data), filename)], task, language, progress)[0]
+        except TemporaryTranscriptionError:
+            if attempt == retries - 1:
+                raise
+            time.sleep(backoff * 2 ** attempt)
+
+
+def transcribe_chunk(audio, span, backend, task="Transcribe", language=None, cache=None,
+                     retries=MAX_RETRIES, backoff=BACKOFF_SECONDS):
+    """
+    Transcribe one chunk (or take it from the cache), retrying temporary
+    errors with a growing pause.
+
+    Returns:
+        (segments timed from the start of the recording, True if from the cache)
+    """
+    data = wav_bytes(audio[span[0]:span[1]])
+    key = (audio_hash(data), backend.name, task, language)
+    result = cache.get(*key) if cache else None
+    from_cache = result is not None
+
+    if result is None:
+        result = transcribe_with_retry(backend, data, "chunk.wav", task, language, retries=retries, backoff=backoff)
+        if cache:
+            cache.put(*key, result)
+
+    offset = span[0] / 1000
+    segments = [{'start': seg['start'] + offset, 'end': seg['end'] + offset, 'text': seg['text']}
+                for seg in result['segments']]
+    return segments, from_cache
+
+
+def transcribe_long_audio(audio, backend, task="Transcribe", language=None,
+                          workers=MAX_WORKERS, progress=None, cache=None):
+    """
+    Transcribe a recording of any length in overlapping chunks.
+
+    Args:
+        audio: pydub AudioSegment (see load_audio)
+        backend: A TranscriptionBackend
+        task, language: Passed on to the backend
+        workers: Chunks transcribed at the same time
+        progress: Optional function(chunks done, total chunks, text so far),
+            called as each chunk finishes; "text so far" covers the chunks
+            from the start up to the first one still running
+        cache: Optional TranscriptCache for the chunks
+
+    Returns:
+        {'text': stitched transcript, 'segments': [{'start', 'end', 'text'}] (seconds),
+         'chunks': number of chunks, 'from_cache': chunks taken from the cache, 'seconds': time taken}
+    """
+    started = time.perf_counter()
+    spans = plan_chunks(audio)
+    results = [None] * len(spans)
+    ready = 0   # chunks finished from the start without gaps
+    from_cache = 0
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(transcribe_chunk, audio, span, backend, task, language, cache): i
+            for i, span in enumerate(spans)
+        }
+        try:
+            for done, future in enumerate(as_completed(futures), start=1):
+                results[futures[future]], cached = future.result()
+                from_cache += cached
+                while ready < len(results) and results[ready] is not None:
+                    ready += 1
+                if progress:
+                    progress(done, len(spans), segments_text(stitch(results[:ready], spans)))
+        except BaseException:
+            # One chunk failed for good: do not start the others
+            for future in futures:
+                future.cancel()
+            raise
+
+    segments = stitch(results, spans)
+    return {
+        'text': segments_text(segments),
+        'segments': segments,
+        'chunks': len(spans),
+        'from_cache': from_cache,
+        'seconds': time.perf_counter() - started,
+    }
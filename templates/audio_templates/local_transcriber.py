@@ -0,0 +1,204 @@
+"""
+Local Transcriber - Offline Speech-to-Text with Whisper
+Transcribe audio on your own computer: no API key, no costs, no uploads.
+
+- The Whisper model is loaded once and reused for every file
+- Each file is cut into windows of under 30 seconds (at pauses, with a
+  little overlap), and windows from several files are transcribed together
+  in batches, which is much faster than one window at a time
+- Works as a backend for simple_transcriber.py ("Local Whisper" in the
+  sidebar), or on its own for a folder of recordings (below)
+
+Needs: pip install openai-whisper pydub (and ffmpeg for formats other than WAV)
+
+Run with: python templates/audio_templates/local_transcriber.py
+"""
+
+import glob
+import os
+import time
+
+import numpy as np
+
+from chunked_transcription import load_audio, plan_chunks, segments_text, stitch
+from subtitles import write_subtitles
+from transcription_backends import TranscriptionBackend
+
+try:
+    import torch
+    import whisper
+    WHISPER_AVAILABLE = True
+except ImportError:
+    WHISPER_AVAILABLE = False
+
+# ============================================
+# CONFIGURATION - Change these values!
+# ============================================
+
+# Folder with the recordings, and where the transcripts (.txt and .srt subtitles) go
+AUDIO_FOLDER = "data/raw"
+OUTPUT_FOLDER = "data/processed"
+AUDIO_EXTENSIONS = ['.mp3', '.wav', '.m4a', '.flac', '.ogg', '.webm', '.mp4']
+
+# Model size: tiny, base, small, medium or large (bigger = better but slower)
+MODEL_SIZE = "base"
+
+# Windows transcribed together (lower this if you run out of memory)
+BATCH_SIZE = 8
+
+# Files read into memory at a time
+FILES_PER_GROUP = 4
+
+MODEL_SIZES = ["tiny", "base", "small", "medium", "large"]
+
+# Whisper listens to 30 seconds at a time; windows stay below that, overlap included
+WINDOW_SECONDS = 26
+WINDOW_OVERLAP_SECONDS = 2
+WINDOW_SEARCH_SECONDS = 6
+
+# Windows Whisper thinks are silence (and is unsure about) are dropped
+NO_SPEECH_THRESHOLD = 0.6
+LOGPROB_THRESHOLD = -1.0
+
+
+# ============================================
+# BACKEND
+# ============================================
+
+class LocalWhisperBackend(TranscriptionBackend):
+    """
+    OpenAI's open-source Whisper model, running locally (CPU or GPU).
+
+    Usage:
+        backend = LocalWhisperBackend("base")
+        results = backend.transcribe_many([("a.wav", "a.wav"), ("b.wav", "b.wav")])
+        results[0]['segments']   # [{'start', 'end', 'text'}, ...]
+    """
+
+    def __init__(self, model_size=MODEL_SIZE, device=None, batch_size=BATCH_SIZE):
+        self.name = f"local-whisper-{model_size}"
+        self.batch_size = batch_size
+        self.model = whisper.load_model(model_size, device=device)
+        self.audio_seconds = 0.0    # audio transcribed so far
+        self._tokenizer = whisper.tokenizer.get_tokenizer(self.model.is_multilingual,
+                                                          num_languages=self.model.num_languages)
+
+    def transcribe(self, audio_file, filename, task="Transcribe", language=None):
+        return self.transcribe_many([(audio_file, filename)], task, language)[0]
+
+    def transcribe_many(self, files, task="Transcribe", language=None, progress=None):
+        """
+        Transcribe several files, batching their windows together.
+
+        `files` is a list of (file object or path, filename); progress, if
+        given, is called as function(windows done, total windows).
+        """
+        audios = [load_audio(audio_file, filename) for audio_file, filename in files]
+        self.audio_seconds += sum(len(audio) for audio in audios) / 1000
+        windows = [
+            (i, start, end)
+            for i, audio in enumerate(audios)
+            for start, end in plan_chunks(audio, WINDOW_SECONDS, WINDOW_OVERLAP_SECONDS, WINDOW_SEARCH_SECONDS)
+        ]
+        options = whisper.DecodingOptions(
+            task="translate" if task == "Translate to English" else "transcribe",
+            language=language or None,
+            fp16=self.model.device.type == "cuda",
+        )
+
+        chunks = [[] for _ in files]    # segments of each window, per file
+        spans = [[] for _ in files]     # (start ms, end ms) of each window, per file
+        for first in range(0, len(windows), self.batch_size):
+            batch = windows[first:first + self.batch_size]
+            mels = torch.stack([self._mel(audios[i][start:end]) for i, start, end in batch]).to(self.model.device)
+            with torch.no_grad():
+                results = whisper.decode(self.model, mels, options)
+
+            for (i, start, end), result in zip(batch, results):
+                silent = result.no_speech_prob > NO_SPEECH_THRESHOLD and result.avg_logprob < LOGPROB_THRESHOLD
+                chunks[i].append([] if silent else self._segments(result.tokens, start / 1000, end / 1000))
+                spans[i].append((start, end))
+            if progress:
+                progress(first + len(batch), len(windows))
+
+        results = []
+        for file_chunks, file_spans in zip(chunks, spans):
+            segments = stitch(file_chunks, file_spans)
+            results.append({'text': segments_text(segments), 'segments': segments})
+        return results
+
+    def _segments(self, tokens, offset, window_end):
+        """
+        Timed segments from a window's tokens. Whisper writes a timestamp
+        token before and after each piece of text: <|0.00|> Hello. <|2.40|>
+        """
+        timestamp_begin = self._tokenizer.timestamp_begin
+        segments, start, text = [], 0.0, []
+        for token in tokens:
+            if token >= timestamp_begin:
+                t = (token - timestamp_begin) * 0.02
+                if text:
+                    segments.append({'start': offset + start, 'end': offset + t,
+                                     'text': self._tokenizer.decode(text).strip()})
+                    text = []
+                start = t
+            else:
+                text.append(token)
+        if text:
+            segments.append({'start': offset + start, 'end': window_end, 'text': self._tokenizer.decode(text).strip()})
+        return [segment for segment in segments if segment['text']]
+
+    def _mel(self, audio):
+        # Log-Mel spectrogram of one window, padded to 30 seconds
+        # (samples scaled to -1..1 whatever the sample width)
+        full_scale = float(1 << (8 * audio.sample_width - 1))
+        samples = torch.from_numpy(np.array(audio.get_array_of_samples(), dtype=np.float32) / full_scale)
+        return whisper.log_mel_spectrogram(whisper.pad_or_trim(samples), n_mels=self.model.dims.n_mels)
+
+
+# ============================================
+# TRANSCRIBE A FOLDER
+# ============================================
+
+def main():
+    print("=" * 60)
+    print("Local Transcriber (Whisper)")
+    print("=" * 60)
+
+    if not WHISPER_AVAILABLE:
+        print("Whisper is not installed. Run: pip install openai-whisper")
+        return
+
+    paths = sorted(path for path in glob.glob(os.path.join(AUDIO_FOLDER, "*"))
+                   if os.path.splitext(path)[1].lower() in AUDIO_EXTENSIONS)
+    if not paths:
+        print(f"No audio files found in {AUDIO_FOLDER}")
+        return
+    os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+
+    print(f"\nLoading the '{MODEL_SIZE}' model...")
+    backend = LocalWhisperBackend(MODEL_SIZE)
+
+    total_time = 0.0
+    for first in range(0, len(paths), FILES_PER_GROUP):
+        group = paths[first:first + FILES_PER_GROUP]
+        start = time.perf_counter()
+        results = backend.transcribe_many([(path, os.path.basename(path)) for path in group])
+        total_time += time.perf_counter() - start
+
+        for path, result in zip(group, results):
+            output_path = os.path.join(OUTPUT_FOLDER, os.path.splitext(os.path.basename(path))[0])
+            with open(output_path + ".txt", 'w', encoding='utf-8') as f:
+                f.write(result['text'])
+            write_subtitles(result['segments'], output_path + ".srt")
+            print(f"Transcribed: {os.path.basename(path)} -> {output_path}.txt / .srt")
+
+    audio_minutes = backend.audio_seconds / 60
+    summary = f"\n{len(paths)} files, {audio_minutes:.1f} minutes of audio in {total_time / 60:.1f} minutes"
+    if audio_minutes > 0:
+        summary += f" (real-time factor {total_time / 60 / audio_minutes:.2f})"
+    print(summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,32 @@
 """
 Simple Audio Transcriber - Streamlit Web App
-Transcribe audio files using OpenAI's Whisper API.
+Transcribe audio files using OpenAI's Whisper API, or offline with a local
+Whisper model. Long recordings are cut into overlapping chunks and
+transcribed in parallel. Transcripts are cached, so the same audio is never
+transcribed (or paid for) twice.
 
 Run with: streamlit run templates/audio_templates/simple_transcriber.py
 """
 
 import streamlit as st
+import io
 import os
-import tempfile
 
-# Try to import OpenAI
-try:
-    from openai import OpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
+# Transcription services (OpenAI needs the openai library; long files and local Whisper need pydub)
+from transcription_backends import (OPENAI_AVAILABLE, PYDUB_AVAILABLE, TASKS,
+                                    StandInBackend, WhisperAPIBackend)
+from chunked_transcription import MAX_WORKERS, load_audio, transcribe_long_audio, transcribe_with_retry
+from local_transcriber import MODEL_SIZE, MODEL_SIZES, WHISPER_AVAILABLE, LocalWhisperBackend
+from subtitles import iter_srt, iter_vtt
+from transcript_cache import TranscriptCache, audio_hash
+
+API_SERVICE = "OpenAI Whisper API"
+LOCAL_SERVICE = "Local Whisper (offline)"
+STAND_IN_SERVICE = "Offline stand-in (testing)"
+
+# Transcripts of audio transcribed before are saved here (up to this many MB)
+TRANSCRIPT_CACHE_FILE = "data/processed/transcript_cache.sqlite"
+TRANSCRIPT_CACHE_MAX_MB = 200
 
 # Try to load environment variables
 try:
@@ -33,46 +45,80 @@ st.set_page_config(
 st.title("🎤 Audio Transcriber")
 st.write("Convert speech to text using AI!")
 
-# Check for OpenAI library
-if not OPENAI_AVAILABLE:
-    st.error("OpenAI library not installed. Run: `pip install openai`")
-    st.stop()
-
-# --- Sidebar: API Key ---
+# --- Sidebar: Service ---
 st.sidebar.header("Settings")
 
-# API Key input
-api_key = st.sidebar.text_input(
-    "OpenAI API Key",
-    type="password",
-    value=os.getenv('OPENAI_API_KEY', ''),
-    help="Get your key at https://platform.openai.com/api-keys"
-)
+services = [name for name, available in [
+    (API_SERVICE, OPENAI_AVAILABLE),
+    (LOCAL_SERVICE, WHISPER_AVAILABLE and PYDUB_AVAILABLE),
+    (STAND_IN_SERVICE, PYDUB_AVAILABLE),
+] if available]
 
-if not api_key:
-    st.warning("Please enter your OpenAI API key in the sidebar to continue.")
-    st.info("""
-    **How to get an API key:**
-    1. Go to https://platform.openai.com/api-keys
-    2. Create a new key
-    3. Copy and paste it in the sidebar
-
-    **Or** add it to your `.env` file:
-    ```
-    OPENAI_API_KEY=sk-your-key-here
-    ```
-    """)
+if not services:
+    st.error("No transcription service available. Run: `pip install openai` "
+             "(or `pip install openai-whisper pydub` for offline transcription)")
     st.stop()
 
-# Initialize OpenAI client
-client = OpenAI(api_key=api_key)
+service = st.sidebar.selectbox(
+    "Service", services,
+    help="The API is fast but costs money. Local Whisper runs on this computer "
+         "(free, offline, slower). The stand-in only recognises test tones, for trying the app."
+)
+
+
+@st.cache_resource(show_spinner="Loading the transcription model (only the first time)...")
+def get_backend(service, api_key=None, model_size=None):
+    """One backend per service and setting for the whole app, so a local model is loaded only once."""
+    if service == API_SERVICE:
+        return WhisperAPIBackend(api_key)
+    if service == LOCAL_SERVICE:
+        return LocalWhisperBackend(model_size)
+    return StandInBackend()
+
+
+@st.cache_resource
+def get_transcript_cache(path, max_mb):
+    return TranscriptCache(path, max_mb)
+
+
+if service == API_SERVICE:
+    # API Key input
+    api_key = st.sidebar.text_input(
+        "OpenAI API Key",
+        type="password",
+        value=os.getenv('OPENAI_API_KEY', ''),
+        help="Get your key at https://platform.openai.com/api-keys"
+    )
+
+    if not api_key:
+        st.warning("Please enter your OpenAI API key in the sidebar to continue.")
+        st.info("""
+        **How to get an API key:**
+        1. Go to https://platform.openai.com/api-keys
+        2. Create a new key
+        3. Copy and paste it in the sidebar
+
+        **Or** add it to your `.env` file:
+        ```
+        OPENAI_API_KEY=sk-your-key-here
+        ```
+        """)
+        st.stop()
+
+    backend = get_backend(service, api_key=api_key)
+elif service == LOCAL_SERVICE:
+    model_size = st.sidebar.selectbox("Model Size", MODEL_SIZES, index=MODEL_SIZES.index(MODEL_SIZE),
+                                      help="Bigger models are more accurate but slower")
+    backend = get_backend(service, model_size=model_size)
+else:
+    backend = get_backend(service)
 
 # Options
 st.sidebar.subheader("Transcription Options")
 
 task = st.sidebar.selectbox(
     "Task",
-    ["Transcribe", "Translate to English"],
+    TASKS,
     help="Translate converts any language to English"
 )
 
@@ -82,13 +128,32 @@ language = st.sidebar.text_input(
     help="Leave empty for auto-detection. Use ISO codes: en, es, fr, de, etc."
 )
 
+# Long recordings (services with a size limit per request)
+always_chunk, workers = False, MAX_WORKERS
+if backend.max_bytes:
+    st.sidebar.subheader("Long Recordings")
+    always_chunk = st.sidebar.checkbox(
+        "Split every file into chunks",
+        help="Files over 25MB are always split into ~5 minute chunks (cut at silences, "
+             "with a few seconds of overlap). Turn this on to split smaller files too."
+    )
+    workers = st.sidebar.slider("Chunks at the same time", 1, 8, MAX_WORKERS)
+
+# Cache
+transcript_cache = get_transcript_cache(TRANSCRIPT_CACHE_FILE, TRANSCRIPT_CACHE_MAX_MB)
+st.sidebar.caption(f"{transcript_cache.count():,} transcripts in the cache "
+                   f"({transcript_cache.size_bytes() / 1024 / 1024:.1f} of {TRANSCRIPT_CACHE_MAX_MB} MB)")
+if st.sidebar.button("Clear Cache"):
+    transcript_cache.clear()
+    st.rerun()
+
 # --- Main Interface ---
 st.header("1. Upload Audio File")
 
 uploaded_file = st.file_uploader(
     "Choose an audio file",
     type=['mp3', 'mp4', 'm4a', 'wav', 'webm', 'ogg', 'flac'],
-    help="Max file size: 25MB"
+    help="Files over 25MB are split into chunks (needs pydub, and ffmpeg for formats other than WAV)"
 )
 
 if uploaded_file:
@@ -96,11 +161,13 @@ if uploaded_file:
     st.write(f"**File:** {uploaded_file.name}")
     st.write(f"**Size:** {uploaded_file.size / 1024 / 1024:.2f} MB")
 
-    # Check file size
-    if uploaded_file.size > 25 * 1024 * 1024:
-        st.error("File is too large! Maximum size is 25MB.")
-        st.info("Tip: You can compress or split the audio file using tools like Audacity.")
+    # Large files are split into chunks
+    use_chunks = bool(backend.max_bytes) and (always_chunk or uploaded_file.size > backend.max_bytes)
+    if use_chunks and not PYDUB_AVAILABLE:
+        st.error("Files over 25MB are split into chunks, which needs pydub: `pip install pydub`")
         st.stop()
+    if use_chunks:
+        st.write("**Mode:** split into chunks, transcribed in parallel")
 
     # Audio player
     st.audio(uploaded_file)
@@ -109,43 +176,65 @@ if uploaded_file:
     st.header("2. Transcribe")
 
     if st.button("Start Transcription", type="primary"):
-        with st.spinner("Transcribing... This may take a moment."):
+        # The same audio with the same settings was transcribed before: use that
+        data = uploaded_file.getvalue()
+        cache_key = (audio_hash(data), backend.name, task, language or None)
+        cached = transcript_cache.get(*cache_key)
+
+        # Show progress (and the text so far) as parts finish
+        progress_bar = st.progress(0.0, text="Transcribing...")
+        preview = st.empty()
+
+        def show_progress(done, total, text_so_far=None):
+            progress_bar.progress(done / total, text=f"Transcribed {done} of {total} parts")
+            if text_so_far:
+                preview.caption(f"...{text_so_far[-300:]}")
+
+        if cached:
+            progress_bar.empty()
+            st.session_state['transcript'] = cached['text']
+            st.session_state['segments'] = cached['segments']
+            st.success("Transcription complete! (from the cache - this audio was transcribed before)")
+
+        elif use_chunks:
             try:
-                # Save uploaded file to temp location
-                with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(uploaded_file.name)[1]) as tmp:
-                    tmp.write(uploaded_file.getvalue())
-                    tmp_path = tmp.name
-
-                # Open and transcribe
-                with open(tmp_path, 'rb') as audio_file:
-                    if task == "Translate to English":
-                        # Translation
-                        result = client.audio.translations.create(
-                            model="whisper-1",
-                            file=audio_file
-                        )
-                    else:
-                        # Transcription
-                        params = {
-                            "model": "whisper-1",
-                            "file": audio_file
-                        }
-                        if language:
-                            params["language"] = language
-
-                        result = client.audio.transcriptions.create(**params)
-
-                # Clean up temp file
-                os.unlink(tmp_path)
-
-                # Store result
-                st.session_state['transcript'] = result.text
-                st.success("Transcription complete!")
+                with st.spinner("Reading audio..."):
+                    audio = load_audio(io.BytesIO(data), uploaded_file.name)
+
+                result = transcribe_long_audio(audio, backend, task, language or None,
+                                               workers=workers, progress=show_progress, cache=transcript_cache)
+                preview.empty()
+                transcript_cache.put(*cache_key, {'text': result['text'], 'segments': result['segments']})
+
+                st.session_state['transcript'] = result['text']
+                st.session_state['segments'] = result['segments']
+                reused = f", {result['from_cache']} from the cache" if result['from_cache'] else ""
+                st.success(f"Transcription complete! {result['chunks']} chunks{reused} "
+                           f"in {result['seconds']:.0f} seconds.")
 
             except Exception as e:
                 st.error(f"Error during transcription: {e}")
+                if "ffmpeg" in str(e).lower() or isinstance(e, FileNotFoundError):
+                    st.info("Reading this format needs ffmpeg (https://ffmpeg.org), or convert the file to WAV.")
                 if "invalid_api_key" in str(e).lower():
                     st.info("Please check your API key.")
+        else:
+            with st.spinner("Transcribing... This may take a moment."):
+                try:
+                    # Sent straight from memory (no temporary file); timeouts and rate limits are retried
+                    result = transcribe_with_retry(backend, data, uploaded_file.name, task, language or None,
+                                                   progress=show_progress)
+                    transcript_cache.put(*cache_key, result)
+
+                    # Store result
+                    st.session_state['transcript'] = result['text']
+                    st.session_state['segments'] = result['segments']
+                    st.success("Transcription complete!")
+
+                except Exception as e:
+                    st.error(f"Error during transcription: {e}")
+                    if "invalid_api_key" in str(e).lower():
+                        st.info("Please check your API key.")
 
 # --- Results ---
 if 'transcript' in st.session_state:
@@ -169,7 +258,8 @@ if 'transcript' in st.session_state:
     # Download options
     st.subheader("Download")
 
-    col1, col2 = st.columns(2)
+    segments = st.session_state.get('segments', [])
+    col1, col2, col3 = st.columns(3)
 
     with col1:
         st.download_button(
@@ -179,19 +269,29 @@ if 'transcript' in st.session_state:
             mime="text/plain"
         )
 
+    # Subtitles, timed from the transcript's segments
     with col2:
-        # Create SRT-like format (simple)
-        srt_content = f"1\n00:00:00,000 --> 00:00:00,000\n{transcript}\n"
         st.download_button(
             "Download as SRT",
-            srt_content,
+            "".join(iter_srt(segments)),
             file_name="transcript.srt",
-            mime="text/plain"
+            mime="text/plain",
+            disabled=not segments
+        )
+
+    with col3:
+        st.download_button(
+            "Download as VTT",
+            "".join(iter_vtt(segments)),
+            file_name="transcript.vtt",
+            mime="text/vtt",
+            disabled=not segments
         )
 
     # Clear button
     if st.button("Clear & Start Over"):
         del st.session_state['transcript']
+        st.session_state.pop('segments', None)
         st.rerun()
 
 else:
@@ -205,9 +305,10 @@ with st.expander("Tips & Information"):
     **Supported Formats:**
     - MP3, MP4, M4A, WAV, WebM, OGG, FLAC
 
-    **File Size Limit:**
-    - Maximum 25MB per file
-    - For larger files, split them using audio editing software
+    **Long Recordings:**
+    - Files over 25MB are split into ~5 minute chunks at silences and transcribed in parallel
+    - Streamlit accepts uploads up to 200MB; raise it with `streamlit run ... --server.maxUploadSize 1000`
+    - Formats other than WAV need ffmpeg installed to be split
 
     **Languages:**
     - Whisper supports 50+ languages
@@ -219,8 +320,9 @@ with st.expander("Tips & Information"):
     - 10 minutes of audio = ~$0.06
 
     **For Free/Offline Transcription:**
-    - Install local Whisper: `pip install openai-whisper`
-    - See `local_transcriber.py` template
+    - Install local Whisper: `pip install openai-whisper pydub`
+    - Choose "Local Whisper (offline)" under Service; the model is loaded once and reused
+    - For a whole folder of recordings, see the `local_transcriber.py` template
     """)
 
 # --- Footer ---
@@ -0,0 +1,80 @@
+"""
+Subtitles for the audio templates
+Turn timed transcript segments into SRT or WebVTT subtitle files.
+
+- Long segments are split into cues of at most two lines of 42 characters
+  (a common subtitle limit); each cue gets a share of the segment's time
+  in proportion to its length
+- Cues are produced one at a time and can be written straight to a file,
+  so a transcript of many hours never exists as several formatted copies
+  in memory
+
+Used by simple_transcriber.py and local_transcriber.py.
+"""
+
+import textwrap
+
+# Longest subtitle line, and lines per cue
+MAX_LINE_CHARS = 42
+MAX_LINES = 2
+
+
+def format_timestamp(seconds, separator=","):
+    """00:01:02,345 (SRT) or, with separator=".", 00:01:02.345 (WebVTT)."""
+    milliseconds = max(0, int(round(seconds * 1000)))
+    hours, milliseconds = divmod(milliseconds, 3_600_000)
+    minutes, milliseconds = divmod(milliseconds, 60_000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{separator}{milliseconds:03d}"
+
+
+def iter_cues(segments, max_line_chars=MAX_LINE_CHARS, max_lines=MAX_LINES):
+    """
+    Split segments into cues that fit on screen.
+
+    Args:
+        segments: Iterable of {'start', 'end', 'text'} (seconds)
+
+    Yields:
+        (start seconds, end seconds, list of lines)
+    """
+    for segment in segments:
+        lines = textwrap.wrap(segment['text'], max_line_chars, break_long_words=False)
+        if not lines:
+            continue
+        cues = [lines[i:i + max_lines] for i in range(0, len(lines), max_lines)]
+        seconds_per_char = (segment['end'] - segment['start']) / sum(len(" ".join(cue)) for cue in cues)
+
+        start = segment['start']
+        for cue in cues:
+            end = start + len(" ".join(cue)) * seconds_per_char
+            yield start, end, cue
+            start = end
+
+
+def iter_srt(segments, **options):
+    """SRT file, one cue at a time (options as for iter_cues)."""
+    for number, (start, end, lines) in enumerate(iter_cues(segments, **options), start=1):
+        yield f"{number}\n{format_timestamp(start)} --> {format_timestamp(end)}\n" + "\n".join(lines) + "\n\n"
+
+
+def iter_vtt(segments, **options):
+    """WebVTT file, one cue at a time (options as for iter_cues)."""
+    yield "WEBVTT\n\n"
+    for start, end, lines in iter_cues(segments, **options):
+        text = "\n".join(lines).replace("-->", "->")   # "-->" is not allowed in WebVTT cue text
+        yield f"{format_timestamp(start, '.')} --> {format_timestamp(end, '.')}\n{text}\n\n"
+
+
+FORMATS = {"srt": iter_srt, "vtt": iter_vtt}
+
+
+def write_subtitles(segments, path, subtitle_format=None, **options):
+    """
+    Write segments to a subtitle file, cue by cue.
+
+    The format ("srt" or "vtt") is taken from the file extension unless given.
+    """
+    subtitle_format = subtitle_format or path.rsplit('.', 1)[-1].lower()
+    with open(path, 'w', encoding='utf-8') as f:
+        f.writelines(FORMATS[subtitle_format](segments, **options))
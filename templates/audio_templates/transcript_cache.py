@@ -0,0 +1,114 @@
+"""
+Transcript Cache for the audio templates
+Never pay twice for transcribing the same audio.
+
+- Transcripts are saved in a small SQLite file, keyed by a fingerprint
+  (SHA-256 hash) of the audio itself plus the backend/model, task and
+  language - renaming a file does not matter, changing a setting does
+- Chunks of long recordings are cached one by one, so a transcription that
+  stopped half-way only pays for the missing chunks when run again
+- The cache has a size limit; the transcripts used least recently are
+  removed first
+
+Used by simple_transcriber.py and chunked_transcription.py.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Size limit of the cache file's transcripts (megabytes)
+DEFAULT_MAX_MB = 200
+
+
+def audio_hash(data):
+    """Fingerprint of audio bytes (the same audio always gives the same hash)."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class TranscriptCache:
+    """
+    Saved transcription results, one SQLite file.
+
+    Usage:
+        cache = TranscriptCache("data/processed/transcript_cache.sqlite", max_mb=500)
+        key = (audio_hash(data), backend.name, "Transcribe", "en")
+        result = cache.get(*key)
+        if result is None:
+            result = backend.transcribe(io.BytesIO(data), "audio.wav", "Transcribe", "en")
+            cache.put(*key, result)
+    """
+
+    def __init__(self, path, max_mb=DEFAULT_MAX_MB):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS transcripts (
+                audio_hash TEXT,
+                backend TEXT,
+                task TEXT,
+                language TEXT,
+                result TEXT,
+                size INTEGER,
+                used REAL,
+                PRIMARY KEY (audio_hash, backend, task, language)
+            )
+        """)
+        self._db.commit()
+
+    def get(self, audio_hash, backend, task, language):
+        """The saved result ({'text', 'segments'}), or None."""
+        key = (audio_hash, backend, task, language or "")
+        with self._lock:
+            row = self._db.execute(
+                "SELECT result FROM transcripts WHERE audio_hash = ? AND backend = ? AND task = ? AND language = ?",
+                key
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE transcripts SET used = ? WHERE audio_hash = ? AND backend = ? AND task = ? AND language = ?",
+                (time.time(),) + key
+            )
+            self._db.commit()
+        return json.loads(row[0])
+
+    def put(self, audio_hash, backend, task, language, result):
+        data = json.dumps(result)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO transcripts VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (audio_hash, backend, task, language or "", data, len(data), time.time())
+            )
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        # Remove the least recently used transcripts until the cache fits its limit
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM transcripts").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute("SELECT rowid, size FROM transcripts ORDER BY used").fetchall()
+        for rowid, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM transcripts WHERE rowid = ?", (rowid,))
+            total -= size
+
+    def count(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM transcripts").fetchone()[0]
+
+    def size_bytes(self):
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM transcripts").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM transcripts")
+            self._db.commit()
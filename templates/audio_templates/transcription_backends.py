@@ -0,0 +1,212 @@
+"""
+Transcription Backends for the audio templates
+One interface for the services that turn audio into text.
+
+- WhisperAPIBackend: OpenAI's Whisper API (needs an API key)
+- LocalWhisperBackend (in local_transcriber.py): Whisper on your own computer
+- StandInBackend: an offline stand-in that needs no internet and no model.
+  It "hears" every sound between two silences as one word (picked from the
+  sound's pitch) and waits a little like a web service would. Made for
+  trying out and benchmarking the chunked pipeline, not for real speech
+
+Used by simple_transcriber.py, chunked_transcription.py and local_transcriber.py.
+"""
+
+import io
+import os
+import random
+import time
+
+import numpy as np
+
+try:
+    from openai import APIConnectionError, InternalServerError, OpenAI, RateLimitError
+    OPENAI_AVAILABLE = True
+except ImportError:
+    OPENAI_AVAILABLE = False
+
+try:
+    from pydub import AudioSegment
+    from pydub.silence import detect_nonsilent
+    PYDUB_AVAILABLE = True
+except ImportError:
+    PYDUB_AVAILABLE = False
+
+TASKS = ["Transcribe", "Translate to English"]
+
+
+class TemporaryTranscriptionError(Exception):
+    """The service timed out, is busy or rate-limited; trying again later may work."""
+
+
+class TranscriptionBackend:
+    """
+    Base class for transcription services.
+
+    Subclasses set `name` and implement `transcribe(audio_file, filename,
+    task, language)`, where `audio_file` is a binary file object and
+    `filename` tells the service the format. It returns
+    {'text': ..., 'segments': [{'start', 'end', 'text'}]} with times in
+    seconds, and raises TemporaryTranscriptionError when a retry may help.
+
+    `max_bytes` is the largest file one request accepts (None: any size);
+    larger files have to be split into chunks first (see
+    chunked_transcription.py). Backends that can work on several files at
+    once override `transcribe_many`.
+    """
+
+    name = "backend"
+    max_bytes = None
+
+    def transcribe(self, audio_file, filename, task="Transcribe", language=None):
+        raise NotImplementedError
+
+    def transcribe_many(self, files, task="Transcribe", language=None, progress=None):
+        """
+        Transcribe several files.
+
+        Args:
+            files: List of (binary file object, filename)
+            progress: Optional function(steps done, total steps)
+
+        Returns:
+            List of results ({'text', 'segments'}), one per file
+        """
+        results = []
+        for audio_file, filename in files:
+            results.append(self.transcribe(audio_file, filename, task, language))
+            if progress:
+                progress(len(results), len(files))
+        return results
+
+
+class WhisperAPIBackend(TranscriptionBackend):
+    """
+    OpenAI's Whisper API (files up to 25 MB per request).
+    """
+
+    name = "whisper-api"
+    max_bytes = 25 * 1024 * 1024
+
+    def __init__(self, api_key, model="whisper-1", timeout=600):
+        self.name = f"whisper-api-{model}"
+        self.model = model
+        # The client's own retries are off: callers retry TemporaryTranscriptionError
+        # with a growing pause (see chunked_transcription.transcribe_with_retry)
+        self._client = OpenAI(api_key=api_key, timeout=timeout, max_retries=0)
+
+    def transcribe(self, audio_file, filename, task="Transcribe", language=None):
+        # verbose_json includes the timed segments
+        params = {"model": self.model, "file": (filename, audio_file), "response_format": "verbose_json"}
+        try:
+            if task == "Translate to English":
+                result = self._client.audio.translations.create(**params)
+            else:
+                if language:
+                    params["language"] = language
+                result = self._client.audio.transcriptions.create(**params)
+        except (APIConnectionError, RateLimitError, InternalServerError) as e:
+            raise TemporaryTranscriptionError(str(e)) from e
+
+        segments = [s if isinstance(s, dict) else s.model_dump() for s in (getattr(result, 'segments', None) or [])]
+        return {
+            'text': result.text.strip(),
+            'segments': [{'start': s['start'], 'end': s['end'], 'text': s['text'].strip()} for s in segments],
+        }
+
+
+class StandInBackend(TranscriptionBackend):
+    """
+    Offline stand-in for a transcription service (WAV audio only).
+
+    Every sound between two silences becomes one word, chosen from the
+    sound's main pitch, so the same sound always gives the same word - also
+    when it appears in two overlapping chunks. Words separated by a longer
+    pause start a new segment. Like the Whisper API, it takes files up to
+    25 MB.
+
+    Args:
+        latency: Seconds every request waits (like a network round trip)
+        seconds_per_audio_minute: Extra seconds of "processing" per minute of audio
+        failure_rate: Share of requests that fail with a temporary error (0 to 1)
+    """
+
+    name = "stand-in"
+    max_bytes = 25 * 1024 * 1024
+
+    # Words for the pitches, 50 Hz apart
+    VOCABULARY = [
+        "archive", "letter", "river", "harbour", "winter", "market", "council", "village",
+        "railway", "garden", "chapel", "school", "mill", "bridge", "farm", "street",
+        "family", "teacher", "soldier", "miner", "weaver", "sailor", "doctor", "baker",
+        "remember", "walked", "worked", "married", "moved", "built", "closed", "opened",
+        "early", "later", "always", "never", "together", "every", "morning", "evening",
+    ]
+
+    # A pause this long (seconds) starts a new segment
+    SEGMENT_PAUSE = 0.5
+
+    def __init__(self, latency=0.5, seconds_per_audio_minute=0.0, failure_rate=0.0):
+        self.latency = latency
+        self.seconds_per_audio_minute = seconds_per_audio_minute
+        self.failure_rate = failure_rate
+
+    def transcribe(self, audio_file, filename, task="Transcribe", language=None):
+        audio = AudioSegment.from_file(audio_file, format=os.path.splitext(filename)[1].lstrip('.') or "wav")
+        time.sleep(self.latency + self.seconds_per_audio_minute * len(audio) / 60_000)
+
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise TemporaryTranscriptionError("stand-in backend: simulated timeout")
+
+        samples = np.array(audio.set_channels(1).get_array_of_samples(), dtype=np.float64)
+        segments = []
+        for start, end in detect_nonsilent(audio, min_silence_len=80, silence_thresh=-40):
+            word = self._word(samples[start * audio.frame_rate // 1000:end * audio.frame_rate // 1000],
+                              audio.frame_rate)
+            if segments and start / 1000 - segments[-1]['end'] < self.SEGMENT_PAUSE:
+                segments[-1]['text'] += " " + word
+                segments[-1]['end'] = end / 1000
+            else:
+                segments.append({'start': start / 1000, 'end': end / 1000, 'text': word})
+        return {'text': " ".join(s['text'] for s in segments), 'segments': segments}
+
+    def _word(self, samples, frame_rate):
+        # Main pitch of the sound, rounded to 50 Hz, picks the word
+        if len(samples) < 2:
+            return self.VOCABULARY[0]
+        spectrum = np.abs(np.fft.rfft(samples))
+        pitch = np.fft.rfftfreq(len(samples), 1 / frame_rate)[spectrum.argmax()]
+        return self.VOCABULARY[int(round(pitch / 50)) % len(self.VOCABULARY)]
+
+
+def make_test_audio(seconds, seed=42, frame_rate=16000):
+    """
+    Synthetic "speech" for the stand-in backend: short tones (words) with
+    small gaps, and a longer pause after every few words (sentences).
+
+    Returns:
+        pydub AudioSegment (16-bit mono)
+    """
+    rng = np.random.default_rng(seed)
+    pieces = []
+    total = 0
+    while total < seconds * frame_rate:
+        for _ in range(rng.integers(4, 12)):
+            length = int(rng.uniform(0.15, 0.5) * frame_rate)
+            pitch = 50 * rng.integers(4, 44)
+            t = np.arange(length) / frame_rate
+            pieces.append(0.5 * np.sin(2 * np.pi * pitch * t))
+            pieces.append(np.zeros(int(rng.uniform(0.12, 0.3) * frame_rate)))
+            total += len(pieces[-2]) + len(pieces[-1])
+        pieces.append(np.zeros(int(rng.uniform(0.6, 1.5) * frame_rate)))
+        total += len(pieces[-1])
+
+    samples = (np.concatenate(pieces)[:seconds * frame_rate] * 32767).astype(np.int16)
+    return AudioSegment(samples.tobytes(), sample_width=2, frame_rate=frame_rate, channels=1)
+
+
+def wav_bytes(audio):
+    """Export a pydub AudioSegment as WAV bytes (no ffmpeg needed)."""
+    buffer = io.BytesIO()
+    audio.export(buffer, format="wav")
+    return buffer.getvalue()
@@ -0,0 +1,326 @@
+"""
+Geocoding for the mapping templates
+Turn many addresses into coordinates, politely and only once.
+
+- Every address that was looked up is saved in a small SQLite file, so the
+  same address is never sent to the geocoding service twice (not even
+  after a restart). Addresses that were not found are remembered too
+- A background worker looks up a whole list of addresses while the app
+  keeps running, and reports its progress
+- Requests are spaced out to respect the provider's limit (Nominatim
+  allows one request per second)
+- Providers are pluggable: Nominatim (OpenStreetMap) for real addresses,
+  and an offline provider that invents repeatable coordinates, for trying
+  the app and for tests without internet
+
+Used by simple_map.py.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+try:
+    from geopy.geocoders import Nominatim
+    from geopy.exc import GeocoderRateLimited, GeocoderTimedOut, GeocoderUnavailable
+    GEOPY_AVAILABLE = True
+except ImportError:
+    GEOPY_AVAILABLE = False
+
+# Tries per address when the service times out or is busy
+MAX_RETRIES = 3
+
+# Seconds to wait before the first retry (doubles each time)
+BACKOFF_SECONDS = 2
+
+
+class TemporaryGeocodingError(Exception):
+    """The service timed out or is busy; trying again later may work."""
+
+
+def normalize_address(address):
+    """
+    Normalised form of an address, used as the cache key:
+    lowercase, single spaces, no spaces before commas, no trailing dots.
+    """
+    address = re.sub(r'\s+', ' ', str(address).strip().lower())
+    address = re.sub(r'\s*,\s*', ', ', address)
+    return address.strip(' .,')
+
+
+# ============================================
+# PROVIDERS
+# ============================================
+
+class GeocodingProvider:
+    """
+    Base class for geocoding services.
+
+    Subclasses set `name` and `min_interval` (seconds between requests)
+    and implement `_geocode(address)`, returning (lat, lon, display name)
+    or None. `geocode()` adds the rate limit, so one provider object can be
+    shared by several threads.
+    """
+
+    name = "provider"
+    min_interval = 0.0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next_request = 0.0
+
+    def geocode(self, address):
+        with self._lock:
+            wait = self._next_request - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self._next_request = time.monotonic() + self.min_interval
+        return self._geocode(address)
+
+    def _geocode(self, address):
+        raise NotImplementedError
+
+
+class NominatimProvider(GeocodingProvider):
+    """
+    OpenStreetMap's free geocoder (at most one request per second).
+    """
+
+    name = "nominatim"
+    min_interval = 1.0
+
+    def __init__(self, user_agent="dsl_map_creator", timeout=10):
+        super().__init__()
+        self._geolocator = Nominatim(user_agent=user_agent, timeout=timeout)
+
+    def _geocode(self, address):
+        try:
+            location = self._geolocator.geocode(address)
+        except (GeocoderTimedOut, GeocoderUnavailable, GeocoderRateLimited) as e:
+            raise TemporaryGeocodingError(str(e)) from e
+        if location is None:
+            return None
+        return location.latitude, location.longitude, location.address
+
+
+class OfflineProvider(GeocodingProvider):
+    """
+    Stand-in provider that needs no internet: every address gets made-up
+    but repeatable coordinates (from a hash of the address). Addresses
+    containing "nowhere" are "not found". For demos and tests only.
+    """
+
+    name = "offline"
+
+    def __init__(self, delay=0.0):
+        super().__init__()
+        self.min_interval = delay
+
+    def _geocode(self, address):
+        if "nowhere" in address.lower():
+            return None
+        digest = hashlib.sha1(normalize_address(address).encode('utf-8')).digest()
+        lat = int.from_bytes(digest[:4], 'big') / 2 ** 32 * 130 - 60
+        lon = int.from_bytes(digest[4:8], 'big') / 2 ** 32 * 360 - 180
+        return round(lat, 6), round(lon, 6), f"{address} (offline test location)"
+
+
+PROVIDERS = {
+    "Nominatim (OpenStreetMap)": NominatimProvider,
+    "Offline test provider": OfflineProvider,
+}
+
+
+# ============================================
+# CACHE
+# ============================================
+
+class GeocodeCache:
+    """
+    Saved geocoding results, one SQLite file, shared by all providers.
+
+    Usage:
+        cache = GeocodeCache("data/processed/geocode_cache.sqlite")
+        cache.put("nominatim", "paris, france", (48.85, 2.35, "Paris, France"))
+        cache.get("nominatim", "paris, france")
+    """
+
+    MISSING = object()  # returned by get() when the address was never looked up
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS places (
+                provider TEXT,
+                address TEXT,
+                lat REAL,
+                lon REAL,
+                display TEXT,
+                found INTEGER,
+                saved REAL,
+                PRIMARY KEY (provider, address)
+            )
+        """)
+        self._db.commit()
+
+    def get(self, provider, address):
+        """
+        (lat, lon, display name), None if the address was not found,
+        or GeocodeCache.MISSING if it was never looked up.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT lat, lon, display, found FROM places WHERE provider = ? AND address = ?",
+                (provider, address)
+            ).fetchone()
+        if row is None:
+            return self.MISSING
+        return row[:3] if row[3] else None
+
+    def put(self, provider, address, result):
+        lat, lon, display = result if result else (None, None, None)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO places VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (provider, address, lat, lon, display, int(result is not None), time.time())
+            )
+            self._db.commit()
+
+    def count(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM places").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM places")
+            self._db.commit()
+
+
+def geocode_address(address, provider, cache):
+    """
+    Look up one address, using the cache first.
+
+    Returns:
+        (lat, lon, display name) or None if not found
+    """
+    key = normalize_address(address)
+    result = cache.get(provider.name, key)
+    if result is GeocodeCache.MISSING:
+        result = provider.geocode(address)
+        cache.put(provider.name, key, result)
+    return result
+
+
+# ============================================
+# BACKGROUND BATCH WORKER
+# ============================================
+
+class BatchGeocoder:
+    """
+    Geocodes a list of addresses in a background thread.
+
+    Each different address is looked up once; cached addresses are done
+    instantly, the rest at the provider's pace. Addresses that keep timing
+    out are retried with a growing pause, then counted as failed (and not
+    cached, so a later run tries them again). Other errors (e.g. an access
+    denied by the service, or an address it can't read) fail that address
+    only; the last one is kept in `last_error`.
+
+    Usage:
+        job = BatchGeocoder(addresses, OfflineProvider(), cache)
+        job.start()
+        ...
+        job.done, job.total      # progress
+        job.result(address)      # (lat, lon, display) or None
+    """
+
+    def __init__(self, addresses, provider, cache):
+        self.provider = provider
+        self.cache = cache
+
+        # Unique addresses, in the order they first appear
+        self.addresses = {}
+        for address in addresses:
+            self.addresses.setdefault(normalize_address(address), address)
+
+        self.total = len(self.addresses)
+        self.done = 0
+        self.from_cache = 0
+        self.not_found = 0
+        self.failed = 0
+        self.last_error = None
+        self.started = None
+        self.finished = None
+
+        self._results = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.started = time.monotonic()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop after the current address."""
+        self._stop.set()
+
+    @property
+    def running(self):
+        return self._thread.is_alive()
+
+    def result(self, address):
+        """(lat, lon, display name), or None if not found or not done."""
+        return self._results.get(normalize_address(address))
+
+    def eta_seconds(self):
+        """Rough time left, from the speed so far."""
+        if not self.started or self.done == 0:
+            return None
+        elapsed = time.monotonic() - self.started
+        return elapsed / self.done * (self.total - self.done)
+
+    def _run(self):
+        try:
+            for key, address in self.addresses.items():
+                if self._stop.is_set():
+                    break
+
+                try:
+                    result = self.cache.get(self.provider.name, key)
+                    if result is not GeocodeCache.MISSING:
+                        self.from_cache += 1
+                    else:
+                        result = self._lookup(address)
+                        if result is not GeocodeCache.MISSING:
+                            self.cache.put(self.provider.name, key, result)
+                except Exception as e:
+                    # Not cached, so a later run tries this address again
+                    self.last_error = f"{address}: {e}"
+                    result = GeocodeCache.MISSING
+
+                if result is GeocodeCache.MISSING:
+                    self.failed += 1
+                    result = None
+                elif result is None:
+                    self.not_found += 1
+                self._results[key] = result
+                self.done += 1
+        finally:
+            self.finished = time.monotonic()
+
+    def _lookup(self, address):
+        # Retry temporary errors with a growing pause; MISSING if all fail
+        for attempt in range(MAX_RETRIES):
+            try:
+                return self.provider.geocode(address)
+            except TemporaryGeocodingError as e:
+                self.last_error = f"{address}: {e}"
+                if self._stop.wait(BACKOFF_SECONDS * 2 ** attempt):
+                    break
+        return GeocodeCache.MISSING
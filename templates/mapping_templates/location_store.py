@@ -0,0 +1,276 @@
+"""
+Location Store for the Map Creator
+Keeps locations as columns (one array each for names, latitudes,
+longitudes and colours) instead of one dictionary per location.
+
+- Locations are added in bulk: a CSV file is read in chunks and checked
+  with array operations (coordinates must be numbers within range), so
+  importing a million rows takes seconds
+- The centre and bounds of all locations are computed with NumPy
+- A grid index finds the locations inside an area without looking at
+  every location; a KD-tree (SciPy, if installed) finds the nearest
+  locations to a point
+- Each change gives the store a new fingerprint; the app builds the map
+  once per fingerprint instead of on every rerun
+
+Used by simple_map.py.
+"""
+
+import uuid
+
+import numpy as np
+import pandas as pd
+
+try:
+    from scipy.spatial import cKDTree
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+# Rows read from a CSV file at a time
+CSV_CHUNK_ROWS = 500_000
+
+# Column names recognised as coordinates (lowercase)
+LAT_COLUMNS = ['lat', 'latitude']
+LON_COLUMNS = ['lon', 'lng', 'longitude', 'long']
+
+# The grid index has about this many cells along each side of the data's bounds
+GRID_CELLS_PER_SIDE = 256
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def find_coordinate_columns(columns):
+    """(latitude column, longitude column) from a list of column names (None if missing)."""
+    lat_col = next((c for c in columns if str(c).lower() in LAT_COLUMNS), None)
+    lon_col = next((c for c in columns if str(c).lower() in LON_COLUMNS), None)
+    return lat_col, lon_col
+
+
+def haversine_km(lat, lon, lats, lons):
+    """Great-circle distance in km from one point to arrays of points."""
+    lat, lon, lats, lons = (np.radians(x) for x in (lat, lon, lats, lons))
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def _unit_vectors(lats, lons):
+    # Points on the unit sphere, so straight-line distance follows great-circle distance
+    lats, lons = np.radians(lats), np.radians(lons)
+    return np.column_stack([np.cos(lats) * np.cos(lons), np.cos(lats) * np.sin(lons), np.sin(lats)])
+
+
+class GridIndex:
+    """
+    Locations sorted by grid cell, for fast "what is inside this area" queries.
+
+    Only the cells that contain locations are stored; a query picks the
+    cells that overlap the area and checks the locations in them.
+    """
+
+    def __init__(self, lats, lons, cells_per_side=GRID_CELLS_PER_SIDE):
+        self.lats = lats
+        self.lons = lons
+        span = max(np.ptp(lats) if len(lats) else 0, np.ptp(lons) if len(lons) else 0)
+        self.cell = max(span / cells_per_side, 1e-4)
+        self.num_cols = int(np.ceil(360 / self.cell)) + 1
+
+        rows, cols = self._cell_of(lats, lons)
+        keys = rows * self.num_cols + cols
+        self.order = np.argsort(keys, kind='stable')
+        cell_keys, self.starts, counts = np.unique(keys[self.order], return_index=True, return_counts=True)
+        self.ends = self.starts + counts
+        self.cell_rows = cell_keys // self.num_cols
+        self.cell_cols = cell_keys % self.num_cols
+
+    def _cell_of(self, lats, lons):
+        rows = np.floor((np.asarray(lats) + 90) / self.cell).astype(np.int64)
+        cols = np.floor((np.asarray(lons) + 180) / self.cell).astype(np.int64)
+        return rows, cols
+
+    def in_box(self, south, west, north, east):
+        """Ids of the locations inside the box (sorted)."""
+        if west > east:
+            # The box crosses the 180th meridian
+            return np.union1d(self.in_box(south, west, north, 180), self.in_box(south, -180, north, east))
+
+        (row_min, row_max), (col_min, col_max) = self._cell_of([south, north], [west, east])
+        cells = np.flatnonzero((self.cell_rows >= row_min) & (self.cell_rows <= row_max) &
+                               (self.cell_cols >= col_min) & (self.cell_cols <= col_max))
+        if len(cells) == 0:
+            return np.empty(0, dtype=np.int64)
+
+        candidates = np.concatenate([self.order[self.starts[c]:self.ends[c]] for c in cells])
+        lats, lons = self.lats[candidates], self.lons[candidates]
+        inside = (lats >= south) & (lats <= north) & (lons >= west) & (lons <= east)
+        return np.sort(candidates[inside])
+
+
+class LocationStore:
+    """
+    Columnar list of named, coloured locations.
+
+    Usage:
+        store = LocationStore()
+        store.add("White House", 38.8977, -77.0365, "red")
+        store.read_csv("places.csv", "latitude", "longitude", "name")
+        store.centroid()
+        store.in_area(38, -78, 40, -76)
+        store.nearest(38.9, -77.0, k=5)
+    """
+
+    def __init__(self):
+        self._chunks = []   # DataFrames not merged yet
+        self._frame = pd.DataFrame({
+            'name': pd.Series(dtype=object), 'lat': pd.Series(dtype=np.float64),
+            'lon': pd.Series(dtype=np.float64), 'color': pd.Series(dtype=object),
+        })
+        self._token = uuid.uuid4().hex
+        self.version = 0
+        self._index = None
+        self._tree = None
+
+    # --- Adding locations ---
+
+    def add(self, name, lat, lon, color='blue'):
+        """Add one location. Returns False if the coordinates are not valid."""
+        added, _ = self.add_many([name], [lat], [lon], color)
+        return added == 1
+
+    def add_many(self, names, lats, lons, colors='blue'):
+        """
+        Add many locations at once.
+
+        Args:
+            names: Sequence of names, or None (missing names become "Location N")
+            lats, lons: Sequences of coordinates (numbers or numeric text)
+            colors: One colour for all, or a sequence of colours
+
+        Rows whose coordinates are missing, not numbers, or out of range
+        (latitude -90 to 90, longitude -180 to 180) are skipped.
+
+        Returns:
+            (number added, number skipped)
+        """
+        lats = pd.to_numeric(pd.Series(lats), errors='coerce').to_numpy(dtype=np.float64)
+        lons = pd.to_numeric(pd.Series(lons), errors='coerce').to_numpy(dtype=np.float64)
+        valid = (np.abs(lats) <= 90) & (np.abs(lons) <= 180)   # NaN fails both tests
+
+        numbers = pd.Series(np.arange(len(self) + 1, len(self) + len(lats) + 1)).map("Location {}".format)
+        names = pd.Series([None] * len(lats) if names is None else names, dtype=object).reset_index(drop=True)
+        names = names.where(names.notna() & (names.astype(str).str.strip() != ""), numbers).astype(str)
+        colors = pd.Series(colors if not isinstance(colors, str) else [colors] * len(lats), dtype=object)
+
+        chunk = pd.DataFrame({
+            'name': names.to_numpy()[valid], 'lat': lats[valid],
+            'lon': lons[valid], 'color': colors.to_numpy()[valid],
+        })
+        if len(chunk):
+            self._chunks.append(chunk)
+            self._changed()
+        return len(chunk), int((~valid).sum())
+
+    def read_csv(self, file, lat_col, lon_col, name_col=None, color='blue', chunk_rows=CSV_CHUNK_ROWS):
+        """
+        Add all locations from a CSV file, reading it in chunks.
+
+        Returns:
+            (number added, number skipped)
+        """
+        columns = [lat_col, lon_col] + ([name_col] if name_col else [])
+        added = skipped = 0
+        for chunk in pd.read_csv(file, usecols=columns, chunksize=chunk_rows):
+            names = chunk[name_col] if name_col else None
+            result = self.add_many(names, chunk[lat_col], chunk[lon_col], color)
+            added += result[0]
+            skipped += result[1]
+        return added, skipped
+
+    def clear(self):
+        """Remove all locations."""
+        self._chunks = []
+        self._frame = self._frame.iloc[0:0]
+        self._changed()
+
+    def _changed(self):
+        self.version += 1
+        self._index = None
+        self._tree = None
+
+    # --- Reading ---
+
+    @property
+    def fingerprint(self):
+        """Changes whenever the locations change."""
+        return f"{self._token}-{self.version}"
+
+    @property
+    def frame(self):
+        """All locations as a DataFrame with name, lat, lon and color columns."""
+        if self._chunks:
+            self._frame = pd.concat([self._frame] + self._chunks, ignore_index=True)
+            self._chunks = []
+        return self._frame
+
+    def __len__(self):
+        return len(self._frame) + sum(len(chunk) for chunk in self._chunks)
+
+    def to_frame(self, limit=None, ids=None):
+        """Locations as a DataFrame (optionally only the given ids, and at most `limit` rows)."""
+        frame = self.frame if ids is None else self.frame.iloc[ids]
+        return frame if limit is None else frame.head(limit)
+
+    def bounds(self):
+        """(south, west, north, east), or None if the store is empty."""
+        if len(self) == 0:
+            return None
+        lats, lons = self.frame['lat'].to_numpy(), self.frame['lon'].to_numpy()
+        return lats.min(), lons.min(), lats.max(), lons.max()
+
+    def centroid(self):
+        """(mean latitude, mean longitude), or None if the store is empty."""
+        if len(self) == 0:
+            return None
+        return self.frame['lat'].mean(), self.frame['lon'].mean()
+
+    # --- Spatial queries ---
+
+    @property
+    def index(self):
+        """Grid index of all locations (built on first use after each change)."""
+        if self._index is None:
+            self._index = GridIndex(self.frame['lat'].to_numpy(), self.frame['lon'].to_numpy())
+        return self._index
+
+    def in_area(self, south, west, north, east):
+        """
+        Ids of the locations inside an area. If west is greater than east,
+        the area crosses the 180th meridian.
+        """
+        return self.index.in_box(south, west, north, east)
+
+    def nearest(self, lat, lon, k=5):
+        """
+        The k locations closest to a point.
+
+        Returns:
+            (ids, distances in km), closest first
+        """
+        k = min(k, len(self))
+        if k == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        lats, lons = self.frame['lat'].to_numpy(), self.frame['lon'].to_numpy()
+
+        if SCIPY_AVAILABLE:
+            if self._tree is None:
+                self._tree = cKDTree(_unit_vectors(lats, lons))
+            _, ids = self._tree.query(_unit_vectors([lat], [lon])[0], k=k)
+            ids = np.atleast_1d(ids)
+        else:
+            # Without SciPy: measure the distance to every location
+            distances = haversine_km(lat, lon, lats, lons)
+            ids = np.argpartition(distances, k - 1)[:k]
+
+        distances = haversine_km(lat, lon, lats[ids], lons[ids])
+        order = np.argsort(distances, kind='stable')
+        return ids[order], distances[order]
@@ -0,0 +1,130 @@
+"""
+Marker Layers for the mapping templates
+Put thousands (or hundreds of thousands) of points on a folium map.
+
+One folium.Marker per point creates a separate piece of HTML and
+JavaScript for every point, which gets slow after a few thousand. This
+module chooses a lighter way to draw the points:
+- Markers: one marker per point (fine for small maps)
+- Clustered markers: the same, grouped into clusters
+- Fast clusters: the points are sent to the browser as one compact list,
+  and the browser creates the markers and clusters itself
+- Grid summary: the points are counted per grid cell on the server, and
+  only one circle per cell is drawn. The map size no longer depends on the
+  number of points, which keeps exported HTML files small
+
+Used by simple_map.py.
+"""
+
+import html
+
+import folium
+import numpy as np
+from folium.plugins import FastMarkerCluster, MarkerCluster
+
+RENDER_MODES = ["Auto", "Markers", "Clustered markers", "Fast clusters", "Grid summary"]
+
+# "Auto" picks the mode from the number of points
+AUTO_MARKERS_MAX = 20
+AUTO_CLUSTERED_MAX = 1000
+AUTO_FAST_MAX = 300_000
+
+# Exported maps with more points than this use the grid summary (keeps the file small)
+EXPORT_MAX_POINTS = 50_000
+
+# Grid summary: at most this many circles
+GRID_MAX_CELLS = 2000
+
+# JavaScript that turns one [lat, lon, name, color] row into a marker (fast clusters).
+# Leaflet shows tooltips and popups as HTML, so names are escaped before they get here
+FAST_MARKER_CALLBACK = """
+function (row) {
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]),
+                                {radius: 6, color: row[3], fillOpacity: 0.8});
+    marker.bindTooltip(row[2]);
+    marker.bindPopup('<b>' + row[2] + '</b><br>Lat: ' + row[0].toFixed(4) + '<br>Lon: ' + row[1].toFixed(4));
+    return marker;
+};
+"""
+
+
+def choose_mode(num_points, mode="Auto"):
+    """The render mode to use for this many points."""
+    if mode != "Auto":
+        return mode
+    if num_points <= AUTO_MARKERS_MAX:
+        return "Markers"
+    if num_points <= AUTO_CLUSTERED_MAX:
+        return "Clustered markers"
+    if num_points <= AUTO_FAST_MAX:
+        return "Fast clusters"
+    return "Grid summary"
+
+
+def grid_cells(lats, lons, max_cells=GRID_MAX_CELLS):
+    """
+    Count points per grid cell (vectorised), making the cells bigger until
+    there are at most `max_cells` of them.
+
+    Returns:
+        (cell lats, cell lons, counts, cell size in degrees) - each cell's
+        position is the average position of its points
+    """
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    span = max(np.ptp(lats) if len(lats) else 0, np.ptp(lons) if len(lons) else 0, 1e-6)
+    cell = span / 256
+
+    while True:
+        rows = np.floor(lats / cell).astype(np.int64)
+        cols = np.floor(lons / cell).astype(np.int64)
+        keys = rows * 1_000_003 + cols
+        unique, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        if len(unique) <= max_cells:
+            break
+        cell *= 2
+
+    cell_lats = np.bincount(inverse, weights=lats) / counts
+    cell_lons = np.bincount(inverse, weights=lons) / counts
+    return cell_lats, cell_lons, counts, cell
+
+
+def add_points(m, df, mode):
+    """
+    Add the points of a DataFrame (name, lat, lon, color) to a folium map.
+
+    Args:
+        m: folium.Map
+        df: DataFrame with name, lat, lon and color columns
+        mode: A render mode other than "Auto" (see choose_mode)
+    """
+    if mode in ("Markers", "Clustered markers"):
+        target = MarkerCluster().add_to(m) if mode == "Clustered markers" else m
+        for name, lat, lon, color in df[['name', 'lat', 'lon', 'color']].itertuples(index=False):
+            # Names come from uploaded CSVs: escape them so they can't add HTML or scripts
+            name = html.escape(str(name))
+            folium.Marker(
+                location=[lat, lon],
+                popup=f"<b>{name}</b><br>Lat: {lat:.4f}<br>Lon: {lon:.4f}",
+                tooltip=name,
+                icon=folium.Icon(color=color, icon='info-sign')
+            ).add_to(target)
+
+    elif mode == "Fast clusters":
+        rows = list(zip(
+            df['lat'].round(6).tolist(), df['lon'].round(6).tolist(),
+            [html.escape(name) for name in df['name'].astype(str)], df['color'].tolist()
+        ))
+        FastMarkerCluster(rows, callback=FAST_MARKER_CALLBACK, options={'chunkedLoading': True}).add_to(m)
+
+    else:
+        cell_lats, cell_lons, counts, _ = grid_cells(df['lat'], df['lon'])
+        biggest = counts.max()
+        for lat, lon, count in zip(cell_lats, cell_lons, counts):
+            folium.CircleMarker(
+                location=[lat, lon],
+                radius=4 + 16 * np.log1p(count) / np.log1p(biggest),
+                color="#3186cc", fill=True, fill_opacity=0.6, weight=1,
+                tooltip=f"{count:,} locations",
+            ).add_to(m)
+    return m
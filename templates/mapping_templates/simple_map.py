@@ -7,23 +7,29 @@ Run with: streamlit run templates/mapping_templates/simple_map.py
 
 import streamlit as st
 import pandas as pd
+import time
 
 # Try to import folium
 try:
     import folium
-    from folium.plugins import MarkerCluster
     from streamlit_folium import st_folium
+    from marker_layers import EXPORT_MAX_POINTS, RENDER_MODES, add_points, choose_mode
     FOLIUM_AVAILABLE = True
 except ImportError:
     FOLIUM_AVAILABLE = False
 
-# Try to import geopy for geocoding
-try:
-    from geopy.geocoders import Nominatim
-    from geopy.exc import GeocoderTimedOut
-    GEOPY_AVAILABLE = True
-except ImportError:
-    GEOPY_AVAILABLE = False
+# Geocoding (uses geopy for real addresses, if installed)
+from geocoding import (GEOPY_AVAILABLE, PROVIDERS, BatchGeocoder, GeocodeCache,
+                       TemporaryGeocodingError, geocode_address)
+
+# Locations are kept in columns, with a spatial index
+from location_store import LocationStore, find_coordinate_columns
+
+# Addresses that were looked up before are saved here
+GEOCODE_CACHE_FILE = "data/processed/geocode_cache.sqlite"
+
+# Rows shown in the "Current Locations" table
+TABLE_ROWS = 1000
 
 # Page configuration
 st.set_page_config(
@@ -42,8 +48,9 @@ if not FOLIUM_AVAILABLE:
     st.stop()
 
 # Initialize session state for locations
-if 'locations' not in st.session_state:
-    st.session_state['locations'] = []
+if 'location_store' not in st.session_state:
+    st.session_state['location_store'] = LocationStore()
+store = st.session_state['location_store']
 
 # --- Sidebar ---
 st.sidebar.header("Map Settings")
@@ -59,6 +66,37 @@ default_lat = st.sidebar.number_input("Default Latitude", value=39.8283)
 default_lon = st.sidebar.number_input("Default Longitude", value=-98.5795)
 default_zoom = st.sidebar.slider("Default Zoom", 1, 18, 4)
 
+# How markers are drawn
+render_mode = st.sidebar.selectbox(
+    "Marker Display", RENDER_MODES,
+    help="Auto: single markers for small maps, clusters drawn by the browser for large ones, "
+         "and a grid summary (one circle per area) for very large ones."
+)
+
+# Geocoding service
+provider_names = [name for name in PROVIDERS if GEOPY_AVAILABLE or name != "Nominatim (OpenStreetMap)"]
+provider_name = st.sidebar.selectbox(
+    "Geocoder", provider_names,
+    help="Nominatim looks up real addresses (1 per second). "
+         "The offline test provider invents coordinates, for trying the app without internet."
+)
+
+
+@st.cache_resource
+def get_geocode_cache(path):
+    return GeocodeCache(path)
+
+
+@st.cache_resource
+def get_provider(name):
+    """One provider per service for the whole app, so its rate limit is shared."""
+    return PROVIDERS[name]()
+
+
+geocode_cache = get_geocode_cache(GEOCODE_CACHE_FILE)
+provider = get_provider(provider_name)
+st.sidebar.caption(f"{geocode_cache.count():,} addresses in the geocoding cache")
+
 # --- Main Interface ---
 tab1, tab2, tab3 = st.tabs(["Add Locations", "View Map", "Export"])
 
@@ -73,53 +111,109 @@ with tab1:
 
         with st.form("coord_form"):
             name = st.text_input("Location Name", placeholder="My Location")
-            lat = st.number_input("Latitude", value=40.7128, format="%.6f")
-            lon = st.number_input("Longitude", value=-74.0060, format="%.6f")
+            lat = st.number_input("Latitude", min_value=-90.0, max_value=90.0,
+                                  value=40.7128, format="%.6f")
+            lon = st.number_input("Longitude", min_value=-180.0, max_value=180.0,
+                                  value=-74.0060, format="%.6f")
             color = st.selectbox("Marker Color",
                 ["blue", "red", "green", "purple", "orange", "darkred", "lightblue", "pink"])
 
             if st.form_submit_button("Add Location"):
-                st.session_state['locations'].append({
-                    'name': name if name else f"Location {len(st.session_state['locations'])+1}",
-                    'lat': lat,
-                    'lon': lon,
-                    'color': color
-                })
-                st.success(f"Added: {name}")
+                if store.add(name, lat, lon, color):
+                    st.success(f"Added: {store.frame['name'].iloc[-1]}")
+                else:
+                    st.error("Latitude must be between -90 and 90 and longitude between -180 and 180")
 
     with col2:
         st.subheader("Add by Address")
 
-        if GEOPY_AVAILABLE:
-            with st.form("address_form"):
-                address = st.text_input("Address", placeholder="1600 Pennsylvania Ave, Washington DC")
-                addr_name = st.text_input("Name (optional)", placeholder="White House")
-                addr_color = st.selectbox("Color",
-                    ["red", "blue", "green", "purple", "orange"], key="addr_color")
-
-                if st.form_submit_button("Find & Add"):
-                    if address:
-                        with st.spinner("Finding location..."):
-                            try:
-                                geolocator = Nominatim(user_agent="dsl_map_creator")
-                                location = geolocator.geocode(address, timeout=10)
-
-                                if location:
-                                    st.session_state['locations'].append({
-                                        'name': addr_name if addr_name else address,
-                                        'lat': location.latitude,
-                                        'lon': location.longitude,
-                                        'color': addr_color
-                                    })
-                                    st.success(f"Found: {location.address[:50]}...")
-                                else:
-                                    st.error("Address not found")
-                            except GeocoderTimedOut:
-                                st.error("Geocoding timed out. Try again.")
-                            except Exception as e:
-                                st.error(f"Error: {e}")
+        if not GEOPY_AVAILABLE:
+            st.warning("Install geopy for real address lookup: `pip install geopy` "
+                       "(the offline test provider works without it)")
+
+        with st.form("address_form"):
+            address = st.text_input("Address", placeholder="1600 Pennsylvania Ave, Washington DC")
+            addr_name = st.text_input("Name (optional)", placeholder="White House")
+            addr_color = st.selectbox("Color",
+                ["red", "blue", "green", "purple", "orange"], key="addr_color")
+
+            if st.form_submit_button("Find & Add"):
+                if address:
+                    with st.spinner("Finding location..."):
+                        try:
+                            location = geocode_address(address, provider, geocode_cache)
+
+                            if location:
+                                found_lat, found_lon, found_address = location
+                                store.add(addr_name if addr_name else address, found_lat, found_lon, addr_color)
+                                st.success(f"Found: {found_address[:50]}...")
+                            else:
+                                st.error("Address not found")
+                        except TemporaryGeocodingError:
+                            st.error("Geocoding timed out. Try again.")
+                        except Exception as e:
+                            st.error(f"Error: {e}")
+
+    # Geocode a CSV of addresses
+    st.subheader("Geocode a CSV of Addresses")
+    st.write("CSV should have an `address` column (and optionally `name`). "
+             "Addresses are looked up in the background; ones looked up before come from the cache.")
+
+    address_file = st.file_uploader("Upload address CSV", type=['csv'], key="address_csv")
+    job = st.session_state.get('geocode_job')
+
+    if address_file and not (job and job.running):
+        try:
+            address_df = pd.read_csv(address_file, dtype=str)
+            address_col = next((c for c in address_df.columns
+                                if c.lower() in ['address', 'location', 'place', 'addr']), None)
+
+            if address_col:
+                address_df = address_df.dropna(subset=[address_col])
+                st.write(f"{len(address_df):,} addresses in column `{address_col}`")
+
+                if st.button("Start Geocoding"):
+                    name_col = 'name' if 'name' in address_df.columns else None
+                    st.session_state['geocode_rows'] = list(zip(
+                        address_df[address_col],
+                        address_df[name_col] if name_col else address_df[address_col]
+                    ))
+                    st.session_state['geocode_job'] = BatchGeocoder(
+                        address_df[address_col], provider, geocode_cache
+                    ).start()
+                    st.session_state['geocode_added'] = None
+                    st.rerun()
+            else:
+                st.error("Could not find an address column")
+        except Exception as e:
+            st.error(f"Error reading CSV: {e}")
+
+    if job:
+        # Progress of the background geocoding
+        eta = job.eta_seconds()
+        status = f"Geocoded {job.done:,} of {job.total:,} different addresses ({job.from_cache:,} from cache)"
+        if job.running and eta:
+            status += f" - about {eta:,.0f}s left"
+        st.progress(job.done / job.total if job.total else 1.0, text=status)
+
+        if job.running:
+            if st.button("Stop Geocoding"):
+                job.stop()
         else:
-            st.warning("Install geopy for address lookup: `pip install geopy`")
+            if st.session_state.get('geocode_added') is None:
+                # Finished: add every address that was found (once)
+                found = [(row_name, location[0], location[1])
+                         for address, row_name in st.session_state['geocode_rows']
+                         if (location := job.result(address))]
+                names, found_lats, found_lons = zip(*found) if found else ([], [], [])
+                st.session_state['geocode_added'] = store.add_many(names, found_lats, found_lons)[0]
+
+            st.success(f"Added {st.session_state['geocode_added']:,} locations! Not found: {job.not_found:,}, "
+                       f"failed (try again later): {job.failed:,}")
+            if job.done < job.total:
+                st.warning(f"Stopped after {job.done:,} of {job.total:,} addresses.")
+            if job.failed and job.last_error:
+                st.warning(f"Last error: {job.last_error}")
 
     # Upload CSV
     st.subheader("Upload from CSV")
@@ -129,34 +223,23 @@ with tab1:
 
     if uploaded_file:
         try:
-            df = pd.read_csv(uploaded_file)
-
-            # Try to find lat/lon columns
-            lat_col = None
-            lon_col = None
-
-            for col in df.columns:
-                if col.lower() in ['lat', 'latitude']:
-                    lat_col = col
-                if col.lower() in ['lon', 'lng', 'longitude', 'long']:
-                    lon_col = col
+            # Look at the first rows to find the columns; the whole file is read when adding
+            preview = pd.read_csv(uploaded_file, nrows=5)
+            lat_col, lon_col = find_coordinate_columns(preview.columns)
 
             if lat_col and lon_col:
                 st.write(f"Found coordinates in columns: `{lat_col}`, `{lon_col}`")
-                st.dataframe(df.head())
+                st.dataframe(preview)
 
                 if st.button("Add All Locations from CSV"):
-                    name_col = 'name' if 'name' in df.columns else None
-
-                    for idx, row in df.iterrows():
-                        st.session_state['locations'].append({
-                            'name': row[name_col] if name_col else f"Location {idx+1}",
-                            'lat': row[lat_col],
-                            'lon': row[lon_col],
-                            'color': 'blue'
-                        })
-
-                    st.success(f"Added {len(df)} locations!")
+                    name_col = 'name' if 'name' in preview.columns else None
+                    uploaded_file.seek(0)
+                    with st.spinner("Reading locations..."):
+                        added, skipped = store.read_csv(uploaded_file, lat_col, lon_col, name_col)
+
+                    st.success(f"Added {added:,} locations!")
+                    if skipped:
+                        st.warning(f"Skipped {skipped:,} rows with missing or out-of-range coordinates")
             else:
                 st.error("Could not find latitude/longitude columns")
         except Exception as e:
@@ -165,76 +248,101 @@ with tab1:
     # Current locations
     st.subheader("Current Locations")
 
-    if st.session_state['locations']:
-        df = pd.DataFrame(st.session_state['locations'])
-        st.dataframe(df, use_container_width=True)
+    if len(store):
+        st.dataframe(store.to_frame(limit=TABLE_ROWS), use_container_width=True)
+        if len(store) > TABLE_ROWS:
+            st.caption(f"First {TABLE_ROWS:,} of {len(store):,} locations (download the CSV for all)")
 
         if st.button("Clear All Locations"):
-            st.session_state['locations'] = []
+            store.clear()
             st.rerun()
     else:
         st.info("No locations added yet")
 
+# The map is built once per set of locations, display mode and area; the View and Export tabs share it
+@st.cache_resource(max_entries=4)
+def get_map(fingerprint, mode, area, tiles, zoom, empty_center, _store):
+    """
+    (folium map, number of locations on it): the locations inside `area`
+    (all if None), drawn in the given render mode.
+    """
+    df = _store.to_frame(ids=_store.in_area(*area) if area else None)
+    if df.empty:
+        return folium.Map(location=empty_center, zoom_start=zoom, tiles=tiles), 0
+    m = folium.Map(location=[df['lat'].mean(), df['lon'].mean()], zoom_start=zoom, tiles=tiles)
+    if area:
+        m.fit_bounds([[area[0], area[1]], [area[2], area[3]]])
+    return add_points(m, df, mode), len(df)
+
+
+@st.cache_data(max_entries=4)
+def get_map_html(fingerprint, mode, area, tiles, zoom, empty_center, _store):
+    """Standalone HTML page of the map."""
+    m, _ = get_map(fingerprint, mode, area, tiles, zoom, empty_center, _store)
+    return m.get_root().render()
+
+
+@st.cache_data(max_entries=2)
+def get_csv(fingerprint, area, _store):
+    return _store.to_frame(ids=_store.in_area(*area) if area else None).to_csv(index=False)
+
+
 # Tab 2: View Map
 with tab2:
     st.header("Map Preview")
 
-    if st.session_state['locations']:
-        # Calculate center
-        lats = [loc['lat'] for loc in st.session_state['locations']]
-        lons = [loc['lon'] for loc in st.session_state['locations']]
-        center_lat = sum(lats) / len(lats)
-        center_lon = sum(lons) / len(lons)
-
-        # Create map
-        m = folium.Map(
-            location=[center_lat, center_lon],
-            zoom_start=default_zoom,
-            tiles=map_style
-        )
-
-        # Add markers
-        use_clusters = st.checkbox("Cluster nearby markers", value=len(st.session_state['locations']) > 20)
-
-        if use_clusters:
-            marker_cluster = MarkerCluster().add_to(m)
-            target = marker_cluster
-        else:
-            target = m
+    # Only show locations inside an area (uses the store's grid index)
+    area = None
+    if len(store):
+        with st.expander("📐 Show Only an Area"):
+            south, west, north, east = (round(float(b), 4) for b in store.bounds())
+            col1, col2, col3, col4 = st.columns(4)
+            area = (
+                col1.number_input("South", -90.0, 90.0, south, format="%.4f"),
+                col2.number_input("West", -180.0, 180.0, west, format="%.4f"),
+                col3.number_input("North", -90.0, 90.0, north, format="%.4f"),
+                col4.number_input("East", -180.0, 180.0, east, format="%.4f"),
+            )
+            st.caption("If West is greater than East, the area crosses the 180° meridian.")
+            if not st.checkbox("Use this area"):
+                area = None
 
-        for loc in st.session_state['locations']:
-            folium.Marker(
-                location=[loc['lat'], loc['lon']],
-                popup=f"<b>{loc['name']}</b><br>Lat: {loc['lat']:.4f}<br>Lon: {loc['lon']:.4f}",
-                tooltip=loc['name'],
-                icon=folium.Icon(color=loc['color'], icon='info-sign')
-            ).add_to(target)
+    mode = choose_mode(len(store) if area is None else len(store.in_area(*area)), render_mode)
+    m, shown = get_map(store.fingerprint, mode, area, map_style, default_zoom, (default_lat, default_lon), store)
 
-        # Display map
-        st_folium(m, width=None, height=500)
+    # returned_objects=[]: panning and zooming happen in the browser without rerunning the app
+    st_folium(m, width=None, height=500, returned_objects=[])
 
-        st.write(f"Showing {len(st.session_state['locations'])} location(s)")
+    if shown:
+        st.write(f"Showing {shown:,} of {len(store):,} location(s) - {mode.lower()}")
+    elif len(store):
+        st.info("No locations in this area")
     else:
-        # Show empty map
-        m = folium.Map(
-            location=[default_lat, default_lon],
-            zoom_start=default_zoom,
-            tiles=map_style
-        )
-        st_folium(m, width=None, height=500)
         st.info("Add locations to see them on the map")
 
+    # Nearest locations to a point
+    if len(store):
+        with st.expander("📍 Find Nearest Locations"):
+            col1, col2, col3 = st.columns(3)
+            center_lat, center_lon = store.centroid()
+            near_lat = col1.number_input("Latitude", -90.0, 90.0, round(float(center_lat), 4), format="%.4f")
+            near_lon = col2.number_input("Longitude", -180.0, 180.0, round(float(center_lon), 4), format="%.4f")
+            near_k = col3.number_input("How many", 1, 100, 5)
+
+            ids, distances = store.nearest(near_lat, near_lon, near_k)
+            nearest_df = store.to_frame(ids=ids).assign(distance_km=distances.round(2))
+            st.dataframe(nearest_df, use_container_width=True, hide_index=True)
+
 # Tab 3: Export
 with tab3:
     st.header("Export")
 
-    if st.session_state['locations']:
+    if shown:
         col1, col2 = st.columns(2)
 
         with col1:
             st.subheader("Download Locations (CSV)")
-            df = pd.DataFrame(st.session_state['locations'])
-            csv = df.to_csv(index=False)
+            csv = get_csv(store.fingerprint, area, store)
             st.download_button(
                 "Download CSV",
                 csv,
@@ -245,38 +353,33 @@ with tab3:
         with col2:
             st.subheader("Download Map (HTML)")
 
-            # Recreate map for download
-            lats = [loc['lat'] for loc in st.session_state['locations']]
-            lons = [loc['lon'] for loc in st.session_state['locations']]
-            center_lat = sum(lats) / len(lats)
-            center_lon = sum(lons) / len(lons)
+            # Large maps are exported as a grid summary so the file stays small
+            export_mode = mode
+            if shown > EXPORT_MAX_POINTS and mode != "Grid summary":
+                export_mode = "Grid summary"
+                st.caption(f"More than {EXPORT_MAX_POINTS:,} locations: the HTML map shows a grid summary. "
+                           "Download the CSV for every location.")
 
-            m = folium.Map(
-                location=[center_lat, center_lon],
-                zoom_start=default_zoom,
-                tiles=map_style
-            )
-
-            for loc in st.session_state['locations']:
-                folium.Marker(
-                    location=[loc['lat'], loc['lon']],
-                    popup=f"<b>{loc['name']}</b><br>Lat: {loc['lat']:.4f}<br>Lon: {loc['lon']:.4f}",
-                    tooltip=loc['name'],
-                    icon=folium.Icon(color=loc['color'], icon='info-sign')
-                ).add_to(m)
-
-            # Save to string
-            map_html = m._repr_html_()
+            map_html = get_map_html(store.fingerprint, export_mode, area, map_style, default_zoom,
+                                    (default_lat, default_lon), store)
 
             st.download_button(
-                "Download HTML Map",
+                f"Download HTML Map ({len(map_html) / 1e6:.1f} MB)",
                 map_html,
                 "my_map.html",
                 "text/html"
             )
+        if area:
+            st.caption("Only the locations in the chosen area are exported.")
     else:
         st.info("Add locations first to export")
 
 # --- Footer ---
 st.markdown("---")
 st.markdown("*Built with Streamlit & Folium | Digital Scholarship Lab Starter Kit*")
+
+# While addresses are being geocoded, refresh the page every second to show progress
+job = st.session_state.get('geocode_job')
+if job and job.running:
+    time.sleep(1)
+    st.rerun()
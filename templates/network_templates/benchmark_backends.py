@@ -0,0 +1,137 @@
+"""
+Network Backend Benchmark
+Compare NetworkX with the sparse-matrix (SciPy) backend on random networks.
+
+For each network size it times building the graph and computing density,
+connectivity, degree, eigenvector centrality and PageRank with both
+backends, and checks that both give the same numbers.
+
+Needs SciPy: pip install scipy
+
+Run with: python templates/network_templates/benchmark_backends.py
+"""
+
+import time
+
+import networkx as nx
+import numpy as np
+
+from edge_store import EdgeStore
+from sparse_backend import PowerIterationFailed, SparseGraph
+
+# ============================================
+# CONFIGURATION - Change these values!
+# ============================================
+
+# Network sizes to test (number of edges)
+EDGE_COUNTS = [10_000, 100_000, 1_000_000]
+
+# Average number of edges per node
+EDGES_PER_NODE = 5
+
+# Directed or undirected networks
+DIRECTED = False
+
+# ============================================
+# BENCHMARK
+# ============================================
+
+def make_store(num_edges, seed=42):
+    """
+    Random network where some nodes have many more connections than others.
+    """
+    rng = np.random.default_rng(seed)
+    num_nodes = max(2, num_edges // EDGES_PER_NODE)
+    sources = rng.integers(0, num_nodes, num_edges)
+    targets = (rng.zipf(1.8, num_edges) * 7919 + rng.integers(0, 3, num_edges)) % num_nodes
+
+    names = np.array([f"n{i}" for i in range(num_nodes)], dtype=object)
+    store = EdgeStore()
+    store.add_many(names[sources], names[targets], rng.random(num_edges) + 0.5)
+    return store
+
+
+def run_networkx(store):
+    timings = {}
+    start = time.perf_counter()
+    G = store.to_networkx(DIRECTED)
+    timings['build'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    nx.density(G)
+    nx.is_weakly_connected(G) if DIRECTED else nx.is_connected(G)
+    timings['density + connected'] = time.perf_counter() - start
+
+    results = {}
+    for name, func in [
+        ('degree', nx.degree_centrality),
+        ('eigenvector', lambda graph: nx.eigenvector_centrality(graph, max_iter=500)),
+        ('pagerank', nx.pagerank),
+    ]:
+        start = time.perf_counter()
+        try:
+            results[name] = func(G)
+        except nx.PowerIterationFailedConvergence:
+            results[name] = None
+        timings[name] = time.perf_counter() - start
+    return timings, results
+
+
+def run_sparse(store):
+    timings = {}
+    start = time.perf_counter()
+    graph = SparseGraph.from_store(store, DIRECTED)
+    timings['build'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    graph.density()
+    graph.is_connected()
+    timings['density + connected'] = time.perf_counter() - start
+
+    results = {}
+    for name, func in [
+        ('degree', graph.degree_centrality),
+        ('eigenvector', graph.eigenvector_centrality),
+        ('pagerank', graph.pagerank),
+    ]:
+        start = time.perf_counter()
+        try:
+            results[name] = graph.scores(func())
+        except PowerIterationFailed:
+            results[name] = None
+        timings[name] = time.perf_counter() - start
+    return timings, results
+
+
+def max_difference(a, b):
+    if a is None or b is None:
+        return "no conv." if a is None and b is None else "MISMATCH"
+    return f"{max(abs(a[node] - b[node]) for node in a):.1e}"
+
+
+def main():
+    print("=" * 60)
+    print("Network Backend Benchmark (NetworkX vs sparse SciPy)")
+    print("=" * 60)
+
+    for num_edges in EDGE_COUNTS:
+        store = make_store(num_edges)
+        print(f"\n{num_edges:,} edges, {store.num_nodes:,} nodes")
+
+        nx_times, nx_results = run_networkx(store)
+        sp_times, sp_results = run_sparse(store)
+
+        print(f"{'Step':<22} {'NetworkX':>10} {'Sparse':>10} {'Speedup':>9} {'Max diff':>10}")
+        for step in nx_times:
+            diff = ""
+            if step in nx_results:
+                diff = max_difference(nx_results[step], sp_results[step])
+            speedup = nx_times[step] / max(sp_times[step], 1e-9)
+            print(f"{step:<22} {nx_times[step]:>9.3f}s {sp_times[step]:>9.3f}s {speedup:>8.1f}x {diff:>10}")
+
+        total_nx, total_sp = sum(nx_times.values()), sum(sp_times.values())
+        print(f"{'total':<22} {total_nx:>9.3f}s {total_sp:>9.3f}s {total_nx / total_sp:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Centrality Engine for the Network Visualizer
+Betweenness and closeness without freezing the app on big networks.
+
+Exact betweenness and closeness look at the shortest paths from every node,
+which takes hours on large networks. This module offers:
+- Approximate betweenness: shortest paths from a random sample of k nodes
+  only. k is chosen from an error target and a time budget
+- Parallel exact computation: the nodes are split into groups and each
+  group is handled by its own process (all CPU cores)
+- Timing: a quick test run measures how long one node takes, so the app can
+  show how long the exact computation would take
+
+Used by simple_network.py.
+"""
+
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import networkx as nx
+
+MEASURES = ["Degree", "Betweenness", "Closeness", "Eigenvector", "PageRank"]
+
+METHODS = ["Auto", "Exact", "Exact (parallel)", "Approximate"]
+
+# "Auto" computes exactly up to this many nodes
+AUTO_EXACT_MAX_NODES = 2000
+
+# Nodes used for the quick test run that measures the speed
+PILOT_SOURCES = 10
+
+# Groups of nodes per worker process (more groups = more even work)
+CHUNKS_PER_WORKER = 4
+
+
+# ============================================
+# TIMING AND APPROXIMATION
+# ============================================
+
+def samples_for_error(max_error):
+    """
+    Sample size k for an approximate betweenness with about this much error
+    (the error of a k-sample estimate shrinks like 1 / sqrt(k)).
+    """
+    return math.ceil(1 / max_error ** 2)
+
+
+def seconds_per_source(G, seed=42):
+    """
+    How long the shortest paths from one node take (timed on a few nodes).
+    """
+    k = min(PILOT_SOURCES, len(G))
+    start = time.perf_counter()
+    nx.betweenness_centrality(G, k=k, seed=seed)
+    return (time.perf_counter() - start) / max(k, 1)
+
+
+def approximate_betweenness(G, max_error=0.05, time_budget=10, seed=42):
+    """
+    Betweenness from the shortest paths of k random nodes.
+
+    Args:
+        G: NetworkX graph
+        max_error: Target error (sets the sample size)
+        time_budget: Seconds the computation may take (also limits the sample)
+        seed: Random seed, so results are repeatable
+
+    Returns:
+        (scores, k) - k is the number of nodes actually sampled
+    """
+    per_source = seconds_per_source(G, seed)
+    affordable = int(time_budget / per_source) if per_source > 0 else len(G)
+    k = min(len(G), samples_for_error(max_error), max(PILOT_SOURCES, affordable))
+    return nx.betweenness_centrality(G, k=k, seed=seed), k
+
+
+# ============================================
+# PARALLEL EXACT COMPUTATION
+# ============================================
+
+_worker_graph = None
+
+
+def _init_worker(G):
+    # Each worker process receives the graph once, not once per task
+    global _worker_graph
+    _worker_graph = G
+
+
+def _betweenness_part(sources):
+    # Betweenness counted only from these source nodes (the parts add up)
+    return nx.betweenness_centrality_subset(_worker_graph, sources, list(_worker_graph), normalized=True)
+
+
+def _closeness_part(nodes):
+    # Same formula as nx.closeness_centrality (the worker graph is already
+    # reversed for directed graphs, so distances are measured *to* each node)
+    G = _worker_graph
+    scores = {}
+    for u in nodes:
+        distances = nx.single_source_shortest_path_length(G, u)
+        total = sum(distances.values())
+        reached = len(distances) - 1
+        scores[u] = reached / total * reached / (len(G) - 1) if total > 0 and len(G) > 1 else 0.0
+    return scores
+
+
+def parallel_centrality(G, measure, workers=None):
+    """
+    Exact betweenness or closeness, with the nodes split over processes.
+
+    Gives the same numbers as nx.betweenness_centrality(G) and
+    nx.closeness_centrality(G).
+    """
+    workers = workers or os.cpu_count() or 1
+    nodes = list(G)
+    size = max(1, math.ceil(len(nodes) / (workers * CHUNKS_PER_WORKER)))
+    chunks = [nodes[i:i + size] for i in range(0, len(nodes), size)]
+
+    if measure == "Betweenness":
+        graph, part = G, _betweenness_part
+    else:
+        graph, part = (G.reverse() if G.is_directed() else G), _closeness_part
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(graph,)) as pool:
+        parts = list(pool.map(part, chunks))
+
+    if measure == "Closeness":
+        return {node: score for scores in parts for node, score in scores.items()}
+
+    scores = dict.fromkeys(nodes, 0.0)
+    for part_scores in parts:
+        for node, score in part_scores.items():
+            scores[node] += score
+    return scores
+
+
+# ============================================
+# ONE ENTRY POINT
+# ============================================
+
+def compute_centrality(G, measure, method="Auto", max_error=0.05, time_budget=10, workers=None):
+    """
+    Compute a centrality measure and report how it was done.
+
+    Args:
+        G: NetworkX graph
+        measure: One of MEASURES
+        method: One of METHODS (only used for Betweenness and Closeness;
+            closeness has no approximate method and is computed in parallel)
+        max_error, time_budget: Settings for the approximate method
+        workers: Processes for the parallel method (None = all CPU cores)
+
+    Returns:
+        (scores, info) - info has 'method', 'seconds', 'sources' (nodes
+        whose shortest paths were used) and 'note'
+    """
+    info = {'method': "Exact", 'sources': len(G), 'note': None}
+    start = time.perf_counter()
+
+    if measure in ("Betweenness", "Closeness"):
+        if method == "Auto":
+            method = "Exact" if len(G) <= AUTO_EXACT_MAX_NODES else "Approximate"
+        if method == "Approximate" and measure == "Closeness":
+            method = "Exact (parallel)"
+            info['note'] = "Closeness has no approximate method, computed exactly in parallel."
+        info['method'] = method
+
+    if measure == "Degree":
+        scores = nx.degree_centrality(G)
+    elif method == "Approximate":
+        scores, info['sources'] = approximate_betweenness(G, max_error, time_budget)
+    elif method == "Exact (parallel)":
+        scores = parallel_centrality(G, measure, workers)
+    elif measure == "Betweenness":
+        scores = nx.betweenness_centrality(G)
+    elif measure == "Closeness":
+        scores = nx.closeness_centrality(G)
+    elif measure == "PageRank":
+        scores = nx.pagerank(G)
+    else:
+        try:
+            scores = nx.eigenvector_centrality(G, max_iter=500)
+        except nx.NetworkXException:
+            scores = nx.degree_centrality(G)
+            info['note'] = "Eigenvector centrality did not converge, showing degree centrality."
+
+    info['seconds'] = time.perf_counter() - start
+    return scores, info
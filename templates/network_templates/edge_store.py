@@ -0,0 +1,183 @@
+"""
+Edge Store for the Network Visualizer
+Keeps connections as NumPy columns instead of one dictionary per edge.
+
+- Every node name is stored once and given a number (interning); the edges
+  themselves are three arrays: source numbers, target numbers and weights
+- Edges are added in bulk (a whole CSV chunk at a time), so importing
+  millions of rows takes seconds
+- CSV files are read in chunks, so memory stays bounded
+- Each change gives the store a new fingerprint; the app builds the
+  NetworkX graph once per fingerprint instead of on every rerun
+
+Used by simple_network.py.
+"""
+
+import uuid
+
+import numpy as np
+import pandas as pd
+import networkx as nx
+
+# Rows read from a CSV file at a time
+CSV_CHUNK_ROWS = 1_000_000
+
+
+class EdgeStore:
+    """
+    Columnar list of weighted edges between named nodes.
+
+    Usage:
+        store = EdgeStore()
+        store.add("Alice", "Bob")
+        store.read_csv("edges.csv", "source", "target", "weight")
+        G = store.to_networkx(directed=False)
+    """
+
+    def __init__(self):
+        self.node_names = []    # node id -> name
+        self._node_ids = {}     # name -> node id
+        self._chunks = []       # (sources, targets, weights) arrays not merged yet
+        self._columns = (np.empty(0, np.int32), np.empty(0, np.int32), np.empty(0, np.float64))
+        self._token = uuid.uuid4().hex
+        self.version = 0
+
+    # --- Adding edges ---
+
+    def add(self, source, target, weight=1.0):
+        """Add one edge."""
+        self.add_many([source], [target], [weight])
+
+    def add_many(self, sources, targets, weights=None):
+        """
+        Add many edges at once.
+
+        Args:
+            sources, targets: Sequences (or pandas Series) of node names
+            weights: Sequence of weights, or None for all 1.0
+
+        Edges with a missing (None/NaN) source or target are skipped.
+        """
+        sources = np.asarray(sources, dtype=object)
+        targets = np.asarray(targets, dtype=object)
+        if weights is None:
+            weights = np.ones(len(sources))
+        weights = np.asarray(weights, dtype=np.float64)
+
+        # pd.factorize numbers missing names -1, which would index the last node
+        keep = ~(pd.isna(sources) | pd.isna(targets))
+        if not keep.all():
+            sources, targets, weights = sources[keep], targets[keep], weights[keep]
+        if len(sources) == 0:
+            return
+
+        # Number the names of this batch, then map the (few) unique names
+        # to store-wide node ids with one dictionary lookup each
+        codes, uniques = pd.factorize(np.concatenate([sources, targets]))
+        lookup = np.empty(len(uniques), dtype=np.int32)
+        for i, name in enumerate(uniques):
+            node_id = self._node_ids.get(name)
+            if node_id is None:
+                node_id = self._node_ids[name] = len(self.node_names)
+                self.node_names.append(name)
+            lookup[i] = node_id
+        ids = lookup[codes]
+
+        self._chunks.append((ids[:len(sources)], ids[len(sources):], weights))
+        self.version += 1
+
+    def read_csv(self, file, source_col, target_col, weight_col=None, chunk_rows=CSV_CHUNK_ROWS):
+        """
+        Add all edges from a CSV file, reading it in chunks.
+
+        Rows without a source or target are skipped; missing or non-numeric
+        weights count as 1.0.
+
+        Returns:
+            Number of edges added
+        """
+        columns = [source_col, target_col] + ([weight_col] if weight_col else [])
+        added = 0
+        for chunk in pd.read_csv(file, usecols=columns, dtype={source_col: str, target_col: str},
+                                 chunksize=chunk_rows):
+            chunk = chunk.dropna(subset=[source_col, target_col])
+            weights = None
+            if weight_col:
+                weights = pd.to_numeric(chunk[weight_col], errors='coerce').fillna(1.0).to_numpy()
+            self.add_many(chunk[source_col].to_numpy(), chunk[target_col].to_numpy(), weights)
+            added += len(chunk)
+        return added
+
+    def clear(self):
+        """Remove all edges and nodes."""
+        self.node_names = []
+        self._node_ids = {}
+        self._chunks = []
+        self._columns = (np.empty(0, np.int32), np.empty(0, np.int32), np.empty(0, np.float64))
+        self.version += 1
+
+    # --- Reading ---
+
+    @property
+    def fingerprint(self):
+        """Changes whenever the edges change."""
+        return f"{self._token}-{self.version}"
+
+    @property
+    def columns(self):
+        """(sources, targets, weights) as NumPy arrays of node ids and weights."""
+        if self._chunks:
+            self._columns = tuple(
+                np.concatenate([old] + [chunk[i] for chunk in self._chunks])
+                for i, old in enumerate(self._columns)
+            )
+            self._chunks = []
+        return self._columns
+
+    def __len__(self):
+        return len(self.columns[0])
+
+    @property
+    def num_nodes(self):
+        return len(self.node_names)
+
+    def degrees(self):
+        """Number of edges at each node (array by node id)."""
+        sources, targets, _ = self.columns
+        return np.bincount(np.concatenate([sources, targets]), minlength=self.num_nodes)
+
+    def top_nodes(self, n):
+        """Ids of the n nodes with the most edges (all nodes if there are fewer)."""
+        degrees = self.degrees()
+        if len(degrees) <= n:
+            return np.arange(len(degrees))
+        return np.argpartition(-degrees, n)[:n]
+
+    def to_frame(self, limit=None):
+        """Edges as a DataFrame with source, target and weight columns."""
+        sources, targets, weights = (column[:limit] for column in self.columns)
+        names = np.asarray(self.node_names, dtype=object)
+        return pd.DataFrame({'source': names[sources], 'target': names[targets], 'weight': weights})
+
+    def to_networkx(self, directed=False, nodes=None):
+        """
+        Build a NetworkX graph in one go.
+
+        Args:
+            directed: DiGraph instead of Graph
+            nodes: Optional node ids; only edges between these nodes are used
+
+        With repeated edges between the same two nodes, the last weight wins
+        (as with G.add_edge).
+        """
+        sources, targets, weights = self.columns
+        if nodes is not None:
+            keep = np.zeros(self.num_nodes, dtype=bool)
+            keep[nodes] = True
+            mask = keep[sources] & keep[targets]
+            sources, targets, weights = sources[mask], targets[mask], weights[mask]
+
+        names = np.asarray(self.node_names, dtype=object)
+        df = pd.DataFrame({'source': names[sources], 'target': names[targets], 'weight': weights})
+        return nx.from_pandas_edgelist(df, 'source', 'target', 'weight',
+                                       create_using=nx.DiGraph if directed else nx.Graph)
@@ -0,0 +1,130 @@
+"""
+Graph Layout and Drawing Helpers
+Keep network pictures fast, even for graphs with many thousands of nodes.
+
+- Layouts can start from the positions of the previous layout, so adding a
+  few connections only moves the graph a little (and takes fewer steps)
+- Only the best-connected nodes get a label, so the picture stays readable
+- Graphs can also be shown as an interactive web page (pyvis)
+
+Used by simple_network.py.
+"""
+
+import networkx as nx
+import numpy as np
+
+try:
+    import scipy  # noqa: F401 (networkx uses it for big spring and Kamada-Kawai layouts)
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+try:
+    from pyvis.network import Network
+    PYVIS_AVAILABLE = True
+except ImportError:
+    PYVIS_AVAILABLE = False
+
+LAYOUTS = ["Spring", "Circular", "Kamada-Kawai", "Shell", "Random"]
+
+# Kamada-Kawai needs a table of all node pairs (n² memory)
+KAMADA_KAWAI_MAX_NODES = 300
+
+# Without SciPy, networkx can only compute spring layouts below this size
+SPRING_MAX_NODES_WITHOUT_SCIPY = 499
+
+# Spring layout steps when starting from the previous positions
+INCREMENTAL_ITERATIONS = 15
+
+
+def seed_positions(G, previous, seed=42):
+    """
+    Starting positions for a layout: old nodes keep their previous position,
+    new nodes are placed next to their already placed neighbours.
+    """
+    rng = np.random.default_rng(seed)
+    pos = {node: np.asarray(previous[node], dtype=float) for node in G if node in previous}
+
+    for node in G:
+        if node in pos:
+            continue
+        placed = [pos[n] for n in nx.all_neighbors(G, node) if n in pos]
+        center = np.mean(placed, axis=0) if placed else rng.uniform(-1, 1, 2)
+        pos[node] = center + rng.normal(0, 0.05, 2)
+    return pos
+
+
+def compute_layout(G, layout, previous=None, seed=42):
+    """
+    Position every node of the graph.
+
+    Args:
+        G: NetworkX graph
+        layout: One of LAYOUTS
+        previous: Positions from an earlier layout of (almost) the same graph
+        seed: Random seed, so the same graph always looks the same
+
+    Returns:
+        (positions, note) - note explains any change of layout, or is None
+    """
+    note = None
+    if layout == "Kamada-Kawai" and (len(G) > KAMADA_KAWAI_MAX_NODES or not SCIPY_AVAILABLE):
+        layout = "Spring"
+        note = (f"Kamada-Kawai is too slow for {len(G):,} nodes, used Spring instead." if SCIPY_AVAILABLE
+                else "Kamada-Kawai needs SciPy (pip install scipy), used Spring instead.")
+    if layout == "Spring" and len(G) > SPRING_MAX_NODES_WITHOUT_SCIPY and not SCIPY_AVAILABLE:
+        layout = "Circular"
+        note = f"Spring layouts of {len(G):,} nodes need SciPy (pip install scipy), used Circular instead."
+
+    start = None
+    if previous and layout in ("Spring", "Kamada-Kawai") and any(node in previous for node in G):
+        start = seed_positions(G, previous, seed)
+
+    if layout == "Spring":
+        if start:
+            pos = nx.spring_layout(G, pos=start, iterations=INCREMENTAL_ITERATIONS, seed=seed)
+        else:
+            pos = nx.spring_layout(G, seed=seed)
+    elif layout == "Circular":
+        pos = nx.circular_layout(G)
+    elif layout == "Kamada-Kawai":
+        pos = nx.kamada_kawai_layout(G, pos=start)
+    elif layout == "Shell":
+        pos = nx.shell_layout(G)
+    else:
+        pos = nx.random_layout(G, seed=seed)
+
+    return pos, note
+
+
+def label_nodes(G, max_labels):
+    """
+    Labels for the `max_labels` best-connected nodes ({node: label}).
+    """
+    if len(G) <= max_labels:
+        return {node: node for node in G}
+    degrees = dict(G.degree())
+    return {node: node for node in sorted(degrees, key=degrees.get, reverse=True)[:max_labels]}
+
+
+def to_pyvis_html(G, pos, labels, node_color="#6495ED", height=700):
+    """
+    Interactive HTML page of the graph (zoom, drag, hover for names).
+
+    Nodes are placed at the given positions with physics turned off, so the
+    browser does not have to simulate the layout again.
+    """
+    net = Network(height=f"{height}px", width="100%", directed=G.is_directed(), cdn_resources='remote')
+    net.toggle_physics(False)
+
+    scale = 1000  # positions are between -1 and 1; pyvis works in pixels
+    for node in G:
+        x, y = pos[node]
+        net.add_node(
+            str(node), label=str(labels.get(node, "")), title=str(node),
+            x=float(x) * scale, y=float(-y) * scale, color=node_color,
+        )
+    for u, v, data in G.edges(data=True):
+        net.add_edge(str(u), str(v), value=float(data.get('weight', 1.0)))
+
+    return net.generate_html()
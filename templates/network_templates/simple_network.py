@@ -6,8 +6,10 @@ Run with: streamlit run templates/network_templates/simple_network.py
 """
 
 import streamlit as st
+import streamlit.components.v1 as components
 import pandas as pd
 import io
+import time
 
 # Try to import network libraries
 try:
@@ -22,6 +24,13 @@ try:
 except ImportError:
     MATPLOTLIB_AVAILABLE = False
 
+if NETWORKX_AVAILABLE:
+    from graph_layout import (LAYOUTS, PYVIS_AVAILABLE, compute_layout,
+                              label_nodes, to_pyvis_html)
+    from edge_store import EdgeStore
+    from centrality import MEASURES, METHODS, compute_centrality, seconds_per_source
+    from sparse_backend import SCIPY_AVAILABLE, SPARSE_MEASURES, SparseGraph, compute_sparse_centrality
+
 # Page configuration
 st.set_page_config(
     page_title="Network Visualizer",
@@ -39,8 +48,9 @@ if not NETWORKX_AVAILABLE or not MATPLOTLIB_AVAILABLE:
     st.stop()
 
 # Initialize session state
-if 'edges' not in st.session_state:
-    st.session_state['edges'] = []
+if 'edge_store' not in st.session_state:
+    st.session_state['edge_store'] = EdgeStore()
+store = st.session_state['edge_store']
 
 # --- Sidebar ---
 st.sidebar.header("Graph Settings")
@@ -52,13 +62,155 @@ graph_type = st.sidebar.selectbox(
 
 layout = st.sidebar.selectbox(
     "Layout",
-    ["Spring", "Circular", "Kamada-Kawai", "Shell", "Random"]
+    LAYOUTS
 )
 
 node_size = st.sidebar.slider("Node Size", 100, 3000, 1000)
 font_size = st.sidebar.slider("Font Size", 6, 20, 10)
 node_color = st.sidebar.color_picker("Node Color", "#6495ED")
 
+st.sidebar.subheader("Large Graphs")
+renderer = st.sidebar.radio(
+    "Draw with",
+    ["Image (matplotlib)", "Interactive (pyvis)"] if PYVIS_AVAILABLE else ["Image (matplotlib)"]
+)
+max_draw_nodes = st.sidebar.slider(
+    "Max nodes to draw", 100, 2000, 1000, step=100,
+    help="Bigger networks show only their best-connected nodes (analysis always uses all nodes)"
+)
+max_labels = st.sidebar.slider("Label the top N nodes", 0, 200, 50)
+
+
+# ============================================
+# GRAPH AND LAYOUT (cached)
+# ============================================
+SPARSE_BACKEND = "Sparse (SciPy)"
+
+# Everything is keyed by the graph fingerprint, which changes whenever the
+# connections or the graph type change, so nothing is rebuilt on a rerun.
+
+def graph_fingerprint():
+    return f"{store.fingerprint}-{graph_type}"
+
+
+@st.cache_resource(max_entries=2, show_spinner="Building graph...")
+def get_graph(fingerprint, directed, _store):
+    """The full NetworkX graph (for analysis), built once per change."""
+    return _store.to_networkx(directed)
+
+
+@st.cache_resource(max_entries=2, show_spinner="Building sparse matrix...")
+def get_sparse_graph(fingerprint, directed, _store):
+    """The graph as a SciPy sparse matrix (for fast metrics), built once per change."""
+    return SparseGraph.from_store(_store, directed)
+
+
+@st.cache_resource(max_entries=4)
+def get_view(fingerprint, directed, max_nodes, _store):
+    """The part of the graph that is drawn: its best-connected nodes."""
+    return _store.to_networkx(directed, nodes=_store.top_nodes(max_nodes))
+
+
+@st.cache_data(max_entries=16, show_spinner="Computing layout...")
+def get_layout(fingerprint, layout, max_nodes, _view, _previous):
+    """
+    Node positions, computed once per graph and layout setting.
+    The View and Export tabs share the result.
+    """
+    return compute_layout(_view, layout, _previous)
+
+
+def layout_for(fingerprint):
+    """
+    The graph as it will be drawn (sampled if big) and its node positions.
+    A new layout starts from the last positions, so small edits move little.
+    """
+    view = get_view(fingerprint, graph_type == "Directed", max_draw_nodes, store)
+    previous = st.session_state.setdefault('last_layout', {})
+    pos, note = get_layout(fingerprint, layout, max_draw_nodes, view, previous.get(layout))
+    previous[layout] = pos
+    return view, pos, note
+
+
+@st.cache_data(max_entries=8, show_spinner="Drawing network...")
+def draw_network(fingerprint, layout, max_nodes, max_labels, node_size, font_size, node_color,
+                 _view, _pos, title):
+    """
+    PNG picture of the (sampled) graph, drawn once per graph and style.
+    The View and Export tabs share the result.
+    """
+    fig, ax = plt.subplots(figsize=(12, 8))
+
+    # Get edge weights for width
+    weights = [_view[u][v]['weight'] for u, v in _view.edges()]
+    max_weight = max(weights) if weights else 1
+    edge_widths = [w / max_weight * 3 + 0.5 for w in weights]
+
+    # Draw edges
+    nx.draw_networkx_edges(_view, _pos, ax=ax, width=edge_widths,
+                           alpha=0.6, arrows=(graph_type == "Directed"))
+
+    # Draw nodes (smaller when there are many)
+    size = node_size if len(_view) <= 100 else max(10, node_size * 100 // len(_view))
+    nx.draw_networkx_nodes(_view, _pos, ax=ax, node_size=size,
+                           node_color=node_color, alpha=0.9)
+
+    # Draw labels (only for the best-connected nodes)
+    nx.draw_networkx_labels(_view, _pos, labels=label_nodes(_view, max_labels), ax=ax, font_size=font_size)
+
+    ax.set_title(title)
+    ax.axis('off')
+
+    plt.tight_layout()
+    png = io.BytesIO()
+    fig.savefig(png, format='png', dpi=150, bbox_inches='tight')
+    plt.close(fig)
+    return png.getvalue()
+
+
+@st.cache_data(max_entries=16, show_spinner="Computing centrality...")
+def get_centrality(fingerprint, measure, method, max_error, time_budget, _G):
+    """Centrality scores and timing, computed once per graph and setting."""
+    return compute_centrality(_G, measure, method, max_error, time_budget)
+
+
+@st.cache_data(max_entries=16, show_spinner="Computing centrality...")
+def get_sparse_centrality(fingerprint, measure, _graph):
+    return compute_sparse_centrality(_graph, measure)
+
+
+@st.cache_data(max_entries=8)
+def get_basic_stats(fingerprint, backend, _graph):
+    """(nodes, edges, density, connected) from either backend."""
+    if backend == SPARSE_BACKEND:
+        return _graph.num_nodes, _graph.num_edges, _graph.density(), _graph.is_connected()
+    connected = nx.is_weakly_connected(_graph) if _graph.is_directed() else nx.is_connected(_graph)
+    return _graph.number_of_nodes(), _graph.number_of_edges(), nx.density(_graph), connected
+
+
+@st.cache_data(max_entries=4, show_spinner="Measuring speed...")
+def get_seconds_per_source(fingerprint, _G):
+    return seconds_per_source(_G)
+
+
+def network_title(view):
+    title = f"Network Graph ({store.num_nodes:,} nodes, {len(store):,} connections)"
+    if len(view) < store.num_nodes:
+        title += f" - showing the {len(view):,} best-connected nodes"
+    return title
+
+
+@st.cache_data(max_entries=1, show_spinner="Preparing CSV...")
+def make_edge_csv(fingerprint, _store):
+    return _store.to_frame().to_csv(index=False)
+
+
+def network_png(view, pos, title):
+    """The cached picture for the current sidebar settings."""
+    return draw_network(graph_fingerprint(), layout, max_draw_nodes, max_labels,
+                        node_size, font_size, node_color, view, pos, title)
+
+
 # --- Main Interface ---
 tab1, tab2, tab3, tab4 = st.tabs(["Add Connections", "View Network", "Analysis", "Export"])
 
@@ -78,11 +230,7 @@ with tab1:
 
             if st.form_submit_button("Add Connection"):
                 if source and target:
-                    st.session_state['edges'].append({
-                        'source': source.strip(),
-                        'target': target.strip(),
-                        'weight': weight
-                    })
+                    store.add(source.strip(), target.strip(), weight)
                     st.success(f"Added: {source} → {target}")
                 else:
                     st.error("Please enter both source and target")
@@ -99,17 +247,9 @@ with tab1:
 
         if st.button("Add All"):
             lines = bulk_input.strip().split('\n')
-            added = 0
-            for line in lines:
-                if ',' in line:
-                    parts = line.split(',')
-                    if len(parts) >= 2:
-                        st.session_state['edges'].append({
-                            'source': parts[0].strip(),
-                            'target': parts[1].strip(),
-                            'weight': 1.0
-                        })
-                        added += 1
+            pairs = [line.split(',') for line in lines if ',' in line]
+            store.add_many([p[0].strip() for p in pairs], [p[1].strip() for p in pairs])
+            added = len(pairs)
             if added > 0:
                 st.success(f"Added {added} connections!")
 
@@ -121,8 +261,9 @@ with tab1:
 
     if uploaded_file:
         try:
-            df = pd.read_csv(uploaded_file)
-            st.dataframe(df.head())
+            # Only the first rows are read for the preview
+            df = pd.read_csv(uploaded_file, nrows=5)
+            st.dataframe(df)
 
             # Check for required columns
             source_col = None
@@ -138,14 +279,12 @@ with tab1:
                 if st.button("Import Connections"):
                     weight_col = 'weight' if 'weight' in df.columns else None
 
-                    for idx, row in df.iterrows():
-                        st.session_state['edges'].append({
-                            'source': str(row[source_col]),
-                            'target': str(row[target_col]),
-                            'weight': row[weight_col] if weight_col else 1.0
-                        })
+                    start = time.perf_counter()
+                    uploaded_file.seek(0)
+                    with st.spinner("Importing connections..."):
+                        imported = store.read_csv(uploaded_file, source_col, target_col, weight_col)
 
-                    st.success(f"Imported {len(df)} connections!")
+                    st.success(f"Imported {imported:,} connections in {time.perf_counter() - start:.1f}s!")
             else:
                 st.error("Could not find source/target columns")
         except Exception as e:
@@ -154,12 +293,14 @@ with tab1:
     # Current edges
     st.subheader("Current Connections")
 
-    if st.session_state['edges']:
-        df = pd.DataFrame(st.session_state['edges'])
-        st.dataframe(df, use_container_width=True)
+    if len(store):
+        st.write(f"{len(store):,} connections between {store.num_nodes:,} nodes")
+        st.dataframe(store.to_frame(limit=1000), use_container_width=True)
+        if len(store) > 1000:
+            st.caption("Showing the first 1,000 connections (download all from the Export tab)")
 
         if st.button("Clear All"):
-            st.session_state['edges'] = []
+            store.clear()
             st.rerun()
     else:
         st.info("No connections added yet")
@@ -168,56 +309,20 @@ with tab1:
 with tab2:
     st.header("Network Visualization")
 
-    if st.session_state['edges']:
-        # Create graph
-        if graph_type == "Directed":
-            G = nx.DiGraph()
-        else:
-            G = nx.Graph()
-
-        # Add edges
-        for edge in st.session_state['edges']:
-            G.add_edge(edge['source'], edge['target'], weight=edge['weight'])
-
-        # Choose layout
-        if layout == "Spring":
-            pos = nx.spring_layout(G, seed=42)
-        elif layout == "Circular":
-            pos = nx.circular_layout(G)
-        elif layout == "Kamada-Kawai":
-            pos = nx.kamada_kawai_layout(G)
-        elif layout == "Shell":
-            pos = nx.shell_layout(G)
-        else:
-            pos = nx.random_layout(G, seed=42)
-
-        # Draw network
-        fig, ax = plt.subplots(figsize=(12, 8))
-
-        # Get edge weights for width
-        weights = [G[u][v]['weight'] for u, v in G.edges()]
-        max_weight = max(weights) if weights else 1
-        edge_widths = [w / max_weight * 3 + 0.5 for w in weights]
+    if len(store):
+        view, pos, note = layout_for(graph_fingerprint())
 
-        # Draw edges
-        nx.draw_networkx_edges(G, pos, ax=ax, width=edge_widths,
-                               alpha=0.6, arrows=(graph_type == "Directed"))
+        title = network_title(view)
+        if note:
+            st.info(note)
 
-        # Draw nodes
-        nx.draw_networkx_nodes(G, pos, ax=ax, node_size=node_size,
-                               node_color=node_color, alpha=0.9)
-
-        # Draw labels
-        nx.draw_networkx_labels(G, pos, ax=ax, font_size=font_size)
-
-        ax.set_title(f"Network Graph ({G.number_of_nodes()} nodes, {G.number_of_edges()} edges)")
-        ax.axis('off')
-
-        plt.tight_layout()
-        st.pyplot(fig)
-
-        # Store graph for analysis
-        st.session_state['graph'] = G
+        if renderer == "Interactive (pyvis)":
+            st.caption(title)
+            components.html(
+                to_pyvis_html(view, pos, label_nodes(view, max_labels), node_color), height=720
+            )
+        else:
+            st.image(network_png(view, pos, title))
 
     else:
         st.info("Add connections to see the network visualization")
@@ -226,20 +331,34 @@ with tab2:
 with tab3:
     st.header("Network Analysis")
 
-    if 'graph' in st.session_state:
-        G = st.session_state['graph']
+    if len(store):
+        directed = graph_type == "Directed"
+
+        # The sparse backend gives the same numbers, much faster on big networks
+        backend = "NetworkX"
+        if SCIPY_AVAILABLE:
+            backend = st.radio("Backend", [SPARSE_BACKEND, "NetworkX"], horizontal=True,
+                               help="Sparse (SciPy) computes degree, eigenvector, PageRank, density "
+                                    "and connectivity with sparse matrices")
+
+        if backend == SPARSE_BACKEND:
+            sparse_graph = get_sparse_graph(graph_fingerprint(), directed, store)
+            nodes, edges, density, connected = get_basic_stats(graph_fingerprint(), backend, sparse_graph)
+        else:
+            G = get_graph(graph_fingerprint(), directed, store)
+            nodes, edges, density, connected = get_basic_stats(graph_fingerprint(), backend, G)
 
         # Basic stats
         col1, col2, col3, col4 = st.columns(4)
 
         with col1:
-            st.metric("Nodes", G.number_of_nodes())
+            st.metric("Nodes", nodes)
         with col2:
-            st.metric("Edges", G.number_of_edges())
+            st.metric("Edges", edges)
         with col3:
-            st.metric("Density", f"{nx.density(G):.3f}")
+            st.metric("Density", f"{density:.3f}")
         with col4:
-            if nx.is_connected(G) if not G.is_directed() else nx.is_weakly_connected(G):
+            if connected:
                 st.metric("Connected", "Yes")
             else:
                 st.metric("Connected", "No")
@@ -249,30 +368,66 @@ with tab3:
 
         centrality_type = st.selectbox(
             "Centrality Measure",
-            ["Degree", "Betweenness", "Closeness", "Eigenvector"]
+            MEASURES if SCIPY_AVAILABLE else [m for m in MEASURES if m != "PageRank"]
         )
 
+        # Betweenness and closeness are slow on big networks: choose how
+        method, max_error, time_budget = "Exact", None, None
+        use_sparse = backend == SPARSE_BACKEND and centrality_type in SPARSE_MEASURES
+        if not use_sparse:
+            G = get_graph(graph_fingerprint(), directed, store)
+
+        if centrality_type in ("Betweenness", "Closeness"):
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                method = st.selectbox(
+                    "Method", METHODS,
+                    help="Auto: exact for small networks, approximate for big ones. "
+                         "Exact (parallel) uses all CPU cores."
+                )
+            with col2:
+                max_error = st.select_slider("Max error (approximate)", [0.01, 0.02, 0.05, 0.1, 0.2], value=0.05)
+            with col3:
+                time_budget = st.slider("Time budget in seconds (approximate)", 1, 120, 10)
+
+            per_source = get_seconds_per_source(graph_fingerprint(), G)
+            st.caption(f"Exact computation takes about {per_source * G.number_of_nodes():,.1f}s on one CPU core "
+                       f"({per_source * 1000:.1f} ms for each of the {G.number_of_nodes():,} nodes)")
+
+        if use_sparse:
+            centrality, info = get_sparse_centrality(graph_fingerprint(), centrality_type, sparse_graph)
+        else:
+            centrality, info = get_centrality(graph_fingerprint(), centrality_type, method, max_error, time_budget, G)
+
         if centrality_type == "Degree":
-            centrality = nx.degree_centrality(G)
             st.caption("Degree centrality: How many connections each node has")
         elif centrality_type == "Betweenness":
-            centrality = nx.betweenness_centrality(G)
             st.caption("Betweenness centrality: How often a node appears on shortest paths")
         elif centrality_type == "Closeness":
-            centrality = nx.closeness_centrality(G)
             st.caption("Closeness centrality: How close a node is to all others")
-        else:
-            try:
-                centrality = nx.eigenvector_centrality(G, max_iter=500)
-            except:
-                centrality = nx.degree_centrality(G)
+        elif centrality_type == "Eigenvector":
             st.caption("Eigenvector centrality: Connection to other well-connected nodes")
+        else:
+            st.caption("PageRank: Chance of arriving at a node when following connections at random")
+
+        if info['note']:
+            st.info(info['note'])
+        used = f" from {info['sources']:,} sampled nodes" if info['method'] == "Approximate" else ""
+        st.caption(f"{info['method']}{used}: computed in {info['seconds']:.2f}s")
+
+        # Keep the timings, so exact and approximate can be compared
+        timings = st.session_state.setdefault('centrality_timings', {})
+        timings[f"{centrality_type} ({info['method']})"] = {
+            'Seconds': round(info['seconds'], 2), 'Nodes used': info['sources']
+        }
+        with st.expander("⏱️ Timings"):
+            st.dataframe(pd.DataFrame.from_dict(timings, orient='index'))
 
         # Display centrality scores
-        centrality_df = pd.DataFrame([
-            {'Node': node, 'Centrality': score}
-            for node, score in sorted(centrality.items(), key=lambda x: -x[1])
-        ])
+        centrality_df = (
+            pd.Series(centrality, dtype=float).sort_values(ascending=False, kind='stable')
+            .rename_axis('Node').reset_index(name='Centrality')
+        )
 
         col1, col2 = st.columns([1, 2])
 
@@ -297,53 +452,32 @@ with tab3:
 with tab4:
     st.header("Export")
 
-    if st.session_state['edges']:
+    if len(store):
         col1, col2 = st.columns(2)
 
         with col1:
             st.subheader("Download Edge List (CSV)")
-            df = pd.DataFrame(st.session_state['edges'])
-            csv = df.to_csv(index=False)
-            st.download_button(
-                "Download CSV",
-                csv,
-                "network_edges.csv",
-                "text/csv"
-            )
-
-        with col2:
-            st.subheader("Download Network Image")
-
-            if 'graph' in st.session_state:
-                G = st.session_state['graph']
-
-                # Create figure
-                fig, ax = plt.subplots(figsize=(12, 8))
-
-                if layout == "Spring":
-                    pos = nx.spring_layout(G, seed=42)
-                elif layout == "Circular":
-                    pos = nx.circular_layout(G)
-                else:
-                    pos = nx.kamada_kawai_layout(G)
-
-                nx.draw(G, pos, ax=ax, with_labels=True,
-                       node_size=node_size, node_color=node_color,
-                       font_size=font_size)
-
-                # Save to buffer
-                buf = io.BytesIO()
-                fig.savefig(buf, format='png', dpi=150, bbox_inches='tight')
-                buf.seek(0)
 
+            # Big edge lists are only converted to CSV when asked for
+            if len(store) <= 100_000 or st.button("Prepare CSV"):
                 st.download_button(
-                    "Download PNG",
-                    buf,
-                    "network.png",
-                    "image/png"
+                    "Download CSV",
+                    make_edge_csv(store.fingerprint, store),
+                    "network_edges.csv",
+                    "text/csv"
                 )
 
-                plt.close(fig)
+        with col2:
+            st.subheader("Download Network Image")
+
+            # Same picture as the View tab (layout and image come from the cache)
+            view, pos, _ = layout_for(graph_fingerprint())
+            st.download_button(
+                "Download PNG",
+                network_png(view, pos, network_title(view)),
+                "network.png",
+                "image/png"
+            )
     else:
         st.info("Add connections first to export")
 
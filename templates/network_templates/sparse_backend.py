@@ -0,0 +1,193 @@
+"""
+Sparse-Matrix Backend for the Network Visualizer
+Network metrics with SciPy sparse matrices instead of NetworkX objects.
+
+The connections are turned into one sparse adjacency matrix (straight from
+the edge store's NumPy columns), and every metric is a few vectorised
+matrix operations:
+- degree and degree centrality: row and column counts
+- density: number of edges / possible edges
+- connected components: scipy.sparse.csgraph
+- eigenvector centrality and PageRank: power iteration (repeated
+  matrix-vector products), the same iterations NetworkX runs in Python
+
+The results match NetworkX (within the convergence tolerance). Betweenness
+and closeness still need NetworkX (see centrality.py).
+
+Optional: needs SciPy (pip install scipy).
+
+Used by simple_network.py and benchmark_backends.py.
+"""
+
+import time
+
+import numpy as np
+
+try:
+    import scipy.sparse as sparse
+    from scipy.sparse.csgraph import connected_components
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+# Measures this backend can compute
+SPARSE_MEASURES = ["Degree", "Eigenvector", "PageRank"]
+
+
+class PowerIterationFailed(Exception):
+    """Raised when eigenvector centrality or PageRank does not converge."""
+
+
+class SparseGraph:
+    """
+    A graph as a SciPy sparse adjacency matrix.
+
+    Usage:
+        graph = SparseGraph.from_store(store, directed=False)
+        graph.density()
+        graph.pagerank()
+    """
+
+    def __init__(self, matrix, node_names, directed, num_edges):
+        self.matrix = matrix            # CSR adjacency matrix with edge weights
+        self.node_names = node_names    # node id -> name
+        self.directed = directed
+        self.num_edges = num_edges      # edges as NetworkX counts them
+
+        # Same matrix with 1 for every edge (unweighted metrics)
+        self.binary = matrix.copy()
+        self.binary.data[:] = 1.0
+
+    @classmethod
+    def from_store(cls, store, directed=False):
+        """
+        Build the adjacency matrix from an EdgeStore.
+
+        Repeated edges between the same nodes count once and keep the last
+        weight, and undirected edges are stored in both directions (self-loops
+        once), exactly like NetworkX.
+        """
+        sources, targets, weights = store.columns
+        n = store.num_nodes
+
+        if not directed:
+            sources, targets = np.minimum(sources, targets), np.maximum(sources, targets)
+
+        # Keep the last occurrence of every (source, target) pair
+        pairs = sources.astype(np.int64) * n + targets
+        _, first_in_reversed = np.unique(pairs[::-1], return_index=True)
+        last = len(pairs) - 1 - first_in_reversed
+        sources, targets, weights = sources[last], targets[last], weights[last]
+        num_edges = len(last)
+
+        if not directed:
+            mirror = sources != targets
+            sources, targets, weights = (
+                np.concatenate([sources, targets[mirror]]),
+                np.concatenate([targets, sources[mirror]]),
+                np.concatenate([weights, weights[mirror]]),
+            )
+
+        matrix = sparse.csr_array((weights, (sources, targets)), shape=(n, n))
+        return cls(matrix, store.node_names, directed, num_edges)
+
+    # --- Basic facts ---
+
+    @property
+    def num_nodes(self):
+        return self.matrix.shape[0]
+
+    def density(self):
+        n = self.num_nodes
+        if n <= 1:
+            return 0.0
+        possible = n * (n - 1) if self.directed else n * (n - 1) / 2
+        return self.num_edges / possible
+
+    def degrees(self):
+        """Number of edges at each node (in + out for directed graphs)."""
+        out_degree = np.diff(self.binary.indptr)
+        if self.directed:
+            return out_degree + np.bincount(self.binary.indices, minlength=self.num_nodes)
+        # A self-loop counts twice, as in NetworkX
+        return out_degree + (self.binary.diagonal() > 0)
+
+    def components(self):
+        """(number of components, component label of each node) - weak for directed graphs."""
+        return connected_components(self.binary, directed=self.directed, connection='weak')
+
+    def is_connected(self):
+        return self.components()[0] == 1
+
+    # --- Centrality ---
+
+    def degree_centrality(self):
+        if self.num_nodes <= 1:
+            return np.ones(self.num_nodes)
+        return self.degrees() / (self.num_nodes - 1)
+
+    def eigenvector_centrality(self, max_iter=500, tol=1e-6):
+        """
+        Same power iteration as nx.eigenvector_centrality(G, max_iter=500)
+        (unweighted, iterating with A + I).
+        """
+        n = self.num_nodes
+        transposed = self.binary.T.tocsr()
+        x = np.full(n, 1.0 / n)
+        for _ in range(max_iter):
+            last = x
+            x = last + transposed @ last
+            norm = np.linalg.norm(x) or 1.0
+            x = x / norm
+            if np.abs(x - last).sum() < n * tol:
+                return x
+        raise PowerIterationFailed(f"Eigenvector centrality did not converge in {max_iter} iterations")
+
+    def pagerank(self, alpha=0.85, max_iter=100, tol=1e-6):
+        """
+        Same power iteration as nx.pagerank(G) (weighted; nodes without
+        outgoing edges share their score with every node).
+        """
+        n = self.num_nodes
+        out_weight = np.asarray(self.matrix.sum(axis=1)).ravel()
+        dangling = out_weight == 0
+        scale = np.divide(1.0, out_weight, out=np.zeros(n), where=~dangling)
+        transition_t = (sparse.diags_array(scale) @ self.matrix).T.tocsr()
+
+        x = np.full(n, 1.0 / n)
+        for _ in range(max_iter):
+            last = x
+            x = alpha * (transition_t @ last + last[dangling].sum() / n) + (1 - alpha) / n
+            if np.abs(x - last).sum() < n * tol:
+                return x
+        raise PowerIterationFailed(f"PageRank did not converge in {max_iter} iterations")
+
+    def scores(self, values):
+        """{node name: score} for an array of scores by node id."""
+        return dict(zip(self.node_names, values.tolist()))
+
+
+def compute_sparse_centrality(graph, measure):
+    """
+    Compute a centrality measure with the sparse backend.
+
+    Returns:
+        (scores, info) in the same form as centrality.compute_centrality
+    """
+    info = {'method': "Exact (sparse)", 'sources': graph.num_nodes, 'note': None}
+    start = time.perf_counter()
+
+    if measure == "Degree":
+        values = graph.degree_centrality()
+    elif measure == "PageRank":
+        values = graph.pagerank()
+    else:
+        try:
+            values = graph.eigenvector_centrality()
+        except PowerIterationFailed:
+            values = graph.degree_centrality()
+            info['note'] = "Eigenvector centrality did not converge, showing degree centrality."
+
+    scores = graph.scores(values)
+    info['seconds'] = time.perf_counter() - start
+    return scores, info
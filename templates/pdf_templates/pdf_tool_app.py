@@ -7,6 +7,9 @@ Run with: streamlit run templates/pdf_templates/pdf_tool_app.py
 
 import streamlit as st
 import io
+import hashlib
+import threading
+from collections import OrderedDict
 
 # Try to import PDF libraries
 try:
@@ -15,6 +18,100 @@ try:
 except ImportError:
     PYPDF2_AVAILABLE = False
 
+# ============================================
+# SETTINGS
+# ============================================
+
+# Extracted page text is kept in memory up to this size (shared by all users)
+PAGE_CACHE_MAX_MB = 200
+
+# How many pages the preview shows at a time
+PREVIEW_PAGES = 10
+
+
+class PageTextCache:
+    """
+    Remembers extracted text per (document hash, page index).
+
+    When the cache is bigger than max_bytes (counted as characters, which
+    is close enough for a memory limit), the least recently used pages
+    are dropped first.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._pages:
+                self._pages.move_to_end(key)
+                self.hits += 1
+                return self._pages[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, text):
+        with self._lock:
+            if key in self._pages:
+                self.size -= len(self._pages.pop(key))
+            self._pages[key] = text
+            self.size += len(text)
+
+            # Drop least recently used pages until we fit
+            while self.size > self.max_bytes and len(self._pages) > 1:
+                _, old_text = self._pages.popitem(last=False)
+                self.size -= len(old_text)
+
+
+@st.cache_resource
+def get_page_cache():
+    """One page cache for the whole app, kept between reruns."""
+    return PageTextCache(PAGE_CACHE_MAX_MB * 1024 * 1024)
+
+
+def get_page_text(reader, doc_hash, page_index):
+    """
+    Get the text of one page, extracting it only if it is not cached yet.
+    """
+    cache = get_page_cache()
+    key = (doc_hash, page_index)
+
+    text = cache.get(key)
+    if text is None:
+        text = reader.pages[page_index].extract_text() or ""
+        cache.put(key, text)
+    return text
+
+
+def iter_page_texts(reader, doc_hash, pages):
+    """
+    Yield (page_index, text) one page at a time, for pages that have text.
+    """
+    for i in pages:
+        text = get_page_text(reader, doc_hash, i)
+        if text:
+            yield i, text
+
+
+def parse_page_range(page_range, num_pages):
+    """
+    Turn "1-5" or "1,3,5" into a list of 0-based page indexes.
+    """
+    if '-' in page_range:
+        start, end = page_range.split('-')
+        pages = range(int(start)-1, int(end))
+    elif ',' in page_range:
+        pages = [int(p.strip())-1 for p in page_range.split(',')]
+    else:
+        pages = [int(page_range)-1]
+    return [i for i in pages if 0 <= i < num_pages]
+
+
 # Page configuration
 st.set_page_config(
     page_title="PDF Tool",
@@ -40,24 +137,33 @@ uploaded_file = st.file_uploader(
 )
 
 if uploaded_file:
-    # Read PDF
-    try:
-        pdf_reader = PyPDF2.PdfReader(io.BytesIO(uploaded_file.read()))
+    # Read PDF (only again if a different file was uploaded)
+    pdf_bytes = uploaded_file.getvalue()
+    doc_hash = hashlib.sha256(pdf_bytes).hexdigest()
+
+    if st.session_state.get('doc_hash') != doc_hash:
+        try:
+            pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
 
-        # Store in session state
-        st.session_state['pdf_reader'] = pdf_reader
-        st.session_state['filename'] = uploaded_file.name
+            # Store in session state
+            st.session_state['pdf_reader'] = pdf_reader
+            st.session_state['doc_hash'] = doc_hash
+            st.session_state['filename'] = uploaded_file.name
+            st.session_state.pop('selected_pages', None)
+            st.session_state.pop('download', None)
 
-        st.success(f"Successfully loaded: {uploaded_file.name}")
+        except Exception as e:
+            st.error(f"Error reading PDF: {e}")
+            st.stop()
 
-    except Exception as e:
-        st.error(f"Error reading PDF: {e}")
-        st.stop()
+    st.success(f"Successfully loaded: {uploaded_file.name}")
 
 # --- PDF Analysis ---
 if 'pdf_reader' in st.session_state:
     reader = st.session_state['pdf_reader']
+    doc_hash = st.session_state['doc_hash']
     filename = st.session_state['filename']
+    num_pages = len(reader.pages)
 
     st.header("2. PDF Information")
 
@@ -65,7 +171,7 @@ if 'pdf_reader' in st.session_state:
     col1, col2, col3 = st.columns(3)
 
     with col1:
-        st.metric("Pages", len(reader.pages))
+        st.metric("Pages", num_pages)
 
     with col2:
         # Try to get title
@@ -115,91 +221,104 @@ if 'pdf_reader' in st.session_state:
                 placeholder="1-3"
             )
 
-    # Extract button
+    # Extract button: only remembers the pages, text is extracted
+    # page by page when it is shown or downloaded
     if st.button("Extract Text", type="primary"):
-        with st.spinner("Extracting text..."):
-            extracted_text = ""
-            pages_to_extract = []
-
-            if extraction_mode == "All pages":
-                pages_to_extract = list(range(len(reader.pages)))
-            else:
-                # Parse page range
-                try:
-                    if '-' in page_range:
-                        start, end = page_range.split('-')
-                        pages_to_extract = list(range(int(start)-1, int(end)))
-                    elif ',' in page_range:
-                        pages_to_extract = [int(p.strip())-1 for p in page_range.split(',')]
-                    else:
-                        pages_to_extract = [int(page_range)-1]
-                except:
-                    st.error("Invalid page range. Use format like '1-5' or '1,3,5'")
-                    pages_to_extract = []
-
-            # Extract text
-            for i in pages_to_extract:
-                if 0 <= i < len(reader.pages):
-                    page_text = reader.pages[i].extract_text()
-                    if page_text:
-                        extracted_text += f"\n\n--- Page {i+1} ---\n\n"
-                        extracted_text += page_text
-
-            if extracted_text:
-                st.session_state['extracted_text'] = extracted_text
-                st.success(f"Extracted text from {len(pages_to_extract)} page(s)")
-            else:
-                st.warning("No text could be extracted. The PDF may be scanned/image-based.")
+        if extraction_mode == "All pages":
+            st.session_state['selected_pages'] = list(range(num_pages))
+        else:
+            try:
+                st.session_state['selected_pages'] = parse_page_range(page_range, num_pages)
+            except ValueError:
+                st.error("Invalid page range. Use format like '1-5' or '1,3,5'")
+                st.session_state['selected_pages'] = []
+        st.session_state['preview_count'] = PREVIEW_PAGES
+        st.session_state.pop('download', None)
 
     # --- Display Results ---
-    if 'extracted_text' in st.session_state:
-        text = st.session_state['extracted_text']
+    if st.session_state.get('selected_pages'):
+        selected_pages = st.session_state['selected_pages']
 
         st.header("4. Results")
+        st.write(f"{len(selected_pages)} page(s) selected")
 
-        # Stats
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            st.metric("Characters", f"{len(text):,}")
-        with col2:
-            st.metric("Words", f"{len(text.split()):,}")
-        with col3:
-            st.metric("Lines", f"{text.count(chr(10)):,}")
-
-        # Text preview
+        # Text preview: only the first pages, more are loaded on request
         st.subheader("Extracted Text")
-        st.text_area(
-            "Preview:",
-            text,
-            height=400
-        )
+        preview_count = st.session_state.get('preview_count', PREVIEW_PAGES)
+        shown_pages = selected_pages[:preview_count]
+
+        shown_any = False
+        for i, text in iter_page_texts(reader, doc_hash, shown_pages):
+            st.markdown(f"**--- Page {i+1} ---**")
+            st.text(text)
+            shown_any = True
+
+        if not shown_any:
+            st.warning("No text found on these pages. The PDF may be scanned/image-based.")
+
+        if preview_count < len(selected_pages):
+            if st.button(f"Show {PREVIEW_PAGES} more pages"):
+                st.session_state['preview_count'] = preview_count + PREVIEW_PAGES
+                st.rerun()
 
         # Download options
         st.subheader("Download")
 
-        col1, col2 = st.columns(2)
+        download_format = st.radio(
+            "Format:",
+            ["Text with page markers", "Clean text (no page markers)"],
+            horizontal=True
+        )
+        clean = download_format.startswith("Clean")
+
+        if st.button("Prepare Download"):
+            # Build the file once, page by page, straight into bytes
+            buffer = io.BytesIO()
+            chars = words = lines = 0
+            progress = st.progress(0.0)
+
+            for n, (i, text) in enumerate(iter_page_texts(reader, doc_hash, selected_pages)):
+                section = f"{text}\n\n" if clean else f"\n\n--- Page {i+1} ---\n\n{text}"
+                buffer.write(section.encode('utf-8'))
+                chars += len(section)
+                words += len(text.split())
+                lines += section.count("\n")
+                progress.progress(min((n + 1) / len(selected_pages), 1.0))
+
+            progress.empty()
+            st.session_state['download'] = {
+                'data': buffer.getvalue(),
+                'clean': clean,
+                'stats': (chars, words, lines),
+            }
 
-        with col1:
-            st.download_button(
-                "Download as TXT",
-                text,
-                file_name=filename.replace('.pdf', '.txt'),
-                mime="text/plain"
-            )
+        download = st.session_state.get('download')
+        if download and download['clean'] == clean:
+            chars, words, lines = download['stats']
 
-        with col2:
-            # Clean text version (remove page markers)
-            clean_text = text
-            import re
-            clean_text = re.sub(r'\n*--- Page \d+ ---\n*', '\n\n', clean_text)
+            # Stats
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Characters", f"{chars:,}")
+            with col2:
+                st.metric("Words", f"{words:,}")
+            with col3:
+                st.metric("Lines", f"{lines:,}")
 
+            suffix = '_clean.txt' if clean else '.txt'
             st.download_button(
-                "Download Clean Text",
-                clean_text.strip(),
-                file_name=filename.replace('.pdf', '_clean.txt'),
+                "Download as TXT",
+                download['data'],
+                file_name=filename.replace('.pdf', suffix),
                 mime="text/plain"
             )
 
+        cache = get_page_cache()
+        st.caption(
+            f"Page cache: {cache.size / (1024 * 1024):.1f} / {PAGE_CACHE_MAX_MB} MB, "
+            f"{cache.hits} hits, {cache.misses} misses"
+        )
+
 else:
     st.info("Upload a PDF file to begin.")
 
@@ -217,8 +336,9 @@ with st.expander("Tips & Troubleshooting"):
     - Try the `pdfplumber` library instead
 
     **Large PDF?**
-    - Extract specific pages instead of all pages
-    - Process in batches
+    - Pages are only extracted when you look at them or download them
+    - Extracted pages are cached, so clicking again is instant
+    - Raise `PAGE_CACHE_MAX_MB` at the top of the script to cache more pages
     """)
 
 # --- Footer ---
@@ -7,6 +7,14 @@ Run with: python templates/pdf_templates/simple_pdf_reader.py
 
 import os
 import glob
+import time
+import sqlite3
+import hashlib
+import argparse
+from datetime import datetime
+import queue
+import multiprocessing
+from collections import deque
 
 # Try to import PyPDF2
 try:
@@ -29,10 +37,32 @@ OUTPUT_FOLDER = "data/processed"
 # Process all PDFs or just one?
 SINGLE_FILE = None  # Set to "filename.pdf" to process just one file
 
+# Batch mode: use several CPU cores at once
+PARALLEL = True
+WORKERS = None  # None = use all CPU cores
+
+# Give up on a file if one piece of it takes longer than this
+FILE_TIMEOUT_SECONDS = 300
+
+# Large PDFs are split into pieces of this many pages
+PAGES_PER_CHUNK = 50
+
+# Remember which PDFs were already extracted, so unchanged files are skipped
+# (run with --force to extract everything again)
+USE_MANIFEST = True
+MANIFEST_FILE = "data/processed/.pdf_manifest.sqlite"
+
 # ============================================
 # MAIN CODE
 # ============================================
 
+def page_section(page_number, page_text):
+    """
+    Format one page of extracted text with its page marker.
+    """
+    return f"\n--- Page {page_number} ---\n{page_text}"
+
+
 def extract_text_from_pdf(pdf_path):
     """
     Extract all text from a PDF file.
@@ -62,14 +92,13 @@ def extract_text_from_pdf(pdf_path):
                     print(f"  Author: {metadata.author}")
 
             # Extract text from all pages
-            text = ""
+            parts = []
             for i, page in enumerate(reader.pages):
                 page_text = page.extract_text()
                 if page_text:
-                    text += f"\n--- Page {i + 1} ---\n"
-                    text += page_text
+                    parts.append(page_section(i + 1, page_text))
 
-            return text
+            return "".join(parts)
 
     except Exception as e:
         print(f"  Error: {e}")
@@ -107,6 +136,135 @@ def save_text(text, output_path):
     print(f"  Saved to: {output_path}")
 
 
+def get_output_path(pdf_path):
+    """
+    Get the .txt path in OUTPUT_FOLDER for a PDF file.
+    """
+    filename = os.path.basename(pdf_path)
+    output_filename = filename.replace('.pdf', '.txt').replace('.PDF', '.txt')
+    return os.path.join(OUTPUT_FOLDER, output_filename)
+
+
+# ============================================
+# EXTRACTION MANIFEST (skip unchanged PDFs)
+# ============================================
+
+def open_manifest(manifest_path=None):
+    """
+    Open (or create) the SQLite file that remembers extracted PDFs.
+    """
+    manifest_path = manifest_path or MANIFEST_FILE
+    os.makedirs(os.path.dirname(manifest_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(manifest_path)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS extracted (
+            pdf_path TEXT PRIMARY KEY,
+            size INTEGER,
+            mtime REAL,
+            sha256 TEXT,
+            pages INTEGER,
+            output_path TEXT,
+            extracted_at TEXT
+        )
+    """)
+    return conn
+
+
+def file_sha256(file_path):
+    """
+    Hash a file's contents, reading it in 1 MB blocks.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def is_unchanged(manifest, pdf_path):
+    """
+    Check whether a PDF was already extracted and has not changed since.
+
+    Size and modification time are checked first (cheap). The content hash
+    is only computed when the size matches but the mtime differs, e.g.
+    after a copy or `touch`.
+    """
+    row = manifest.execute(
+        "SELECT size, mtime, sha256, output_path FROM extracted WHERE pdf_path = ?",
+        (os.path.abspath(pdf_path),)
+    ).fetchone()
+    if row is None:
+        return False
+
+    size, mtime, sha256, output_path = row
+    if not os.path.exists(output_path):
+        return False
+
+    stat = os.stat(pdf_path)
+    if stat.st_size != size:
+        return False
+    if stat.st_mtime == mtime:
+        return True
+
+    if file_sha256(pdf_path) != sha256:
+        return False
+
+    # Same content, new mtime: remember the new mtime for next time
+    manifest.execute(
+        "UPDATE extracted SET mtime = ? WHERE pdf_path = ?",
+        (stat.st_mtime, os.path.abspath(pdf_path))
+    )
+    manifest.commit()
+    return True
+
+
+def record_extraction(manifest, pdf_path, pages=None):
+    """
+    Remember that a PDF was extracted successfully.
+    """
+    stat = os.stat(pdf_path)
+    manifest.execute(
+        "INSERT OR REPLACE INTO extracted VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (os.path.abspath(pdf_path), stat.st_size, stat.st_mtime, file_sha256(pdf_path),
+         pages, get_output_path(pdf_path), datetime.now().isoformat(timespec='seconds'))
+    )
+    manifest.commit()
+
+
+def select_changed_files(pdf_files, manifest, force=False):
+    """
+    Split PDFs into the ones that need extracting and the ones to skip.
+
+    Returns:
+        (files to process, number of unchanged files skipped)
+    """
+    if manifest is None or force:
+        return pdf_files, 0
+
+    to_process = [pdf_path for pdf_path in pdf_files if not is_unchanged(manifest, pdf_path)]
+    skipped = len(pdf_files) - len(to_process)
+
+    print(f"Manifest: {skipped} unchanged (hits), {len(to_process)} new or changed (misses)")
+    return to_process, skipped
+
+
+def print_manifest_stats(manifest, force, skipped, processed):
+    """
+    Print manifest hit/miss counts for the summary.
+    """
+    if manifest is None:
+        return
+    if force:
+        print("Manifest: ignored (--force)")
+    else:
+        print(f"Manifest hits (skipped): {skipped}")
+        print(f"Manifest misses (new or changed): {processed}")
+
+
+# ============================================
+# PROCESSING
+# ============================================
+
 def process_single_pdf(pdf_path):
     """
     Process a single PDF file.
@@ -119,8 +277,7 @@ def process_single_pdf(pdf_path):
 
     if text:
         # Save to output folder
-        output_filename = filename.replace('.pdf', '.txt').replace('.PDF', '.txt')
-        output_path = os.path.join(OUTPUT_FOLDER, output_filename)
+        output_path = get_output_path(pdf_path)
         save_text(text, output_path)
 
         # Show preview
@@ -132,11 +289,10 @@ def process_single_pdf(pdf_path):
         return False
 
 
-def process_all_pdfs():
+def find_pdf_files():
     """
-    Process all PDF files in the input folder.
+    Find all PDF files in the input folder.
     """
-    # Find all PDFs
     pdf_pattern = os.path.join(INPUT_FOLDER, "*.pdf")
     pdf_files = glob.glob(pdf_pattern)
 
@@ -144,12 +300,22 @@ def process_all_pdfs():
     pdf_pattern_upper = os.path.join(INPUT_FOLDER, "*.PDF")
     pdf_files.extend(glob.glob(pdf_pattern_upper))
 
+    return sorted(set(pdf_files))
+
+
+def process_all_pdfs(manifest=None, force=False):
+    """
+    Process all PDF files in the input folder.
+    """
+    pdf_files = find_pdf_files()
+
     if not pdf_files:
         print(f"\nNo PDF files found in {INPUT_FOLDER}/")
         print("Please add some PDF files and try again.")
         return
 
     print(f"\nFound {len(pdf_files)} PDF file(s)")
+    pdf_files, skipped = select_changed_files(pdf_files, manifest, force)
 
     successful = 0
     failed = 0
@@ -157,6 +323,8 @@ def process_all_pdfs():
     for pdf_path in pdf_files:
         if process_single_pdf(pdf_path):
             successful += 1
+            if manifest is not None:
+                record_extraction(manifest, pdf_path)
         else:
             failed += 1
 
@@ -166,6 +334,221 @@ def process_all_pdfs():
     print("=" * 50)
     print(f"Successfully processed: {successful}")
     print(f"Failed/skipped: {failed}")
+    print_manifest_stats(manifest, force, skipped, len(pdf_files))
+    print(f"Output folder: {OUTPUT_FOLDER}/")
+
+
+# ============================================
+# BATCH MODE (several CPU cores)
+# ============================================
+
+def extract_page_range(pdf_path, start, end):
+    """
+    Extract text from pages start..end-1 of a PDF.
+
+    Runs inside a worker process, so it must not print anything.
+
+    Returns:
+        (total number of pages in the PDF, list of page sections)
+    """
+    with open(pdf_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        total_pages = len(reader.pages)
+
+        sections = []
+        for i in range(start, min(end, total_pages)):
+            page_text = reader.pages[i].extract_text()
+            if page_text:
+                sections.append(page_section(i + 1, page_text))
+
+        return total_pages, sections
+
+
+def process_all_pdfs_parallel(manifest=None, force=False):
+    """
+    Process all PDF files in the input folder using a pool of processes.
+
+    Each PDF is split into chunks of PAGES_PER_CHUNK pages. The first chunk
+    also tells us the page count, then the remaining chunks are queued.
+    Text is written to disk in page order as soon as chunks finish.
+    """
+    pdf_files = find_pdf_files()
+
+    if not pdf_files:
+        print(f"\nNo PDF files found in {INPUT_FOLDER}/")
+        print("Please add some PDF files and try again.")
+        return
+
+    workers = WORKERS or os.cpu_count() or 1
+    print(f"\nFound {len(pdf_files)} PDF file(s), using {workers} worker(s)")
+    pdf_files, skipped = select_changed_files(pdf_files, manifest, force)
+
+    # Work still to submit: (pdf_path, chunk_index)
+    tasks = deque((pdf_path, 0) for pdf_path in pdf_files)
+
+    # Chunks currently running: (pdf_path, chunk_index) -> deadline
+    running = {}
+
+    # Progress per file
+    files = {
+        pdf_path: {'chunks': None, 'next': 0, 'waiting': {}, 'out': None,
+                   'pages': 0, 'chars': 0, 'started': None, 'failed': False}
+        for pdf_path in pdf_files
+    }
+
+    # Results come back from the workers through this queue
+    results = queue.Queue()
+
+    successful = 0
+    failed = 0
+    total_pages = 0
+    total_bytes = 0
+    start_time = time.perf_counter()
+
+    def fail_file(pdf_path, reason):
+        nonlocal failed
+        state = files[pdf_path]
+        if state['failed']:
+            return
+        state['failed'] = True
+        failed += 1
+
+        # Remove the half-written output
+        if state['out']:
+            state['out'].close()
+            os.remove(get_output_path(pdf_path))
+            state['out'] = None
+
+        print(f"  ✗ {os.path.basename(pdf_path)}: {reason}")
+
+    def finish_file(pdf_path):
+        nonlocal successful, total_pages, total_bytes
+        state = files[pdf_path]
+
+        if state['out']:
+            state['out'].close()
+            state['out'] = None
+
+        if state['chars'] == 0:
+            fail_file(pdf_path, "no text could be extracted (may be scanned/image PDF)")
+            return
+
+        successful += 1
+        total_pages += state['pages']
+        total_bytes += os.path.getsize(pdf_path)
+        if manifest is not None:
+            record_extraction(manifest, pdf_path, state['pages'])
+        seconds = time.perf_counter() - state['started']
+        print(f"  ✓ {os.path.basename(pdf_path)}: {state['pages']} pages, "
+              f"{state['chars']:,} chars ({seconds:.1f}s)")
+
+    def write_ready_chunks(pdf_path):
+        # Write chunks in page order: only once all earlier chunks are done
+        state = files[pdf_path]
+        while state['next'] in state['waiting']:
+            sections = state['waiting'].pop(state['next'])
+            if sections:
+                if state['out'] is None:
+                    state['out'] = open(get_output_path(pdf_path), 'w', encoding='utf-8')
+                state['out'].write("".join(sections))
+                state['chars'] += sum(len(section) for section in sections)
+            state['next'] += 1
+
+        if state['next'] == state['chunks']:
+            finish_file(pdf_path)
+
+    # Results from a pool that was replaced after a timeout are ignored
+    pool = multiprocessing.Pool(processes=workers)
+    generation = 0
+    try:
+        while tasks or running:
+            # Keep every worker busy, but don't queue up more than that,
+            # so the timeout measures real work and not waiting time
+            while tasks and len(running) < workers:
+                pdf_path, chunk_index = tasks.popleft()
+                if files[pdf_path]['failed']:
+                    continue
+                if files[pdf_path]['started'] is None:
+                    files[pdf_path]['started'] = time.perf_counter()
+
+                key = (pdf_path, chunk_index)
+                start = chunk_index * PAGES_PER_CHUNK
+                pool.apply_async(
+                    extract_page_range,
+                    (pdf_path, start, start + PAGES_PER_CHUNK),
+                    callback=lambda result, key=key, gen=generation: results.put((gen, key, result, None)),
+                    error_callback=lambda error, key=key, gen=generation: results.put((gen, key, None, error)),
+                )
+                running[key] = time.monotonic() + FILE_TIMEOUT_SECONDS
+
+            try:
+                gen, key, result, error = results.get(timeout=1.0)
+            except queue.Empty:
+                gen, key = None, None
+
+            if key is not None and gen == generation and key in running:
+                del running[key]
+                pdf_path, chunk_index = key
+                state = files[pdf_path]
+
+                if state['failed']:
+                    pass
+                elif error is not None:
+                    fail_file(pdf_path, error)
+                else:
+                    page_count, sections = result
+
+                    if chunk_index == 0:
+                        # Now we know the size: queue the rest of this file first
+                        state['pages'] = page_count
+                        state['chunks'] = max(1, -(-page_count // PAGES_PER_CHUNK))
+                        for index in reversed(range(1, state['chunks'])):
+                            tasks.appendleft((pdf_path, index))
+
+                    state['waiting'][chunk_index] = sections
+                    write_ready_chunks(pdf_path)
+
+            # Check for chunks that are taking too long
+            now = time.monotonic()
+            expired = [key for key, deadline in running.items() if now > deadline]
+            if expired:
+                for key in expired:
+                    del running[key]
+                    fail_file(key[0], f"timed out after {FILE_TIMEOUT_SECONDS}s")
+
+                # A stuck worker never returns and would hold its slot for good,
+                # so replace the whole pool and start the other running chunks again
+                pool.terminate()
+                pool.join()
+                pool = multiprocessing.Pool(processes=workers)
+                generation += 1
+                for key in reversed(list(running)):
+                    tasks.appendleft(key)
+                running.clear()
+    finally:
+        if running:
+            # Stopped early (e.g. Ctrl+C): don't wait for chunks still running
+            pool.terminate()
+        else:
+            pool.close()
+        pool.join()
+
+        for pdf_path, state in files.items():
+            if state['out']:
+                state['out'].close()
+
+    elapsed = time.perf_counter() - start_time
+
+    # Summary
+    print("\n" + "=" * 50)
+    print("Summary")
+    print("=" * 50)
+    print(f"Successfully processed: {successful}")
+    print(f"Failed/skipped: {failed}")
+    print(f"Time: {elapsed:.1f}s")
+    print(f"Throughput: {total_pages / elapsed:.1f} pages/s, "
+          f"{total_bytes / (1024 * 1024) / elapsed:.2f} MB/s")
+    print_manifest_stats(manifest, force, skipped, len(pdf_files))
     print(f"Output folder: {OUTPUT_FOLDER}/")
 
 
@@ -173,6 +556,11 @@ def main():
     """
     Main function.
     """
+    parser = argparse.ArgumentParser(description="Extract text from PDF files")
+    parser.add_argument("--force", action="store_true",
+                        help="extract every PDF again, even if it has not changed")
+    args = parser.parse_args()
+
     print("=" * 50)
     print("PDF Text Extractor")
     print("=" * 50)
@@ -185,16 +573,26 @@ def main():
     # Create output folder
     os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 
-    if SINGLE_FILE:
-        # Process single file
-        pdf_path = os.path.join(INPUT_FOLDER, SINGLE_FILE)
-        if os.path.exists(pdf_path):
-            process_single_pdf(pdf_path)
+    manifest = open_manifest() if USE_MANIFEST else None
+
+    try:
+        if SINGLE_FILE:
+            # Process single file (always extracted, even if unchanged)
+            pdf_path = os.path.join(INPUT_FOLDER, SINGLE_FILE)
+            if os.path.exists(pdf_path):
+                if process_single_pdf(pdf_path) and manifest is not None:
+                    record_extraction(manifest, pdf_path)
+            else:
+                print(f"\nFile not found: {pdf_path}")
+        elif PARALLEL:
+            # Process all PDFs on several CPU cores
+            process_all_pdfs_parallel(manifest, args.force)
         else:
-            print(f"\nFile not found: {pdf_path}")
-    else:
-        # Process all PDFs
-        process_all_pdfs()
+            # Process all PDFs one by one
+            process_all_pdfs(manifest, args.force)
+    finally:
+        if manifest is not None:
+            manifest.close()
 
     print("\nDone!")
 
@@ -0,0 +1,164 @@
+"""
+Crawler Benchmark
+Compare the simple (one page at a time) scraper with the concurrent crawler.
+
+Starts a small local web server that imitates quotes.toscrape.com, so no
+real website is hit. Each page answers after a short delay, like a real
+server on the internet.
+
+Run with: python templates/scraping_templates/benchmark_crawler.py
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import simple_scraper as scraper
+
+# ============================================
+# CONFIGURATION - Change these values!
+# ============================================
+
+# How many pages the fake website has
+NUM_PAGES = 40
+
+# How long the fake server takes to answer (seconds)
+SERVER_DELAY = 0.05
+
+# Settings for the concurrent crawler
+CONCURRENCY = 8
+REQUESTS_PER_SECOND = 100
+
+# ============================================
+# FAKE WEBSITE
+# ============================================
+
+def make_page(page_number):
+    """
+    Build an HTML page that looks like quotes.toscrape.com.
+    """
+    quotes = "".join(
+        f'<div class="quote"><span class="text">"Quote {page_number}-{i}"</span>'
+        f'<small class="author">Author {i}</small>'
+        f'<a class="tag" href="/tag/t{i}/">t{i}</a></div>'
+        for i in range(10)
+    )
+
+    # Page numbers at the bottom, like many catalogue sites
+    pagination = "".join(
+        f'<a href="/page/{n}/">{n}</a> '
+        for n in range(max(1, page_number - 5), min(NUM_PAGES, page_number + 5) + 1)
+    )
+
+    next_link = ""
+    if page_number < NUM_PAGES:
+        next_link = f'<ul class="pager"><li class="next"><a href="/page/{page_number + 1}/">Next</a></li></ul>'
+
+    return f"<html><body>{quotes}<div>{pagination}</div>{next_link}</body></html>"
+
+
+class FakeSiteHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep connections open, like real servers
+
+    def do_GET(self):
+        parts = self.path.strip("/").split("/")
+        page_number = 1
+        if len(parts) == 2 and parts[0] == "page" and parts[1].isdigit():
+            page_number = int(parts[1])
+
+        time.sleep(SERVER_DELAY)
+        body = make_page(page_number).encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass  # keep the output quiet
+
+
+def start_fake_site():
+    """
+    Start the fake website in the background and return its address.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeSiteHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+# ============================================
+# BENCHMARK
+# ============================================
+
+def run_simple(base_url):
+    """
+    One page at a time, a new connection for each page (the original loop).
+    """
+    quotes = 0
+    pages = 0
+    current_url = base_url + "/page/1/"
+
+    while current_url and pages < NUM_PAGES:
+        html = scraper.fetch_page(current_url)
+        if not html:
+            break
+        quotes += len(scraper.parse_quotes_page(html))
+        pages += 1
+        current_url = scraper.get_next_page_url(html, base_url)
+
+    return pages, quotes
+
+
+def run_concurrent(base_url):
+    """
+    Several pages at once through the concurrent crawler.
+    """
+    quotes = 0
+    pages = 0
+
+    for _, page_quotes in scraper.crawl_concurrent([base_url + "/page/1/"], NUM_PAGES, CONCURRENCY):
+        quotes += len(page_quotes)
+        pages += 1
+
+    return pages, quotes
+
+
+def main():
+    print("=" * 50)
+    print("Crawler Benchmark")
+    print("=" * 50)
+
+    server, base_url = start_fake_site()
+    print(f"\nFake website: {base_url} ({NUM_PAGES} pages, {SERVER_DELAY * 1000:.0f} ms per page)")
+
+    # Point the scraper at the fake website
+    scraper.URL = base_url
+    scraper.USE_CACHE = False  # measure the network, not the cache
+    scraper.DELAY_SECONDS = 0
+    scraper.FOLLOW_PATTERN = r"/page/\d+/$"
+    scraper.REQUESTS_PER_SECOND = REQUESTS_PER_SECOND
+    scraper.BURST = CONCURRENCY
+
+    results = []
+    for name, run in [("simple", run_simple), ("concurrent", run_concurrent)]:
+        print(f"\nRunning {name} crawl...")
+        start = time.perf_counter()
+        pages, quotes = run(base_url)
+        seconds = time.perf_counter() - start
+        results.append((name, pages, quotes, seconds))
+
+    server.shutdown()
+
+    print("\n" + "=" * 50)
+    print(f"{'Mode':<12} {'Pages':>6} {'Quotes':>7} {'Time':>8} {'Pages/s':>9}")
+    for name, pages, quotes, seconds in results:
+        print(f"{name:<12} {pages:>6} {quotes:>7} {seconds:>7.2f}s {pages / seconds:>9.1f}")
+
+    speedup = results[0][3] / results[1][3]
+    print(f"\nConcurrent crawl was {speedup:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+HTML Parser Benchmark
+Compare ways of parsing saved pages with the scraper's extractors.
+
+Uses the saved pages in templates/scraping_templates/fixtures/ (add your
+own .html files there to test pages from the site you scrape).
+
+Run with: python templates/scraping_templates/benchmark_parsers.py
+"""
+
+import glob
+import os
+import time
+
+from bs4 import BeautifulSoup
+
+import simple_scraper as scraper
+
+# ============================================
+# CONFIGURATION - Change these values!
+# ============================================
+
+# Folder with saved .html pages
+FIXTURES_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# How many times to parse each page
+REPEATS = 200
+
+# ============================================
+# BENCHMARK
+# ============================================
+
+def parse_twice_html_parser(html, page_url):
+    """
+    The original way: two separate parses with html.parser.
+    """
+    quotes = scraper.extract_quotes(BeautifulSoup(html, 'html.parser'), page_url)
+    next_url = scraper.extract_next_url(BeautifulSoup(html, 'html.parser'), page_url)
+    return {'quotes': quotes, 'next_url': next_url}
+
+
+def make_single_parse(parser, streaming):
+    """
+    Parse once with the given parser, optionally only building needed tags.
+    """
+    def run(html, page_url):
+        scraper.HTML_PARSER = parser
+        scraper.STREAMING_PARSE = streaming
+        return scraper.extract_page(html, page_url)
+    return run
+
+
+def main():
+    print("=" * 50)
+    print("HTML Parser Benchmark")
+    print("=" * 50)
+
+    pages = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES_FOLDER, "*.html"))):
+        with open(path, 'r', encoding='utf-8') as f:
+            pages.append(f.read())
+
+    if not pages:
+        print(f"\nNo .html files found in {FIXTURES_FOLDER}/")
+        return
+
+    total_kb = sum(len(html) for html in pages) / 1024
+    print(f"\n{len(pages)} page(s), {total_kb:.1f} KB, {REPEATS} repeats each")
+
+    methods = [
+        ("html.parser, 2 parses (old)", parse_twice_html_parser),
+        ("html.parser, 1 parse", make_single_parse('html.parser', False)),
+        ("lxml, 1 parse", make_single_parse('lxml', False)),
+        ("lxml, streaming", make_single_parse('lxml', True)),
+    ]
+
+    scraper.FOLLOW_PATTERN = None
+    page_url = scraper.URL
+    expected = [parse_twice_html_parser(html, page_url) for html in pages]
+
+    print(f"\n{'Method':<30} {'Pages/s':>10} {'Speedup':>8}")
+    baseline = None
+    for name, run in methods:
+        # Every method must find exactly the same data
+        results = [run(html, page_url) for html in pages]
+        if results != expected:
+            print(f"{name:<30} gives different results - skipped")
+            continue
+
+        start = time.perf_counter()
+        for _ in range(REPEATS):
+            for html in pages:
+                run(html, page_url)
+        seconds = time.perf_counter() - start
+
+        pages_per_second = REPEATS * len(pages) / seconds
+        baseline = baseline or pages_per_second
+        print(f"{name:<30} {pages_per_second:>10.0f} {pages_per_second / baseline:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
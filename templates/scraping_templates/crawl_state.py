@@ -0,0 +1,238 @@
+"""
+Crawl State for the scraping templates
+Saves crawl progress on disk, so a long scrape can be stopped and resumed.
+
+- The frontier (pages still to visit) and the visited pages are kept in a
+  small SQLite file
+- Scraped records are appended to the output file in batches, instead of
+  being kept in memory until the very end
+- After each batch is written, the pages it came from are marked as done,
+  in the same commit that records how far the output file goes. If the
+  scraper crashes, it continues from the last saved batch: output written
+  after it is removed and those pages are downloaded again, so every
+  page's records are in the output exactly once
+- Pages that fail are skipped for the rest of the run, and given up on
+  for good after a few runs
+
+Used by simple_scraper.py.
+"""
+
+import os
+import sqlite3
+
+import pandas as pd
+
+# Parquet output needs pyarrow
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+
+class CrawlState:
+    """
+    Frontier, visited set and record output of one crawl.
+
+    Usage:
+        state = CrawlState("data/processed/crawl_state.sqlite", "data/processed/quotes.csv")
+        state.add_urls(["https://quotes.toscrape.com"])
+        url = state.next_url()
+        ...
+        state.page_done(url, records, links)
+        state.close()
+    """
+
+    def __init__(self, state_file, output_file, batch_size=500, max_attempts=3):
+        os.makedirs(os.path.dirname(state_file) or ".", exist_ok=True)
+        self.output_file = output_file
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+
+        self._db = sqlite3.connect(state_file)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS urls (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT UNIQUE,
+                done INTEGER DEFAULT 0,
+                attempts INTEGER DEFAULT 0,
+                failed INTEGER DEFAULT 0
+            )
+        """)
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(urls)")]
+        for column in ("attempts", "failed"):
+            if column not in columns:
+                # Checkpoint from an older version
+                self._db.execute(f"ALTER TABLE urls ADD COLUMN {column} INTEGER DEFAULT 0")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+        if self._db.execute("SELECT COUNT(*) FROM urls").fetchone()[0] == 0:
+            # New crawl: nothing of the output is saved yet
+            self._db.execute("INSERT OR IGNORE INTO meta VALUES ('output_bytes', 0)")
+        self._db.commit()
+        self._discard_unsaved_output()
+
+        # Work finished but not saved yet (saved together with its records)
+        self._records = []
+        self._done_urls = []
+        self._new_links = []
+        self._in_progress = set()
+        self._failed_this_run = set()
+
+    # --- Frontier ---
+
+    def add_urls(self, urls):
+        """
+        Add URLs to the frontier. URLs seen before are ignored.
+        """
+        self._db.executemany("INSERT OR IGNORE INTO urls (url) VALUES (?)", [(url,) for url in urls])
+        self._db.commit()
+
+    def next_url(self):
+        """
+        The next page to visit, or None when the frontier is empty.
+        """
+        urls = self.next_urls(1)
+        return urls[0] if urls else None
+
+    def next_urls(self, limit):
+        """
+        Up to `limit` pages to visit that are not already being fetched.
+        """
+        self._save_links()
+        rows = self._db.execute(
+            "SELECT url FROM urls WHERE done = 0 AND failed = 0 ORDER BY seq LIMIT ?",
+            (limit + len(self._in_progress) + len(self._done_urls) + len(self._failed_this_run),)
+        ).fetchall()
+
+        skip = self._in_progress.union(self._done_urls, self._failed_this_run)
+        urls = []
+        for (url,) in rows:
+            if url not in skip:
+                urls.append(url)
+                self._in_progress.add(url)
+                if len(urls) == limit:
+                    break
+        return urls
+
+    def page_done(self, url, records, links=()):
+        """
+        Record a finished page: its records and the links found on it.
+
+        Nothing is written until a full batch of records is collected.
+        """
+        self._in_progress.discard(url)
+        self._records.extend(records)
+        self._done_urls.append(url)
+        self._new_links.extend(links)
+
+        if len(self._records) >= self.batch_size:
+            self.flush()
+
+    def page_failed(self, url):
+        """
+        Give up on a page for this run. It is tried again in later runs,
+        until it has failed `max_attempts` times.
+        """
+        self._in_progress.discard(url)
+        self._failed_this_run.add(url)
+        self._db.execute(
+            "UPDATE urls SET attempts = attempts + 1, failed = (attempts + 1 >= ?) WHERE url = ?",
+            (self.max_attempts, url)
+        )
+        self._db.commit()
+
+    # --- Saving ---
+
+    def flush(self):
+        """
+        Append collected records to the output, then mark their pages done.
+
+        The pages are marked done in the same commit that records the new
+        end of the output, so a crash in between can be undone on resume.
+        """
+        if self._records:
+            part = self._meta('parts', 0) + 1
+            append_records(self._records, self.output_file, part)
+            self._set_meta('parts', part)
+            if not self._is_parquet():
+                self._set_meta('output_bytes', os.path.getsize(self.output_file))
+
+        self._save_links()
+        self._db.executemany("UPDATE urls SET done = 1 WHERE url = ?", [(url,) for url in self._done_urls])
+        self._db.execute(
+            "INSERT INTO meta VALUES ('records', ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = value + excluded.value",
+            (len(self._records),)
+        )
+        self._db.commit()
+
+        self._records = []
+        self._done_urls = []
+
+    def close(self):
+        self.flush()
+        self._db.close()
+
+    # --- Progress ---
+
+    def counts(self):
+        """
+        (pages done, pages still to visit, pages given up on, records saved)
+        """
+        done, failed, total = self._db.execute(
+            "SELECT COALESCE(SUM(done), 0), COALESCE(SUM(failed AND NOT done), 0), COUNT(*) FROM urls"
+        ).fetchone()
+        return done, total - done - failed, failed, self._meta('records', 0)
+
+    def _save_links(self):
+        if self._new_links:
+            self.add_urls(self._new_links)
+            self._new_links = []
+
+    def _meta(self, key, default=None):
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, key, value):
+        self._db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
+
+    def _is_parquet(self):
+        return self.output_file.endswith('.parquet')
+
+    def _discard_unsaved_output(self):
+        # Output written after the last commit belongs to pages not marked done
+        # (they are downloaded again), so remove it to avoid duplicate records
+        if self._is_parquet():
+            parts = self._meta('parts', 0)
+            if os.path.isdir(self.output_file):
+                for name in os.listdir(self.output_file):
+                    if name.startswith("part-") and int(name[5:10]) > parts:
+                        os.remove(os.path.join(self.output_file, name))
+            return
+
+        saved = self._meta('output_bytes')
+        if saved is None or not os.path.exists(self.output_file):
+            return
+        if saved == 0:
+            os.remove(self.output_file)
+        elif os.path.getsize(self.output_file) > saved:
+            with open(self.output_file, 'r+b') as f:
+                f.truncate(saved)
+
+
+def append_records(records, output_file, part_number):
+    """
+    Append records to a CSV file, or add a new part to a Parquet folder.
+
+    Parquet files can't be appended to, so `quotes.parquet` becomes a folder
+    of part files. pandas reads it back with pd.read_parquet("quotes.parquet").
+    """
+    df = pd.DataFrame(records)
+
+    if output_file.endswith('.parquet'):
+        os.makedirs(output_file, exist_ok=True)
+        df.to_parquet(os.path.join(output_file, f"part-{part_number:05d}.parquet"), index=False)
+    else:
+        os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+        write_header = not os.path.exists(output_file)
+        df.to_csv(output_file, mode='a', header=write_header, index=False)
@@ -0,0 +1,219 @@
+"""
+HTTP Cache for the scraping templates
+Saves downloaded pages on disk so they don't have to be downloaded again.
+
+- Pages younger than `ttl_seconds` are returned straight from disk
+- Older pages are re-checked with a conditional request (ETag /
+  Last-Modified): if the page did not change, the server answers
+  "304 Not Modified" without sending it again
+- Bodies are stored compressed, and the least recently used pages are
+  removed when the cache grows bigger than `max_mb`
+- `offline=True` never touches the network: only cached pages are returned,
+  which makes re-running a changed parser over a saved crawl free
+
+Used by simple_scraper.py and web_scraper_app.py.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+import requests
+
+
+class OfflineCacheMiss(requests.exceptions.RequestException):
+    """Raised in offline mode when a page is not in the cache."""
+
+
+class CachedResponse:
+    """
+    A page served from the cache. Looks enough like a requests.Response
+    for the templates (text, status_code, raise_for_status).
+    """
+
+    def __init__(self, url, body, encoding):
+        self.url = url
+        self.content = body
+        self.encoding = encoding
+        self.status_code = 200
+        self.from_cache = True
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+    def raise_for_status(self):
+        pass
+
+
+class HttpCache:
+    """
+    On-disk cache of HTTP GET responses, stored in one SQLite file.
+
+    Usage:
+        cache = HttpCache("data/processed/http_cache")
+        response = cache.fetch("https://quotes.toscrape.com")
+        print(response.text)
+    """
+
+    def __init__(self, folder, ttl_seconds=24 * 3600, max_mb=500, offline=False):
+        os.makedirs(folder, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.offline = offline
+
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(folder, "cache.sqlite"), check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                body BLOB,
+                size INTEGER,
+                encoding TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL,
+                last_used REAL
+            )
+        """)
+        self._db.commit()
+
+    def fetch(self, url, session=None, headers=None, timeout=10, before_request=None,
+              ttl_seconds=None, offline=None):
+        """
+        GET a URL through the cache.
+
+        Args:
+            url: Page to fetch
+            session: requests.Session to use (default: plain requests.get)
+            headers: Extra request headers
+            timeout: Request timeout in seconds
+            before_request: Called right before a real network request
+                (e.g. a rate limiter), but not for cache hits
+            ttl_seconds: Page age limit for this call (default: the cache's own)
+            offline: Offline mode for this call (default: the cache's own)
+
+        Returns:
+            CachedResponse, or the requests.Response from the server
+        """
+        if ttl_seconds is None:
+            ttl_seconds = self.ttl_seconds
+        if offline is None:
+            offline = self.offline
+
+        entry = self._load(url)
+
+        if offline:
+            if entry is None:
+                raise OfflineCacheMiss(f"Not in cache (offline mode): {url}")
+            return self._hit(url, entry)
+
+        if entry is not None and time.time() - entry['fetched_at'] < ttl_seconds:
+            return self._hit(url, entry)
+
+        # Ask the server, but only for the page body if it has changed
+        headers = dict(headers or {})
+        if entry is not None:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        if before_request:
+            before_request()
+        get = session.get if session is not None else requests.get
+        response = get(url, headers=headers, timeout=timeout)
+
+        if response.status_code == 304 and entry is not None:
+            with self._lock:
+                self._db.execute("UPDATE pages SET fetched_at = ? WHERE url = ?", (time.time(), url))
+                self._db.commit()
+                self.revalidated += 1
+            return self._hit(url, entry, count=False)
+
+        with self._lock:
+            self.misses += 1
+        if response.status_code == 200:
+            self._store(url, response)
+        response.from_cache = False
+        return response
+
+    def stats(self):
+        """
+        Cache counters and size on disk.
+        """
+        with self._lock:
+            pages, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages").fetchone()
+        return {
+            'pages': pages,
+            'size_mb': size / (1024 * 1024),
+            'hits': self.hits,
+            'revalidated': self.revalidated,
+            'misses': self.misses,
+        }
+
+    def clear(self):
+        """
+        Delete every cached page.
+        """
+        with self._lock:
+            self._db.execute("DELETE FROM pages")
+            self._db.commit()
+            self._db.execute("VACUUM")
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _load(self, url):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT body, encoding, etag, last_modified, fetched_at FROM pages WHERE url = ?",
+                (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        body, encoding, etag, last_modified, fetched_at = row
+        return {'body': body, 'encoding': encoding, 'etag': etag,
+                'last_modified': last_modified, 'fetched_at': fetched_at}
+
+    def _hit(self, url, entry, count=True):
+        with self._lock:
+            self._db.execute("UPDATE pages SET last_used = ? WHERE url = ?", (time.time(), url))
+            self._db.commit()
+            if count:
+                self.hits += 1
+        return CachedResponse(url, zlib.decompress(entry['body']), entry['encoding'])
+
+    def _store(self, url, response):
+        body = zlib.compress(response.content)
+        encoding = response.encoding or response.apparent_encoding
+        now = time.time()
+
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, body, len(body), encoding, response.headers.get('ETag'),
+                 response.headers.get('Last-Modified'), now, now)
+            )
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        # Remove least recently used pages until the cache fits in max_bytes
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        rows = self._db.execute("SELECT url, size FROM pages ORDER BY last_used").fetchall()
+        for url, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM pages WHERE url = ?", (url,))
+            total -= size
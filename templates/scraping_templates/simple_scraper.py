@@ -6,10 +6,27 @@ Run with: python templates/scraping_templates/simple_scraper.py
 """
 
 import requests
-from bs4 import BeautifulSoup
-import pandas as pd
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup, SoupStrainer
 import time
 import os
+import re
+import shutil
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urljoin, urldefrag, urlparse
+
+from http_cache import HttpCache, OfflineCacheMiss
+from crawl_state import PARQUET_AVAILABLE, CrawlState
+
+# Use the fast lxml parser when it is installed
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
 
 # ============================================
 # CONFIGURATION - Change these values!
@@ -18,16 +35,98 @@ import os
 # URL to scrape (start with a simple page)
 URL = "https://quotes.toscrape.com"  # A website made for practicing scraping!
 
-# Output file
+# Output file (.csv, or .parquet for a folder of Parquet files)
 OUTPUT_FILE = "data/processed/scraped_quotes.csv"
 
 # Be respectful - wait between requests (in seconds)
 DELAY_SECONDS = 1
 
+# Stop after this many pages (be respectful!)
+MAX_PAGES = 3
+
+# "simple" = one page at a time, "concurrent" = several pages in parallel
+CRAWL_MODE = "simple"
+
+# --- Settings for concurrent mode ---
+
+# How many pages can be downloading at the same time
+CONCURRENCY = 8
+
+# Politeness per website: average requests per second, and short bursts allowed
+REQUESTS_PER_SECOND = 2
+BURST = 2
+
+# Retry failed requests, waiting 1s, 2s, 4s, ... between tries
+MAX_RETRIES = 3
+BACKOFF_SECONDS = 1
+
+# Also follow links matching this pattern (None = only follow "next" links)
+FOLLOW_PATTERN = None  # e.g. r"/page/\d+/"
+
+# Only build the parts of each page the extractors need (faster on big pages)
+STREAMING_PARSE = False
+
+# --- Cache: keep downloaded pages on disk ---
+
+USE_CACHE = True
+CACHE_FOLDER = "data/processed/http_cache"
+
+# Pages younger than this are not downloaded again at all; older pages are
+# only downloaded again if the website says they changed
+CACHE_TTL_SECONDS = 24 * 3600
+
+# Remove the least recently used pages when the cache is bigger than this
+CACHE_MAX_MB = 500
+
+# Never use the network, only pages already in the cache
+# (handy for re-running the scraper after changing the parsing code)
+OFFLINE_REPLAY = False
+
+# --- Checkpoints: continue a long crawl after a crash or Ctrl+C ---
+
+# True = continue where the last run stopped, False = always start over
+RESUME = True
+CHECKPOINT_FILE = "data/processed/crawl_state.sqlite"
+
+# Records are written to OUTPUT_FILE in batches of this size
+SAVE_EVERY_RECORDS = 500
+
+# Pages that fail are skipped for the rest of the run, and given up on
+# after failing in this many runs
+MAX_PAGE_ATTEMPTS = 3
+
 # ============================================
 # MAIN SCRAPER CODE
 # ============================================
 
+_cache = None
+_last_request_time = None
+
+
+def get_cache():
+    """
+    The shared page cache (None if USE_CACHE is off).
+    """
+    global _cache
+    if USE_CACHE and _cache is None:
+        _cache = HttpCache(CACHE_FOLDER, CACHE_TTL_SECONDS, CACHE_MAX_MB, OFFLINE_REPLAY)
+    return _cache if USE_CACHE else None
+
+
+def wait_politely():
+    """
+    Wait so that real requests are at least DELAY_SECONDS apart.
+    Pages that come from the cache don't have to wait.
+    """
+    global _last_request_time
+    if _last_request_time is not None:
+        remaining = DELAY_SECONDS - (time.monotonic() - _last_request_time)
+        if remaining > 0:
+            print(f"Waiting {remaining:.1f} seconds...")
+            time.sleep(remaining)
+    _last_request_time = time.monotonic()
+
+
 def fetch_page(url):
     """
     Fetch a webpage and return its content.
@@ -39,7 +138,12 @@ def fetch_page(url):
 
     try:
         print(f"Fetching: {url}")
-        response = requests.get(url, headers=headers, timeout=10)
+        cache = get_cache()
+        if cache:
+            response = cache.fetch(url, headers=headers, timeout=10, before_request=wait_politely)
+        else:
+            wait_politely()
+            response = requests.get(url, headers=headers, timeout=10)
         response.raise_for_status()  # Raise error for bad status codes
         return response.text
     except requests.exceptions.RequestException as e:
@@ -47,13 +151,42 @@ def fetch_page(url):
         return None
 
 
-def parse_quotes_page(html):
+# ============================================
+# PARSING - each page is parsed only once
+# ============================================
+
+# Registered extractors: name -> (function, tags it needs)
+EXTRACTORS = {}
+
+
+def register_extractor(name, tags=None):
     """
-    Parse the quotes page and extract quotes, authors, and tags.
-    This is specific to quotes.toscrape.com - modify for other sites!
+    Register a function that pulls data out of a parsed page.
+
+    The function gets (soup, page_url). `tags` lists the HTML tags it
+    looks inside, so STREAMING_PARSE can skip everything else.
     """
-    soup = BeautifulSoup(html, 'html.parser')
+    def decorator(func):
+        EXTRACTORS[name] = (func, tags)
+        return func
+    return decorator
+
 
+def parse_document(html, tags=None):
+    """
+    Parse HTML once. With STREAMING_PARSE, only the given tags are built.
+    """
+    if STREAMING_PARSE and tags:
+        return BeautifulSoup(html, HTML_PARSER, parse_only=SoupStrainer(tags))
+    return BeautifulSoup(html, HTML_PARSER)
+
+
+@register_extractor('quotes', tags=['div'])
+def extract_quotes(soup, page_url):
+    """
+    Extract quotes, authors, and tags.
+    This is specific to quotes.toscrape.com - modify for other sites!
+    """
     quotes_data = []
 
     # Find all quote containers
@@ -84,32 +217,286 @@ def parse_quotes_page(html):
     return quotes_data
 
 
-def get_next_page_url(html, base_url):
+@register_extractor('next_url', tags=['li'])
+def extract_next_url(soup, page_url):
     """
     Find the URL for the next page (if pagination exists).
     """
-    soup = BeautifulSoup(html, 'html.parser')
-
     # Look for "next" button
     next_btn = soup.find('li', class_='next')
     if next_btn:
         next_link = next_btn.find('a')
-        if next_link:
-            return base_url + next_link.get('href')
+        if next_link and next_link.get('href'):
+            return urljoin(page_url, next_link.get('href'))
 
     return None
 
 
-def save_to_csv(data, filename):
+@register_extractor('links', tags=['a'])
+def extract_links(soup, page_url):
+    """
+    Find links that match FOLLOW_PATTERN.
+    """
+    links = []
+    for a in soup.find_all('a', href=True):
+        link = urljoin(page_url, a['href'])
+        if re.search(FOLLOW_PATTERN, link):
+            links.append(link)
+    return links
+
+
+def default_extractors():
     """
-    Save the scraped data to a CSV file.
+    The extractors to run on every page.
     """
-    # Create directory if it doesn't exist
-    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    names = ['quotes', 'next_url']
+    if FOLLOW_PATTERN:
+        names.append('links')
+    return names
+
 
-    df = pd.DataFrame(data)
-    df.to_csv(filename, index=False)
-    print(f"\nSaved {len(data)} items to {filename}")
+def extract_page(html, page_url, names=None):
+    """
+    Parse a page once and run all extractors over the same document.
+
+    Returns:
+        Dictionary of extractor name -> result
+    """
+    names = names or default_extractors()
+
+    tags = set()
+    for name in names:
+        tags.update(EXTRACTORS[name][1] or [])
+
+    soup = parse_document(html, sorted(tags))
+    return {name: EXTRACTORS[name][0](soup, page_url) for name in names}
+
+
+def parse_quotes_page(html):
+    """
+    Parse a quotes page and extract quotes, authors, and tags.
+    """
+    return extract_page(html, URL, ['quotes'])['quotes']
+
+
+def get_next_page_url(html, base_url):
+    """
+    Find the URL for the next page (if pagination exists).
+    """
+    return extract_page(html, base_url, ['next_url'])['next_url']
+
+
+# ============================================
+# CONCURRENT CRAWLER
+# ============================================
+
+class TokenBucket:
+    """
+    Rate limiter: allows `rate` requests per second on average,
+    with short bursts of up to `burst` requests.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Wait until a request is allowed."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_seconds = (1 - self.tokens) / self.rate
+
+            time.sleep(wait_seconds)
+
+
+class HostRateLimiter:
+    """
+    One TokenBucket per website, so a slow site doesn't hold up the others.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, url):
+        host = urlparse(url).netloc
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.rate, self.burst)
+            bucket = self.buckets[host]
+        bucket.acquire()
+
+
+def make_session(pool_size):
+    """
+    Create a Session that keeps connections open and reuses them.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = 'Educational Scraper (Digital Scholarship Lab)'
+    return session
+
+
+def fetch_with_retry(session, url, limiter):
+    """
+    Fetch a page, retrying with exponential backoff on temporary errors.
+    """
+    cache = get_cache()
+
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            if cache:
+                # Cache hits don't count against the rate limit
+                response = cache.fetch(url, session=session, timeout=10,
+                                       before_request=lambda: limiter.acquire(url))
+            else:
+                limiter.acquire(url)
+                response = session.get(url, timeout=10)
+
+            # 429 (too many requests) and 5xx errors are usually temporary
+            if response.status_code == 429 or response.status_code >= 500:
+                raise requests.exceptions.HTTPError(f"{response.status_code} error", response=response)
+
+            response.raise_for_status()
+            return response.text
+
+        except requests.exceptions.RequestException as e:
+            status = e.response.status_code if e.response is not None else None
+            temporary = status is None or status == 429 or status >= 500
+            if isinstance(e, OfflineCacheMiss):
+                temporary = False
+
+            if not temporary or attempt == MAX_RETRIES:
+                print(f"Error fetching {url}: {e}")
+                return None
+
+            # Wait 1s, 2s, 4s, ... plus a little randomness
+            time.sleep(BACKOFF_SECONDS * (2 ** attempt) + random.uniform(0, 0.1))
+
+
+def discover_links(page):
+    """
+    Find the pages to crawl next: the "next" link, plus any links
+    that match FOLLOW_PATTERN.
+    """
+    links = list(page.get('links', []))
+    if page.get('next_url'):
+        links.insert(0, page['next_url'])
+    return links
+
+
+def crawl_concurrent(start_urls, max_pages, concurrency=None, state=None):
+    """
+    Crawl pages in parallel with a pool of threads.
+
+    - Connections are reused through one shared Session
+    - Each website gets its own rate limit (REQUESTS_PER_SECOND)
+    - Every URL is only fetched once
+    - Temporary errors are retried with exponential backoff
+
+    If a CrawlState is given, the frontier comes from it and every finished
+    page (records and links) is saved to it.
+
+    Yields:
+        (page_url, list of quotes) as each page finishes
+    """
+    concurrency = concurrency or CONCURRENCY
+    session = make_session(concurrency)
+    limiter = HostRateLimiter(REQUESTS_PER_SECOND, BURST)
+
+    frontier = deque()
+    seen = set()
+
+    def add_to_frontier(url):
+        url = urldefrag(url)[0]
+        if url not in seen:
+            seen.add(url)
+            frontier.append(url)
+
+    def next_urls(limit):
+        if state is not None:
+            return state.next_urls(limit)
+        urls = []
+        while frontier and len(urls) < limit:
+            urls.append(frontier.popleft())
+        return urls
+
+    if state is not None:
+        state.add_urls(start_urls)
+    else:
+        for url in start_urls:
+            add_to_frontier(url)
+
+    submitted = 0
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        while True:
+            # Start new downloads while we have free workers
+            free = min(concurrency - len(running), max_pages - submitted)
+            if free > 0:
+                for url in next_urls(free):
+                    running[pool.submit(fetch_with_retry, session, url, limiter)] = url
+                    submitted += 1
+
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                url = running.pop(future)
+                html = future.result()
+                if not html:
+                    if state is not None:
+                        state.page_failed(url)
+                    continue
+
+                page = extract_page(html, url)
+                links = [urldefrag(link)[0] for link in discover_links(page)]
+
+                if state is not None:
+                    state.page_done(url, page['quotes'], links)
+                else:
+                    for link in links:
+                        add_to_frontier(link)
+
+                yield url, page['quotes']
+
+    session.close()
+
+
+def open_crawl_state():
+    """
+    Open the checkpoint, or start a new crawl if there is none (or RESUME is off).
+    """
+    output_file = OUTPUT_FILE
+    if output_file.endswith('.parquet') and not PARQUET_AVAILABLE:
+        output_file = output_file[:-len('.parquet')] + '.csv'
+        print(f"Parquet output needs pyarrow (pip install pyarrow) - saving to {output_file} instead\n")
+
+    if not RESUME or not os.path.exists(CHECKPOINT_FILE):
+        # Fresh start: remove the old checkpoint and output
+        for path in (CHECKPOINT_FILE, output_file):
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            elif os.path.exists(path):
+                os.remove(path)
+
+    return CrawlState(CHECKPOINT_FILE, output_file, SAVE_EVERY_RECORDS, MAX_PAGE_ATTEMPTS)
 
 
 def main():
@@ -123,48 +510,80 @@ def main():
     print(f"Output: {OUTPUT_FILE}")
     print()
 
-    all_quotes = []
-    current_url = URL
-    page_count = 0
-    max_pages = 3  # Limit pages for this demo (be respectful!)
-
-    while current_url and page_count < max_pages:
-        page_count += 1
-        print(f"\n--- Page {page_count} ---")
-
-        # Fetch the page
-        html = fetch_page(current_url)
-        if not html:
-            break
-
-        # Parse the content
-        quotes = parse_quotes_page(html)
-        print(f"Found {len(quotes)} quotes")
+    state = open_crawl_state()
+    done, pending, failed, saved = state.counts()
 
-        # Add to our collection
-        all_quotes.extend(quotes)
+    if done and not pending:
+        print(f"This crawl is already finished ({done} pages, {saved} records).")
+        print(f"Delete {CHECKPOINT_FILE} (or set RESUME = False) to start over.")
+        state.close()
+        return
+    if done:
+        print(f"Resuming: {done} pages done, {pending} still to visit, {saved} records saved")
 
-        # Get next page URL
-        current_url = get_next_page_url(html, URL)
+    state.add_urls([URL])
 
-        # Wait before next request (be polite!)
-        if current_url:
-            print(f"Waiting {DELAY_SECONDS} seconds...")
-            time.sleep(DELAY_SECONDS)
-
-    # Save results
-    if all_quotes:
-        save_to_csv(all_quotes, OUTPUT_FILE)
+    sample = []
+    page_count = 0
 
+    try:
+        if CRAWL_MODE == "concurrent":
+            # Download several pages at once, politely
+            for page_url, quotes in crawl_concurrent([URL], MAX_PAGES, state=state):
+                page_count += 1
+                print(f"Found {len(quotes)} quotes on {page_url}")
+                sample.extend(quotes[:3 - len(sample)])
+
+        while CRAWL_MODE != "concurrent" and page_count < MAX_PAGES:
+            current_url = state.next_url()
+            if not current_url:
+                break
+
+            page_count += 1
+            print(f"\n--- Page {page_count} ---")
+
+            # Fetch the page (fetch_page waits between requests to be polite)
+            html = fetch_page(current_url)
+            if not html:
+                # Skip it for now: it is tried again in the next run
+                state.page_failed(current_url)
+                continue
+
+            # Parse the page once and run all extractors on it
+            page = extract_page(html, current_url)
+            quotes = page['quotes']
+            print(f"Found {len(quotes)} quotes")
+
+            # Save the quotes and queue the next page
+            state.page_done(current_url, quotes, discover_links(page))
+            sample.extend(quotes[:3 - len(sample)])
+    finally:
+        # Write whatever is left, even after an error or Ctrl+C
+        state.flush()
+
+    # Results
+    done, pending, failed, saved = state.counts()
+    state.close()
+    print(f"\nSaved {saved} items to {state.output_file} ({done} pages done, {pending} still to visit)")
+    if failed:
+        print(f"{failed} pages failed {MAX_PAGE_ATTEMPTS} times and were given up on")
+
+    if sample:
         # Print sample
         print("\n--- Sample of scraped data ---")
-        for quote in all_quotes[:3]:
+        for quote in sample:
             print(f"\n\"{quote['quote'][:50]}...\"")
             print(f"  - {quote['author']}")
             print(f"  Tags: {quote['tags']}")
     else:
         print("\nNo data was scraped.")
 
+    cache = get_cache()
+    if cache:
+        stats = cache.stats()
+        print(f"\nCache: {stats['hits']} hits, {stats['revalidated']} unchanged (304), "
+              f"{stats['misses']} downloaded, {stats['pages']} pages / {stats['size_mb']:.1f} MB on disk")
+
     print("\n" + "=" * 50)
     print("Scraping complete!")
     print("=" * 50)
@@ -11,6 +11,18 @@ from bs4 import BeautifulSoup
 import pandas as pd
 from urllib.parse import urljoin, urlparse
 
+from http_cache import HttpCache
+
+# Downloaded pages are kept here (shared with simple_scraper.py)
+CACHE_FOLDER = "data/processed/http_cache"
+CACHE_MAX_MB = 500
+
+
+@st.cache_resource
+def get_http_cache():
+    """One page cache for the whole app, kept between reruns."""
+    return HttpCache(CACHE_FOLDER, max_mb=CACHE_MAX_MB)
+
 # Page configuration
 st.set_page_config(
     page_title="Web Scraper",
@@ -36,6 +48,31 @@ user_agent = st.sidebar.selectbox(
 if user_agent == "Custom":
     user_agent = st.sidebar.text_input("Custom User Agent")
 
+st.sidebar.subheader("Cache")
+use_cache = st.sidebar.checkbox(
+    "Use page cache", value=True,
+    help="Keep downloaded pages on disk. Pages are only downloaded again if they changed."
+)
+cache_hours = st.sidebar.slider("Re-check pages older than (hours)", 0, 72, 24, disabled=not use_cache)
+offline_replay = st.sidebar.checkbox(
+    "Offline replay (cache only)", value=False, disabled=not use_cache,
+    help="Never use the network: only show pages that are already in the cache."
+)
+
+if use_cache:
+    # The cache object is shared by every session, so the settings are
+    # passed with each fetch instead of being set on it
+    http_cache = get_http_cache()
+
+    stats = http_cache.stats()
+    st.sidebar.caption(
+        f"{stats['pages']} pages, {stats['size_mb']:.1f} MB · "
+        f"{stats['hits']} hits, {stats['revalidated']} unchanged, {stats['misses']} downloads"
+    )
+    if st.sidebar.button("Clear cache"):
+        http_cache.clear()
+        st.rerun()
+
 # --- Main Interface ---
 st.header("1. Enter URL")
 
@@ -80,10 +117,19 @@ if url:
         with st.spinner("Fetching page..."):
             try:
                 headers = {'User-Agent': user_agent}
-                response = requests.get(url, headers=headers, timeout=timeout)
+                if use_cache:
+                    response = http_cache.fetch(
+                        url, headers=headers, timeout=timeout,
+                        ttl_seconds=cache_hours * 3600, offline=offline_replay
+                    )
+                else:
+                    response = requests.get(url, headers=headers, timeout=timeout)
                 response.raise_for_status()
 
-                st.success(f"Successfully fetched! (Status: {response.status_code})")
+                if getattr(response, 'from_cache', False):
+                    st.success("Loaded from cache (no download needed)")
+                else:
+                    st.success(f"Successfully fetched! (Status: {response.status_code})")
 
                 # Parse HTML
                 soup = BeautifulSoup(response.text, 'html.parser')
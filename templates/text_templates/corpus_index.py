@@ -0,0 +1,337 @@
+"""
+Corpus Index
+Index thousands of text documents once, then query them instantly.
+
+Documents are read one at a time from a folder or a ZIP file (never all at
+once). The index stores:
+- a document-term matrix in CSR form (NumPy arrays: for each document,
+  which words it contains and how often)
+- every document as a sequence of word ids, for keyword-in-context search
+- the inverted index: for each word, the documents it occurs in (with
+  counts) and every position it occurs at, so looking up a word only reads
+  that word's entries
+
+Everything is saved as .npy files, which are memory-mapped when the index
+is opened again, so reopening a large index is instant.
+
+Used by simple_text_analyzer.py (corpus mode).
+"""
+
+import io
+import json
+import os
+import zipfile
+from array import array
+from collections import Counter
+
+import numpy as np
+
+from text_stats import CLEAN_PATTERN, iter_chunks
+
+
+def iter_documents(source):
+    """
+    Yield (name, open text file) for every .txt file in a folder or ZIP.
+
+    Args:
+        source: Folder path, ZIP file path, or ZIP file object (e.g. an upload)
+    """
+    if isinstance(source, str) and os.path.isdir(source):
+        for root, _, files in os.walk(source):
+            for filename in sorted(files):
+                if filename.lower().endswith('.txt'):
+                    path = os.path.join(root, filename)
+                    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                        yield os.path.relpath(path, source), f
+        return
+
+    with zipfile.ZipFile(source) as archive:
+        for info in archive.infolist():
+            if info.is_dir() or not info.filename.lower().endswith('.txt'):
+                continue
+            with archive.open(info) as raw:
+                yield info.filename, io.TextIOWrapper(raw, encoding='utf-8', errors='replace')
+
+
+class CorpusIndex:
+    """
+    Inverted index and document-term matrix for a collection of documents.
+
+    Usage:
+        index = CorpusIndex.build("data/raw/letters")
+        index.save("data/processed/corpus_index/letters")
+
+        index = CorpusIndex.load("data/processed/corpus_index/letters")
+        index.top_terms(20)
+        index.kwic("freedom")
+    """
+
+    def __init__(self, vocab, doc_names, indptr, indices, counts, tokens, token_offsets,
+                 term_indptr=None, term_docs=None, term_counts=None, position_indptr=None, positions=None):
+        self.vocab = vocab                  # word id -> word
+        self.doc_names = doc_names          # document id -> name
+        self.indptr = indptr                # CSR row pointers (one row per document)
+        self.indices = indices              # CSR column indexes (word ids)
+        self.counts = counts                # CSR values (word counts)
+        self.tokens = tokens                # all documents as word ids, one after another
+        self.token_offsets = token_offsets  # where each document starts in `tokens`
+
+        if term_indptr is None:
+            # Index saved by an older version: build the inverted index now
+            term_indptr, term_docs, term_counts, position_indptr, positions = self._invert()
+        self.term_indptr = term_indptr          # where each word's documents start in term_docs
+        self.term_docs = term_docs              # document ids, grouped by word
+        self.term_counts = term_counts          # count of the word in each of those documents
+        self.position_indptr = position_indptr  # where each word's positions start in `positions`
+        self.positions = positions              # token positions, grouped by word
+
+        self._term_ids = None
+        self._term_totals = None
+        self._doc_freq = None
+        self._masks = {}
+
+    # --- Building ---
+
+    @classmethod
+    def build(cls, source, progress=None):
+        """
+        Read every document once and build the index.
+
+        Args:
+            source: Folder path, ZIP file path, or ZIP file object
+            progress: Optional function called with (documents done, name)
+        """
+        term_ids = {}
+        vocab = []
+        doc_names = []
+
+        indptr = array('q', [0])
+        indices = array('i')
+        counts = array('i')
+        tokens = array('i')
+        token_offsets = array('q', [0])
+
+        for name, f in iter_documents(source):
+            doc_counts = Counter()
+
+            for chunk in iter_chunks(f):
+                ids = []
+                for word in CLEAN_PATTERN.sub('', chunk.lower()).split():
+                    word_id = term_ids.get(word)
+                    if word_id is None:
+                        word_id = term_ids[word] = len(vocab)
+                        vocab.append(word)
+                    ids.append(word_id)
+                tokens.extend(ids)
+                doc_counts.update(ids)
+
+            # One CSR row per document, columns sorted by word id
+            for word_id in sorted(doc_counts):
+                indices.append(word_id)
+                counts.append(doc_counts[word_id])
+            indptr.append(len(indices))
+            token_offsets.append(len(tokens))
+            doc_names.append(name)
+
+            if progress:
+                progress(len(doc_names), name)
+
+        return cls(
+            vocab, doc_names,
+            np.frombuffer(indptr, dtype=np.int64), np.frombuffer(indices, dtype=np.int32),
+            np.frombuffer(counts, dtype=np.int32), np.frombuffer(tokens, dtype=np.int32),
+            np.frombuffer(token_offsets, dtype=np.int64),
+        )
+
+    def _invert(self):
+        """
+        Term-major copies of the document-term matrix (CSC) and of the token
+        positions. A stable sort by word id keeps documents and positions in
+        order within each word.
+        """
+        num_terms = len(self.vocab)
+        indices = np.asarray(self.indices)
+        tokens = np.asarray(self.tokens)
+
+        order = np.argsort(indices, kind='stable')
+        doc_ids = np.repeat(np.arange(self.num_documents, dtype=np.int32), np.diff(np.asarray(self.indptr)))
+        term_indptr = np.zeros(num_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(indices, minlength=num_terms), out=term_indptr[1:])
+
+        positions = np.argsort(tokens, kind='stable').astype(np.int64)
+        position_indptr = np.zeros(num_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(tokens, minlength=num_terms), out=position_indptr[1:])
+
+        return term_indptr, doc_ids[order], np.asarray(self.counts)[order], position_indptr, positions
+
+    # --- Saving and loading ---
+
+    ARRAYS = ('indptr', 'indices', 'counts', 'tokens', 'token_offsets',
+              'term_indptr', 'term_docs', 'term_counts', 'position_indptr', 'positions')
+
+    def save(self, folder):
+        """
+        Save the index as .npy files plus JSON word and document lists.
+        """
+        os.makedirs(folder, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(os.path.join(folder, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(folder, "vocab.json"), 'w', encoding='utf-8') as f:
+            json.dump(self.vocab, f, ensure_ascii=False)
+        with open(os.path.join(folder, "documents.json"), 'w', encoding='utf-8') as f:
+            json.dump(self.doc_names, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, folder):
+        """
+        Open a saved index. Arrays are memory-mapped, not read into memory.
+        """
+        arrays = {name: np.load(os.path.join(folder, f"{name}.npy"), mmap_mode='r')
+                  for name in cls.ARRAYS if os.path.exists(os.path.join(folder, f"{name}.npy"))}
+        with open(os.path.join(folder, "vocab.json"), 'r', encoding='utf-8') as f:
+            vocab = json.load(f)
+        with open(os.path.join(folder, "documents.json"), 'r', encoding='utf-8') as f:
+            doc_names = json.load(f)
+        return cls(vocab, doc_names, **arrays)
+
+    # --- Basic facts ---
+
+    @property
+    def num_documents(self):
+        return len(self.doc_names)
+
+    @property
+    def num_tokens(self):
+        return int(self.token_offsets[-1])
+
+    def term_id(self, word):
+        """Word id of a word, or None if it never occurs."""
+        if self._term_ids is None:
+            self._term_ids = {word: i for i, word in enumerate(self.vocab)}
+        return self._term_ids.get(word.lower())
+
+    def term_totals(self):
+        """How often each word occurs in the whole corpus (array by word id)."""
+        if self._term_totals is None:
+            self._term_totals = np.bincount(self.indices, weights=self.counts, minlength=len(self.vocab)).astype(np.int64)
+        return self._term_totals
+
+    def document_frequency(self):
+        """In how many documents each word occurs (array by word id)."""
+        if self._doc_freq is None:
+            self._doc_freq = np.diff(np.asarray(self.term_indptr))
+        return self._doc_freq
+
+    # --- Queries ---
+
+    def _keep_mask(self, min_length=1, stopwords=None):
+        # True for words that pass the length and stopword filters
+        key = (min_length, frozenset(stopwords or ()))
+        if key not in self._masks:
+            self._masks[key] = np.array(
+                [len(w) >= min_length and w not in key[1] for w in self.vocab], dtype=bool
+            )
+        return self._masks[key]
+
+    def _top(self, word_ids, scores, n):
+        # The n highest scores, best first
+        if len(scores) > n:
+            best = np.argpartition(-scores, n)[:n]
+        else:
+            best = np.arange(len(scores))
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return [(self.vocab[word_ids[i]], scores[i].item()) for i in best if scores[i] > 0]
+
+    def top_terms(self, n=20, min_length=1, stopwords=None):
+        """
+        Most frequent words in the whole corpus.
+
+        Returns:
+            List of (word, count)
+        """
+        totals = self.term_totals()
+        keep = np.flatnonzero(self._keep_mask(min_length, stopwords))
+        return self._top(keep, totals[keep], n)
+
+    def document_terms(self, doc_id, n=20, min_length=1, stopwords=None):
+        """
+        Most frequent words in one document.
+
+        Returns:
+            List of (word, count)
+        """
+        start, end = self.indptr[doc_id], self.indptr[doc_id + 1]
+        word_ids = np.asarray(self.indices[start:end])
+        counts = np.asarray(self.counts[start:end])
+
+        keep = self._keep_mask(min_length, stopwords)[word_ids]
+        return self._top(word_ids[keep], counts[keep], n)
+
+    def tfidf_terms(self, doc_id, n=20, min_length=1, stopwords=None):
+        """
+        Words that are most typical for one document compared to the rest
+        (TF-IDF: frequent here, rare elsewhere).
+
+        Returns:
+            List of (word, score)
+        """
+        start, end = self.indptr[doc_id], self.indptr[doc_id + 1]
+        word_ids = np.asarray(self.indices[start:end])
+        counts = np.asarray(self.counts[start:end])
+
+        # Smoothed inverse document frequency
+        idf = np.log((1 + self.num_documents) / (1 + self.document_frequency()[word_ids])) + 1
+        doc_length = max(int(counts.sum()), 1)
+        scores = counts / doc_length * idf
+
+        keep = self._keep_mask(min_length, stopwords)[word_ids]
+        return self._top(word_ids[keep], np.round(scores[keep], 6), n)
+
+    def term_documents(self, word):
+        """
+        Count of a word in every document that contains it.
+
+        Returns:
+            List of (document name, count), most first
+        """
+        word_id = self.term_id(word)
+        if word_id is None:
+            return []
+
+        start, end = self.term_indptr[word_id], self.term_indptr[word_id + 1]
+        docs = np.asarray(self.term_docs[start:end])
+        counts = np.asarray(self.term_counts[start:end])
+        order = np.argsort(-counts, kind='stable')
+        return [(self.doc_names[docs[i]], int(counts[i])) for i in order]
+
+    def kwic(self, word, window=5, limit=50):
+        """
+        Keyword in context: every place a word occurs, with the words around it.
+
+        Uses the stored word ids, so the original files are not read again.
+        (The context words are the cleaned, lowercase words.)
+
+        Returns:
+            List of (document name, left context, word, right context)
+        """
+        word_id = self.term_id(word)
+        if word_id is None:
+            return []
+
+        tokens = self.tokens
+        start, end = self.position_indptr[word_id], self.position_indptr[word_id + 1]
+        positions = np.asarray(self.positions[start:min(end, start + limit)])
+        docs = np.searchsorted(self.token_offsets, positions, side='right') - 1
+
+        lines = []
+        for position, doc_id in zip(positions, docs):
+            doc_start, doc_end = self.token_offsets[doc_id], self.token_offsets[doc_id + 1]
+            left = tokens[max(doc_start, position - window):position]
+            right = tokens[position + 1:min(doc_end, position + 1 + window)]
+            lines.append((
+                self.doc_names[doc_id],
+                ' '.join(self.vocab[i] for i in left),
+                self.vocab[word_id],
+                ' '.join(self.vocab[i] for i in right),
+            ))
+        return lines
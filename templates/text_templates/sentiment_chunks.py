@@ -0,0 +1,175 @@
+"""
+Chunked Sentiment Scoring
+Score sentiment paragraph by paragraph, on several CPU cores.
+
+Instead of one number for a whole book, every paragraph (long paragraphs
+are split into sentence groups) gets its own polarity and subjectivity,
+so you can see how the mood changes through the text.
+
+Scores are cached per chunk (by the chunk's text), so after editing a text
+only the paragraphs that changed are scored again.
+
+Used by simple_text_analyzer.py.
+"""
+
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+try:
+    from textblob import TextBlob
+    TEXTBLOB_AVAILABLE = True
+except ImportError:
+    TEXTBLOB_AVAILABLE = False
+
+# Paragraphs are separated by blank lines
+PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+
+# Sentence ends (used to split very long paragraphs)
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+# Paragraphs longer than this are split into sentence groups
+MAX_CHUNK_CHARS = 3000
+
+# Chunks sent to a worker process at a time
+BATCH_SIZE = 50
+
+# Below this many chunks to score, a process pool is not worth starting
+MIN_CHUNKS_FOR_POOL = 200
+
+
+def split_chunks(text, max_chars=MAX_CHUNK_CHARS):
+    """
+    Split text into paragraphs, and long paragraphs into sentence groups.
+
+    Returns:
+        List of non-empty chunk strings
+    """
+    chunks = []
+    for paragraph in PARAGRAPH_BREAK.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chars:
+            chunks.append(paragraph)
+            continue
+
+        # Group sentences until the chunk is full
+        current = ""
+        for sentence in SENTENCE_END.split(paragraph):
+            if current and len(current) + len(sentence) + 1 > max_chars:
+                chunks.append(current)
+                current = sentence
+            else:
+                current = f"{current} {sentence}" if current else sentence
+        if current:
+            chunks.append(current)
+    return chunks
+
+
+def score_batch(chunks):
+    """
+    Score a list of chunks (runs in a worker process).
+
+    Returns:
+        List of (polarity, subjectivity)
+    """
+    results = []
+    for chunk in chunks:
+        sentiment = TextBlob(chunk).sentiment
+        results.append((sentiment.polarity, sentiment.subjectivity))
+    return results
+
+
+class ChunkScoreCache:
+    """
+    Remembers (polarity, subjectivity) per chunk text, keeping at most
+    `max_entries` chunks (least recently used are dropped first).
+    """
+
+    def __init__(self, max_entries=100_000):
+        self.max_entries = max_entries
+        self._scores = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(chunk):
+        return hashlib.sha1(chunk.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._scores:
+                self._scores.move_to_end(key)
+                return self._scores[key]
+            return None
+
+    def put(self, key, score):
+        with self._lock:
+            self._scores[key] = score
+            self._scores.move_to_end(key)
+            while len(self._scores) > self.max_entries:
+                self._scores.popitem(last=False)
+
+
+def score_text(text, workers=None, cache=None, progress=None):
+    """
+    Score sentiment per chunk, in parallel, reusing cached chunk scores.
+
+    Args:
+        text: The text to score
+        workers: Number of processes (None = all CPU cores)
+        cache: Optional ChunkScoreCache
+        progress: Optional function called with (chunks done, total chunks)
+
+    Returns:
+        Dictionary with:
+        - 'chunks': list of {'chunk', 'chars', 'polarity', 'subjectivity'}
+        - 'polarity', 'subjectivity': averages weighted by chunk length
+        - 'rescored': how many chunks were actually scored (not cached)
+    """
+    chunks = split_chunks(text)
+    keys = [ChunkScoreCache.key(chunk) for chunk in chunks]
+    scores = [cache.get(key) if cache else None for key in keys]
+
+    todo = [i for i, score in enumerate(scores) if score is None]
+    done = len(chunks) - len(todo)
+    if progress:
+        progress(done, len(chunks))
+
+    batches = [todo[i:i + BATCH_SIZE] for i in range(0, len(todo), BATCH_SIZE)]
+
+    def save(batch, results):
+        nonlocal done
+        for i, score in zip(batch, results):
+            scores[i] = score
+            if cache:
+                cache.put(keys[i], score)
+        done += len(batch)
+        if progress:
+            progress(done, len(chunks))
+
+    if len(todo) < MIN_CHUNKS_FOR_POOL:
+        # Small job: starting processes would take longer than the work
+        for batch in batches:
+            save(batch, score_batch([chunks[i] for i in batch]))
+    else:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            futures = {pool.submit(score_batch, [chunks[i] for i in batch]): batch for batch in batches}
+            for future in as_completed(futures):
+                save(futures[future], future.result())
+
+    rows = [
+        {'chunk': i + 1, 'chars': len(chunk), 'polarity': score[0], 'subjectivity': score[1]}
+        for i, (chunk, score) in enumerate(zip(chunks, scores))
+    ]
+
+    total_chars = sum(row['chars'] for row in rows) or 1
+    return {
+        'chunks': rows,
+        'polarity': sum(row['polarity'] * row['chars'] for row in rows) / total_chars,
+        'subjectivity': sum(row['subjectivity'] * row['chars'] for row in rows) / total_chars,
+        'rescored': len(todo),
+    }
@@ -7,8 +7,15 @@ Run with: streamlit run templates/text_templates/simple_text_analyzer.py
 
 import streamlit as st
 import pandas as pd
-from collections import Counter
+import hashlib
+import io
+import os
 import re
+import time
+
+from text_stats import analyze_text, filter_counts
+from corpus_index import CorpusIndex
+from sentiment_chunks import TEXTBLOB_AVAILABLE, ChunkScoreCache, score_text
 
 # Optional imports (graceful fallback if not installed)
 try:
@@ -17,12 +24,6 @@ try:
 except ImportError:
     WORDCLOUD_AVAILABLE = False
 
-try:
-    from textblob import TextBlob
-    TEXTBLOB_AVAILABLE = True
-except ImportError:
-    TEXTBLOB_AVAILABLE = False
-
 import matplotlib.pyplot as plt
 
 # Page configuration
@@ -54,10 +55,264 @@ ENGLISH_STOPWORDS = {
     'so', 'than', 'too', 'very', 'just', 'also', 'now', 'here', 'there'
 }
 
+
+# ============================================
+# CACHED COMPUTATIONS
+# ============================================
+# Each function is cached by the inputs it really depends on (the text hash
+# plus its own settings), so a tab is only recomputed when those change.
+# Arguments starting with "_" are not part of the cache key. `_computed`
+# is a list the function appends to when it actually runs (a cache miss).
+
+@st.cache_resource(max_entries=4, show_spinner="Counting words...")
+def get_text_stats(text_hash, _text, _computed):
+    """Count everything once per text (results are shared, not copied)."""
+    _computed.append(True)
+    return analyze_text(_text)
+
+
+@st.cache_data(max_entries=32)
+def get_word_counts(text_hash, min_length, remove_stop, _all_counts, _computed):
+    """Filter the word counts for the current settings."""
+    _computed.append(True)
+    return filter_counts(_all_counts, min_length, ENGLISH_STOPWORDS if remove_stop else None)
+
+
+@st.cache_data(max_entries=32)
+def make_bar_chart(text_hash, min_length, remove_stop, bars, _word_counts, _computed):
+    """Bar chart of the top words as PNG bytes (only depends on the top 15)."""
+    _computed.append(True)
+    top_words = _word_counts.most_common(bars)
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.barh([w[0] for w in reversed(top_words)],
+            [w[1] for w in reversed(top_words)],
+            color='steelblue')
+    ax.set_xlabel('Frequency')
+    ax.set_title(f'Top {len(top_words)} Words')
+    plt.tight_layout()
+
+    png = io.BytesIO()
+    fig.savefig(png, format='png')
+    plt.close(fig)
+    return png.getvalue()
+
+
+@st.cache_data(max_entries=16)
+def make_word_cloud(text_hash, min_length, remove_stop, _word_counts, _computed):
+    """Word cloud as PNG bytes, or None if no words are left."""
+    _computed.append(True)
+
+    # Create word cloud straight from the counts (no need to rebuild the text)
+    cloud_counts = filter_counts(_word_counts, min_length, STOPWORDS if remove_stop else None)
+    if not cloud_counts:
+        return None
+
+    wordcloud = WordCloud(
+        width=800,
+        height=400,
+        background_color='white',
+        colormap='viridis'
+    ).generate_from_frequencies(cloud_counts)
+
+    png = io.BytesIO()
+    wordcloud.to_image().save(png, format='png')
+    return png.getvalue()
+
+
+# Processes used for sentiment scoring (None = all CPU cores)
+SENTIMENT_WORKERS = None
+
+
+@st.cache_resource
+def get_sentiment_cache():
+    """Scores of every paragraph seen so far (shared by all texts)."""
+    return ChunkScoreCache()
+
+
+def get_sentiment(text_hash, text, computed):
+    """
+    Sentiment per paragraph plus the overall score.
+
+    Paragraph scores are cached, so after an edit only the changed
+    paragraphs are scored again (in parallel, with a progress bar).
+    """
+    last = st.session_state.get('sentiment')
+    if last and last[0] == text_hash:
+        return last[1]
+
+    progress_bar = st.progress(0.0, text="Analyzing sentiment...")
+
+    def show_progress(done, total):
+        progress_bar.progress(done / total if total else 1.0, text=f"Scoring paragraphs: {done:,}/{total:,}")
+
+    result = score_text(text, SENTIMENT_WORKERS, get_sentiment_cache(), show_progress)
+    progress_bar.empty()
+
+    if result['rescored']:
+        computed.append(True)
+    st.session_state['sentiment'] = (text_hash, result)
+    return result
+
+
+@st.cache_data(max_entries=16)
+def make_frequency_csv(text_hash, min_length, remove_stop, _word_counts, _computed):
+    """All word frequencies as CSV text."""
+    _computed.append(True)
+    results_df = pd.DataFrame(_word_counts.most_common(), columns=['Word', 'Count'])
+    return results_df.to_csv(index=False)
+
+
+def run_step(step, func, *args):
+    """
+    Call a cached function and record how long it took and whether it
+    came from the cache, for the "Performance" panel.
+    """
+    computed = []
+    start = time.perf_counter()
+    result = func(*args, computed)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    perf = st.session_state.setdefault('perf', {})
+    entry = perf.setdefault(step, {'Hits': 0, 'Misses': 0, 'Last (ms)': 0.0})
+    entry['Misses' if computed else 'Hits'] += 1
+    entry['Last (ms)'] = round(elapsed_ms, 1)
+    return result
+
+
+# ============================================
+# CORPUS MODE (many documents)
+# ============================================
+
+# Saved corpus indexes live here, one folder per index
+CORPUS_INDEX_FOLDER = "data/processed/corpus_index"
+
+CORPUS_MODE = "Corpus (many files)"
+
+
+@st.cache_resource(max_entries=4)
+def open_corpus_index(folder):
+    """Open a saved index once (its arrays are memory-mapped)."""
+    return CorpusIndex.load(folder)
+
+
+def show_corpus_mode():
+    """Build or open a corpus index and query it."""
+    saved = sorted(os.listdir(CORPUS_INDEX_FOLDER)) if os.path.isdir(CORPUS_INDEX_FOLDER) else []
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.subheader("Build a new index")
+        source_type = st.radio("Documents from:", ["Folder", "ZIP file"], horizontal=True)
+
+        source = None
+        if source_type == "Folder":
+            folder = st.text_input("Folder with .txt files:", placeholder="data/raw/my_corpus")
+            if folder:
+                if os.path.isdir(folder):
+                    source = folder
+                else:
+                    st.error(f"Folder not found: {folder}")
+        else:
+            zip_file = st.file_uploader("ZIP file with .txt files", type=["zip"])
+            if zip_file:
+                source = zip_file
+
+        # Only letters, digits, "_" and "-", so the index stays inside CORPUS_INDEX_FOLDER
+        typed_name = st.text_input("Index name:", value="my_corpus")
+        index_name = re.sub(r'[^\w-]+', '_', typed_name).strip('_')
+        if index_name and index_name != typed_name:
+            st.caption(f"Saved as: {index_name}")
+
+        if st.button("Build Index", type="primary", disabled=source is None or not index_name):
+            status = st.empty()
+            start = time.perf_counter()
+
+            def show_progress(done, name):
+                if done % 100 == 0:
+                    status.write(f"Indexed {done:,} documents... ({name})")
+
+            index = CorpusIndex.build(source, progress=show_progress)
+            index.save(os.path.join(CORPUS_INDEX_FOLDER, index_name))
+            open_corpus_index.clear()
+
+            status.success(f"Indexed {index.num_documents:,} documents in {time.perf_counter() - start:.1f}s")
+            st.session_state['corpus'] = index_name
+
+    with col2:
+        st.subheader("Open a saved index")
+        if saved:
+            choice = st.selectbox("Saved indexes:", saved)
+            if st.button("Open Index"):
+                st.session_state['corpus'] = choice
+        else:
+            st.info("No saved indexes yet.")
+
+    corpus_name = st.session_state.get('corpus')
+    if not corpus_name or not os.path.isdir(os.path.join(CORPUS_INDEX_FOLDER, corpus_name)):
+        return
+
+    index = open_corpus_index(os.path.join(CORPUS_INDEX_FOLDER, corpus_name))
+    stopwords = ENGLISH_STOPWORDS if remove_stopwords else None
+
+    st.header(f"2. Corpus: {corpus_name}")
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Documents", f"{index.num_documents:,}")
+    with col2:
+        st.metric("Total Words", f"{index.num_tokens:,}")
+    with col3:
+        st.metric("Unique Words", f"{len(index.vocab):,}")
+
+    tab1, tab2, tab3 = st.tabs(["Top Words", "Documents", "Keyword in Context"])
+
+    with tab1:
+        st.subheader("Most Frequent Words (whole corpus)")
+        df = pd.DataFrame(index.top_terms(top_n_words, min_word_length, stopwords), columns=['Word', 'Count'])
+        st.dataframe(df, use_container_width=True)
+        st.download_button("Download (CSV)", df.to_csv(index=False), "corpus_top_words.csv", "text/csv")
+
+    with tab2:
+        st.subheader("Words in One Document")
+        doc_name = st.selectbox("Document:", index.doc_names)
+        doc_id = index.doc_names.index(doc_name)
+        measure = st.radio("Rank by:", ["Frequency", "TF-IDF (typical for this document)"], horizontal=True)
+
+        if measure == "Frequency":
+            rows = index.document_terms(doc_id, top_n_words, min_word_length, stopwords)
+            df = pd.DataFrame(rows, columns=['Word', 'Count'])
+        else:
+            rows = index.tfidf_terms(doc_id, top_n_words, min_word_length, stopwords)
+            df = pd.DataFrame(rows, columns=['Word', 'TF-IDF'])
+        st.dataframe(df, use_container_width=True)
+
+    with tab3:
+        st.subheader("Keyword in Context")
+        word = st.text_input("Word to find:")
+        window = st.slider("Words of context", 1, 15, 5)
+
+        if word:
+            lines = index.kwic(word, window=window, limit=200)
+            if lines:
+                st.dataframe(
+                    pd.DataFrame(lines, columns=['Document', 'Before', 'Word', 'After']),
+                    use_container_width=True
+                )
+                st.write("**Documents containing this word:**")
+                st.dataframe(
+                    pd.DataFrame(index.term_documents(word), columns=['Document', 'Count']),
+                    use_container_width=True
+                )
+            else:
+                st.info(f"'{word}' does not occur in this corpus.")
+
+
 # --- Input Methods ---
 st.header("1. Input Your Text")
 
-input_method = st.radio("Choose input method:", ["Paste text", "Upload file"])
+input_method = st.radio("Choose input method:", ["Paste text", "Upload file", CORPUS_MODE])
 
 text = ""
 
@@ -67,43 +322,38 @@ if input_method == "Paste text":
         height=200,
         placeholder="Enter or paste your text here..."
     )
+elif input_method == CORPUS_MODE:
+    show_corpus_mode()
 else:
     uploaded_file = st.file_uploader("Upload a text file", type=["txt"])
     if uploaded_file:
-        text = uploaded_file.read().decode('utf-8')
-        st.text_area("File contents:", text, height=200)
+        text = uploaded_file.getvalue().decode('utf-8')
+        preview = text[:10000] + ("\n..." if len(text) > 10000 else "")
+        st.text_area("File contents (preview):", preview, height=200)
 
 # --- Analysis ---
 if text:
     st.header("2. Analysis Results")
 
-    # Clean text
-    clean_text = text.lower()
-    clean_text = re.sub(r'[^\w\s]', '', clean_text)  # Remove punctuation
-    clean_text = re.sub(r'\d+', '', clean_text)  # Remove numbers
-
-    # Get words
-    words = clean_text.split()
-
-    # Filter words
-    if remove_stopwords:
-        words = [w for w in words if w not in ENGLISH_STOPWORDS]
-    words = [w for w in words if len(w) >= min_word_length]
+    # Count words once per text: moving a slider only re-filters the counts
+    text_hash = hashlib.sha1(text.encode('utf-8')).hexdigest()
+    stats = run_step("Word counting", get_text_stats, text_hash, text)
 
-    # Word frequency
-    word_counts = Counter(words)
+    # Word frequency (after removing short words and stopwords)
+    word_counts = run_step("Filtering", get_word_counts, text_hash, min_word_length, remove_stopwords,
+                           stats['counts'])
 
     # --- Stats Row ---
     col1, col2, col3, col4 = st.columns(4)
 
     with col1:
-        st.metric("Total Characters", f"{len(text):,}")
+        st.metric("Total Characters", f"{stats['characters']:,}")
     with col2:
-        st.metric("Total Words", f"{len(text.split()):,}")
+        st.metric("Total Words", f"{stats['words']:,}")
     with col3:
-        st.metric("Unique Words", f"{len(set(words)):,}")
+        st.metric("Unique Words", f"{len(word_counts):,}")
     with col4:
-        st.metric("Sentences", f"{text.count('.') + text.count('!') + text.count('?'):,}")
+        st.metric("Sentences", f"{stats['sentences']:,}")
 
     # --- Tabs for different analyses ---
     tab1, tab2, tab3, tab4 = st.tabs(["Word Frequency", "Word Cloud", "Sentiment", "Export"])
@@ -124,15 +374,10 @@ if text:
                 st.dataframe(df, use_container_width=True)
 
             with col2:
-                # Bar chart
-                fig, ax = plt.subplots(figsize=(10, 6))
-                ax.barh([w[0] for w in reversed(top_words[:15])],
-                       [w[1] for w in reversed(top_words[:15])],
-                       color='steelblue')
-                ax.set_xlabel('Frequency')
-                ax.set_title(f'Top {min(15, len(top_words))} Words')
-                plt.tight_layout()
-                st.pyplot(fig)
+                # Bar chart (at most 15 bars, so "Top N" above 15 doesn't redraw it)
+                chart = run_step("Bar chart", make_bar_chart, text_hash, min_word_length, remove_stopwords,
+                                 min(15, top_n_words), word_counts)
+                st.image(chart)
         else:
             st.warning("No words found after filtering. Try adjusting the settings.")
 
@@ -141,22 +386,10 @@ if text:
         st.subheader("Word Cloud Visualization")
 
         if WORDCLOUD_AVAILABLE:
-            if words:
-                # Create word cloud
-                stopwords = STOPWORDS if remove_stopwords else set()
-                wordcloud = WordCloud(
-                    width=800,
-                    height=400,
-                    background_color='white',
-                    stopwords=stopwords,
-                    min_word_length=min_word_length,
-                    colormap='viridis'
-                ).generate(' '.join(words))
-
-                fig, ax = plt.subplots(figsize=(12, 6))
-                ax.imshow(wordcloud, interpolation='bilinear')
-                ax.axis('off')
-                st.pyplot(fig)
+            cloud = run_step("Word cloud", make_word_cloud, text_hash, min_word_length, remove_stopwords,
+                             word_counts)
+            if cloud:
+                st.image(cloud)
             else:
                 st.warning("No words available for word cloud.")
         else:
@@ -167,9 +400,8 @@ if text:
         st.subheader("Sentiment Analysis")
 
         if TEXTBLOB_AVAILABLE:
-            blob = TextBlob(text)
-            polarity = blob.sentiment.polarity
-            subjectivity = blob.sentiment.subjectivity
+            sentiment = run_step("Sentiment", get_sentiment, text_hash, text)
+            polarity, subjectivity = sentiment['polarity'], sentiment['subjectivity']
 
             col1, col2 = st.columns(2)
 
@@ -192,6 +424,14 @@ if text:
                     st.info("The text is more **objective** (fact-based)")
 
                 st.caption("Subjectivity ranges from 0 (objective) to 1 (subjective)")
+
+            # Sentiment through the text, paragraph by paragraph
+            chunks_df = pd.DataFrame(sentiment['chunks'])
+            if len(chunks_df) > 1:
+                st.write("**Sentiment through the text** (one point per paragraph)")
+                st.line_chart(chunks_df.set_index('chunk')[['polarity', 'subjectivity']])
+            st.caption(f"{len(chunks_df):,} paragraphs, {sentiment['rescored']:,} scored this time "
+                       f"(the rest came from the cache). Overall scores are weighted by paragraph length.")
         else:
             st.warning("TextBlob not installed. Run: `pip install textblob`")
             st.info("After installing, run: `python -m textblob.download_corpora`")
@@ -200,11 +440,9 @@ if text:
     with tab4:
         st.subheader("Export Results")
 
-        # Create results DataFrame
-        results_df = pd.DataFrame(word_counts.most_common(), columns=['Word', 'Count'])
-
         # CSV download
-        csv = results_df.to_csv(index=False)
+        csv = run_step("Export CSV", make_frequency_csv, text_hash, min_word_length, remove_stopwords,
+                       word_counts)
         st.download_button(
             "Download Word Frequencies (CSV)",
             csv,
@@ -215,10 +453,10 @@ if text:
         # Summary text
         summary = f"""Text Analysis Summary
 ====================
-Total Characters: {len(text)}
-Total Words: {len(text.split())}
-Unique Words: {len(set(words))}
-Sentences: {text.count('.') + text.count('!') + text.count('?')}
+Total Characters: {stats['characters']}
+Total Words: {stats['words']}
+Unique Words: {len(word_counts)}
+Sentences: {stats['sentences']}
 
 Top 10 Words:
 """
@@ -232,7 +470,12 @@ Top 10 Words:
             "text/plain"
         )
 
-else:
+    # --- Performance panel ---
+    with st.sidebar.expander("⏱️ Performance"):
+        st.caption("Time of the last run of each step, and how often it came from the cache.")
+        st.dataframe(pd.DataFrame.from_dict(st.session_state['perf'], orient='index'))
+
+elif input_method != CORPUS_MODE:
     st.info("Enter or upload text to begin analysis.")
 
 # --- Footer ---
@@ -0,0 +1,115 @@
+"""
+Text Statistics Engine
+Counts words, characters and sentences in one pass over the text.
+
+The text is processed in chunks (1 MB by default), so even very large
+texts never need several full copies in memory. Word counts are collected
+once, before any filtering: changing the minimum word length or the
+stopword setting only filters the (small) table of unique words, it does
+not read the text again.
+
+Used by simple_text_analyzer.py.
+"""
+
+import re
+from collections import Counter
+
+# Punctuation and numbers are removed from words (one regex, one pass)
+CLEAN_PATTERN = re.compile(r'[^\w\s]|\d+')
+
+# Characters that end a sentence
+SENTENCE_ENDINGS = ('.', '!', '?')
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+def iter_chunks(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Split text into chunks that never cut a word in half.
+
+    Args:
+        source: A string, or an open text file
+        chunk_size: Approximate characters per chunk
+
+    Yields:
+        Text chunks that end on whitespace (except possibly the last one)
+    """
+    if isinstance(source, str):
+        read = iter(source[i:i + chunk_size] for i in range(0, len(source), chunk_size))
+    else:
+        read = iter(lambda: source.read(chunk_size), '')
+
+    carry = ''
+    for block in read:
+        block = carry + block
+
+        # Keep the last (possibly unfinished) word for the next chunk
+        cut = max(block.rfind(' '), block.rfind('\n'), block.rfind('\t'))
+        if cut == -1:
+            carry = block
+            continue
+
+        carry = block[cut + 1:]
+        yield block[:cut + 1]
+
+    if carry:
+        yield carry
+
+
+def analyze_text(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Count characters, words, sentences and word frequencies in one pass.
+
+    Words are lowercased and stripped of punctuation and numbers, the same
+    way the analyzer has always cleaned them.
+
+    Args:
+        source: A string, or an open text file
+        chunk_size: Characters processed at a time
+
+    Returns:
+        Dictionary with 'characters', 'words', 'sentences' and
+        'counts' (Counter of every cleaned word, before filtering)
+    """
+    counts = Counter()
+    characters = 0
+    words = 0
+    sentences = 0
+
+    for chunk in iter_chunks(source, chunk_size):
+        characters += len(chunk)
+        sentences += sum(chunk.count(mark) for mark in SENTENCE_ENDINGS)
+
+        raw_words = chunk.split()
+        words += len(raw_words)
+        del raw_words
+
+        counts.update(CLEAN_PATTERN.sub('', chunk.lower()).split())
+
+    return {
+        'characters': characters,
+        'words': words,
+        'sentences': sentences,
+        'counts': counts,
+    }
+
+
+def filter_counts(counts, min_length=1, stopwords=None):
+    """
+    Keep only words that are long enough and not stopwords.
+
+    Works on the table of unique words, so it is fast even for huge texts.
+
+    Args:
+        counts: Counter from analyze_text
+        min_length: Minimum word length
+        stopwords: Set of words to drop (or None)
+
+    Returns:
+        New Counter with the remaining words
+    """
+    stopwords = stopwords or set()
+    return Counter({
+        word: count for word, count in counts.items()
+        if len(word) >= min_length and word not in stopwords
+    })
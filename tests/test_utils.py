@@ -21,6 +21,11 @@ from src.utils import (
     write_json,
     read_text,
     write_text,
+    iter_jsonl,
+    iter_json_array,
+    JsonlWriter,
+    Timer,
+    ProfileRegistry,
 )
 
 
@@ -121,3 +126,124 @@ def test_read_text_invalid_file():
     """Test reading non-existent text file."""
     with pytest.raises(FileNotFoundError):
         read_text("/nonexistent/file.txt")
+
+
+def test_jsonl_writer_and_reader():
+    """Test streaming JSON Lines write/read, including appends."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        file_path = Path(tmpdir) / "records.jsonl"
+        records = [{"id": i, "name": f"item {i}"} for i in range(25)]
+
+        with JsonlWriter(file_path, batch_size=10) as writer:
+            writer.write_many(records)
+        assert writer.count == 25
+
+        # Second writer appends instead of overwriting
+        with JsonlWriter(file_path) as writer:
+            writer.write({"id": 25})
+
+        loaded = list(iter_jsonl(file_path))
+        assert loaded == records + [{"id": 25}]
+
+
+def test_jsonl_gzip():
+    """Test that .gz files are compressed transparently."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        file_path = Path(tmpdir) / "records.jsonl.gz"
+        with JsonlWriter(file_path, append=False) as writer:
+            writer.write({"text": "héllo"})
+
+        assert file_path.read_bytes()[:2] == b"\x1f\x8b"  # gzip magic number
+        assert list(iter_jsonl(file_path)) == [{"text": "héllo"}]
+
+
+def test_iter_json_array():
+    """Test streaming items from a JSON array with tiny chunks."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        file_path = Path(tmpdir) / "array.json"
+        data = [{"a": 1}, [1, 2], "text", 12345, None, {"nested": {"b": [3]}}]
+        write_json(data, file_path)
+
+        assert list(iter_json_array(file_path, chunk_size=3)) == data
+
+
+def test_iter_json_array_strings_with_brackets():
+    """Test that brackets, commas and escaped quotes inside strings are not structure."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        file_path = Path(tmpdir) / "array.json"
+        data = ['a "quoted" ], [string', {'k"}': "\\"}, ["x,y", "{"], -1.5e3, True]
+        write_json(data, file_path)
+
+        for chunk_size in (1, 2, 5):
+            assert list(iter_json_array(file_path, chunk_size=chunk_size)) == data
+
+
+def test_iter_json_array_not_array():
+    """Test that a non-array JSON file raises ValueError."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        file_path = Path(tmpdir) / "object.json"
+        write_json({"a": 1}, file_path)
+
+        with pytest.raises(ValueError):
+            list(iter_json_array(file_path))
+
+
+def test_iter_json_array_malformed_separators():
+    """Test that missing, doubled and trailing commas raise JSONDecodeError."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        file_path = Path(tmpdir) / "array.json"
+        file_path.write_text("[ ]")
+        assert list(iter_json_array(file_path)) == []
+
+        for text in ["[1,,2]", "[1 2]", "[1,2,]", "[,1]", '[{"a": 1} {"b": 2}]']:
+            file_path.write_text(text)
+            with pytest.raises(json.JSONDecodeError):
+                list(iter_json_array(file_path, chunk_size=2))
+
+
+def test_timer_nested_and_registry():
+    """Test nested timers are recorded with their parent path."""
+    registry = ProfileRegistry()
+
+    with Timer("outer", silent=True, registry=registry) as outer:
+        for _ in range(3):
+            with Timer("inner", silent=True, registry=registry):
+                pass
+
+    assert outer.elapsed > 0
+    stats = registry.stats()
+    assert stats["outer"]["count"] == 1
+    assert stats["inner"]["count"] == 3
+    assert stats["inner"]["p50"] <= stats["inner"]["p99"]
+
+    collapsed = registry.to_collapsed()
+    assert "outer;inner " in collapsed
+    assert json.loads(registry.to_json())["inner"]["count"] == 3
+
+
+def test_registry_bounded_samples():
+    """Test that samples are capped while count/total/min/max stay exact."""
+    registry = ProfileRegistry(max_samples=100)
+    for duration in range(1, 10_001):
+        registry.record("hot", duration, [])
+
+    stats = registry.stats()["hot"]
+    assert len(registry._samples["hot"]) == 100
+    assert stats["count"] == 10_000
+    assert stats["total"] == sum(range(1, 10_001)) / 1e9
+    assert stats["min"] == 1 / 1e9 and stats["max"] == 10_000 / 1e9
+    assert 2_000 / 1e9 < stats["p50"] < 8_000 / 1e9
+
+
+def test_timer_decorator(capsys):
+    """Test Timer as a silent decorator."""
+    registry = ProfileRegistry()
+
+    @Timer(silent=True, registry=registry)
+    def add(a, b):
+        return a + b
+
+    assert add(1, 2) == 3
+    assert add(2, 3) == 5
+    assert capsys.readouterr().out == ""
+    assert registry.stats()["test_timer_decorator.<locals>.add"]["count"] == 2